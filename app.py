@@ -4,148 +4,506 @@ Chat de Voz con Flask - Aplicación Principal
 Versión modularizada
 """
 
-from flask import Flask, render_template, jsonify, request, session
+# Primero: el desglose del arranque incluye los imports de la aplicación
+import utils.startup  # noqa: F401
+from flask import Flask, Blueprint, render_template, jsonify, request, session, Response, stream_with_context, g, abort
+from flask_sock import Sock
+from collections import deque
 import secrets
+import base64
 import logging
+import json
 from config import Config
-from models.conversation import ConversationManager
-from models.ollama_client import OllamaClient
-from services.whisper_service import WhisperService
-from services.tts_service import TTSService
+from models.ollama_client import OllamaOverloadedError, TokenStream
+from services.admission import AdmissionRejected
+from services.registry import ServiceRegistry
 from utils.ssl_manager import SSLManager
+from utils.sentence_splitter import SentenceSplitter
+from utils.text_normalizer import normalizer_for_voice
+from utils.metrics import span, start_request, end_request, render_prometheus, counter_values
+from utils.profiler import profile_for
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Crear aplicación Flask
-app = Flask(__name__)
-app.secret_key = secrets.token_hex(16)
-app.config.from_object(Config)
+# Rutas y WebSocket se registran en la app que crea create_app()
+bp = Blueprint('main', __name__)
+sock = Sock()
 
-# Inicializar servicios
-conversation_manager = ConversationManager()
-ollama_client = OllamaClient(Config.OLLAMA_HOST, Config.OLLAMA_PORT)
-whisper_service = WhisperService(Config.WHISPER_MODEL)
-tts_service = TTSService(Config.TTS_VOICE)
+# Servicios: se construyen al primer uso dentro de cada proceso
+services = ServiceRegistry(Config)
+services.startup.mark('imports')
+
+
+def create_app() -> Flask:
+    """
+    Crear la aplicación Flask
+
+    - background: los modelos se cargan y se calientan en un hilo; la app
+      responde enseguida y /readyz indica cuándo está lista
+    - preload: los pesos de Whisper se cargan aquí; si el servidor hace
+      fork después (gunicorn --preload), los workers los comparten
+      copy-on-write y cada uno se calienta tras el fork
+    - lazy: cada servicio se carga con su primera petición
+    """
+    app = Flask(__name__)
+    # SECRET_KEY viene de Config: todos los workers deben firmar la cookie de sesión con la misma clave
+    app.config.from_object(Config)
+    if not Config.SECRET_KEY:
+        if not Config.DEBUG:
+            raise RuntimeError("SECRET_KEY no está definida: configúrala en el entorno o en .env")
+        app.secret_key = secrets.token_hex(16)
+        logger.warning("SECRET_KEY no definida: se usa una clave aleatoria por proceso; "
+                       "con varios workers de gunicorn las sesiones solo valen en el worker que las creó")
+    app.register_blueprint(bp)
+    sock.init_app(app)
+    services.startup.mark('create_app')
+
+    if Config.MODEL_LOADING == 'preload':
+        services.preload_models()
+        services.startup.mark('whisper_preload')
+    elif Config.MODEL_LOADING == 'background':
+        services.start_warmup()
+
+    return app
+
+
+@bp.before_request
+def start_timings():
+    """Acumular los tiempos de cada etapa para la cabecera Server-Timing"""
+    if Config.SERVER_TIMING:
+        g.timings, g.timings_token = start_request()
+
+
+@bp.after_request
+def add_server_timing(response):
+    # En respuestas en streaming solo incluye las etapas previas al primer byte
+    timings = g.get('timings')
+    if timings and timings.stages:
+        response.headers['Server-Timing'] = timings.server_timing()
+    return response
+
+
+@bp.teardown_request
+def end_timings(exc):
+    token = g.pop('timings_token', None)
+    if token:
+        end_request(token)
+
+
+def json_payload(payload: dict) -> Response:
+    """Serializar la respuesta midiendo la codificación"""
+    with span('encode'):
+        return jsonify(payload)
+
+
+def get_session_id() -> str:
+    """Obtener o crear el identificador de sesión"""
+    session_id = session.get('session_id')
+    if not session_id:
+        session_id = secrets.token_hex(16)
+        session['session_id'] = session_id
+    return session_id
+
+
+def stream_tokens(messages, model: str, deadline: float) -> TokenStream:
+    """Abrir el stream del modelo ocupando un turno de la etapa 'llm' hasta cerrarlo"""
+    release = services.admission.acquire('llm', deadline)
+    try:
+        return TokenStream(services.ollama_client.stream_response(messages, model), release)
+    except BaseException:
+        release()
+        raise
+
+
+def get_response(messages, model: str, deadline: float):
+    """Respuesta completa del modelo dentro de la etapa 'llm'"""
+    with services.admission.stage('llm', deadline):
+        return services.ollama_client.get_response(messages, model)
+
+
+def _ndjson(event: dict) -> str:
+    """Serializar un evento como una línea NDJSON"""
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+def render_audio(text: str, voice: str, audio_mode: str, base64_key: str = 'audio') -> dict:
+    """
+    Sintetizar audio y devolverlo según el modo de respuesta
+
+    - 'base64': el MP3 codificado dentro del JSON (modo original)
+    - 'url': un enlace a /audio/<id> con los bytes sin codificar; si el
+      audio no cabe en el almacén se envía en base64
+    """
+    if audio_mode == 'url':
+        audio_data = services.tts_service.synthesize(text, voice)
+        if not audio_data:
+            return {'audio_url': None}
+        audio_id = services.audio_store.put(audio_data)
+        if audio_id:
+            return {'audio_url': f"/audio/{audio_id}"}
+        with span('encode'):
+            return {base64_key: base64.b64encode(audio_data).decode('utf-8')}
+    return {base64_key: services.tts_service.generate_audio(text, voice)}
+
+
+def stream_turn(session_id, tokens, voice, audio_mode='base64', first_event=None):
+    """
+    Generar los eventos de un turno en streaming
+
+    Emite los tokens de Ollama a medida que llegan y el audio de cada
+    oración en orden, sin esperar a que termine la respuesta completa.
+    """
+    splitter = SentenceSplitter()
+    # Normalizar antes de segmentar: "Sr." o "3.5" no cierran oración
+    normalizer = normalizer_for_voice(voice or Config.TTS_VOICE).stream()
+    pending = deque()
+    parts = []
+    submitted = 0
+
+    def submit(sentence):
+        nonlocal submitted
+        future = services.tts_executor.submit(render_audio, sentence, voice, audio_mode)
+        pending.append((submitted, sentence, future))
+        submitted += 1
+
+    def ready_audio(wait):
+        # Respetar el orden: solo se emite la cabeza de la cola
+        while pending and (wait or pending[0][2].done()):
+            index, sentence, future = pending.popleft()
+            event = {'type': 'audio', 'index': index, 'text': sentence}
+            event.update(future.result())
+            yield _ndjson(event)
+
+    try:
+        if first_event:
+            yield _ndjson(first_event)
+
+        for token in tokens:
+            parts.append(token)
+            yield _ndjson({'type': 'token', 'text': token})
+
+            for sentence in splitter.feed(normalizer.feed(token)):
+                submit(sentence)
+            yield from ready_audio(wait=False)
+
+        bot_response = ''.join(parts).strip()
+        if not bot_response:
+            logger.error("No se recibió respuesta de Ollama")
+            yield _ndjson({'type': 'error', 'error': 'Error getting response from Ollama'})
+            return
+
+        services.conversation_manager.add_message(session_id, "assistant", bot_response)
+
+        for sentence in splitter.feed(normalizer.flush()) + splitter.flush():
+            submit(sentence)
+        yield from ready_audio(wait=True)
+
+        yield _ndjson({'type': 'done', 'response': bot_response})
+
+    except Exception as e:
+        logger.error(f"Error en streaming: {e}")
+        yield _ndjson({'type': 'error', 'error': str(e)})
+
+    finally:
+        # Si el cliente se desconecta, no sintetizar lo que nadie escuchará
+        for _, _, future in pending:
+            future.cancel()
+
+
+def ndjson_response(generator, on_close=None) -> Response:
+    """Construir una respuesta NDJSON sin buffering intermedio"""
+    response = Response(
+        stream_with_context(generator),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    if on_close:
+        response.call_on_close(on_close)
+    return response
+
+
+def overloaded_response(error: OllamaOverloadedError):
+    """Responder 503 con Retry-After cuando la cola del modelo está llena"""
+    logger.warning(str(error))
+    response = jsonify({'error': 'Servidor ocupado, intenta de nuevo en unos segundos'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def rejected_response(error: AdmissionRejected):
+    """Responder 413, 429 o 503 cuando el control de admisión rechaza la petición"""
+    response = jsonify({'error': str(error)})
+    response.status_code = error.status
+    if error.retry_after:
+        response.headers['Retry-After'] = str(error.retry_after)
+    return response
 
 # Rutas principales
-@app.route('/')
+@bp.route('/')
 def index():
     """Página principal"""
     is_https = request.is_secure or request.headers.get('X-Forwarded-Proto') == 'https'
     current_model = session.get('current_model', Config.DEFAULT_MODEL)
     
+    # El WebSocket no puede crear la cookie de sesión, así que se crea aquí
+    get_session_id()
+    
     return render_template('index.html', 
                          current_model=current_model, 
                          is_https=is_https)
 
-@app.route('/chat', methods=['POST'])
+@bp.route('/chat', methods=['POST'])
 def chat():
     """Endpoint para chat de texto"""
     try:
         data = request.json
         message = data.get('message', '')
         voice = data.get('voice', Config.TTS_VOICE)
+        audio_mode = data.get('audio_mode', Config.AUDIO_RESPONSE_MODE)
         
         if not message:
             return jsonify({'error': 'No message provided'}), 400
         
         # Obtener o crear sesión
-        session_id = session.get('session_id')
-        if not session_id:
-            session_id = secrets.token_hex(16)
-            session['session_id'] = session_id
+        session_id = get_session_id()
+        deadline = services.admission.deadline()
+        services.admission.check_session(session_id)
         
         # Agregar mensaje a la conversación
-        conversation_manager.add_message(session_id, "user", message)
+        services.conversation_manager.add_message(session_id, "user", message)
         
         # Obtener conversación actual
-        messages = conversation_manager.get_conversation(session_id)
+        messages = services.conversation_manager.get_conversation(session_id)
         
         # Obtener respuesta de Ollama
         current_model = session.get('current_model', Config.DEFAULT_MODEL)
-        bot_response = ollama_client.get_response(messages, current_model)
         
-        logger.info(f"Respuesta de Ollama: {bot_response}")
+        if data.get('stream'):
+            tokens = stream_tokens(messages, current_model, deadline)
+            return ndjson_response(stream_turn(session_id, tokens, voice, audio_mode), on_close=tokens.close)
+        
+        bot_response = get_response(messages, current_model, deadline)
+        
+        logger.debug("Respuesta de Ollama: %s", bot_response)
         
         if bot_response:
             # Agregar respuesta a la conversación
-            conversation_manager.add_message(session_id, "assistant", bot_response)
+            services.conversation_manager.add_message(session_id, "assistant", bot_response)
             
             # Generar audio
-            audio_base64 = tts_service.generate_audio(bot_response, voice)
+            payload = {'response': bot_response}
+            payload.update(render_audio(bot_response, voice, audio_mode))
             
-            return jsonify({
-                'response': bot_response,
-                'audio': audio_base64
-            })
+            return json_payload(payload)
         else:
             logger.error("No se recibió respuesta de Ollama")
             return jsonify({'error': 'Error getting response from Ollama'}), 500
             
+    except AdmissionRejected as e:
+        return rejected_response(e)
+    except OllamaOverloadedError as e:
+        return overloaded_response(e)
     except Exception as e:
         logger.error(f"Error in chat: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/process_audio', methods=['POST'])
+@bp.route('/process_audio', methods=['POST'])
 def process_audio():
     """Endpoint para procesar audio"""
     try:
-        if 'audio' not in request.files:
+        # Admisión: lo barato primero, antes de leer el cuerpo y de decodificar
+        admission = services.admission
+        deadline = admission.deadline()
+        admission.check_ready(services.is_ready())
+        session_id = get_session_id()
+        admission.check_session(session_id)
+        admission.check_upload_size(request.content_length)
+        
+        # Acceder a request.files lee y procesa el cuerpo multipart
+        with span('upload'):
+            files = request.files
+        
+        if 'audio' not in files:
             return jsonify({'error': 'No audio file'}), 400
         
-        audio_file = request.files['audio']
+        audio_file = files['audio']
         language = request.form.get('language', 'es')
         voice = request.form.get('voice', Config.TTS_VOICE)
+        audio_mode = request.form.get('audio_mode', Config.AUDIO_RESPONSE_MODE)
+        
+        admission.check_audio(audio_file.read())
+        audio_file.stream.seek(0)
         
         # Transcribir audio
-        user_text = whisper_service.transcribe(audio_file, language)
+        with admission.stage('transcription', deadline):
+            user_text = services.whisper_service.transcribe(audio_file, language)
         
         if not user_text:
             return jsonify({'error': 'No se detectó texto'}), 400
         
         # Procesar como mensaje de texto
-        session_id = session.get('session_id')
-        if not session_id:
-            session_id = secrets.token_hex(16)
-            session['session_id'] = session_id
-        
         # Agregar mensaje a la conversación
-        conversation_manager.add_message(session_id, "user", user_text)
+        services.conversation_manager.add_message(session_id, "user", user_text)
         
         # Obtener conversación actual
-        messages = conversation_manager.get_conversation(session_id)
+        messages = services.conversation_manager.get_conversation(session_id)
         
         # Obtener respuesta de Ollama
         current_model = session.get('current_model', Config.DEFAULT_MODEL)
-        bot_text = ollama_client.get_response(messages, current_model)
+        
+        if request.form.get('stream') == 'true':
+            tokens = stream_tokens(messages, current_model, deadline)
+            return ndjson_response(stream_turn(
+                session_id, tokens, voice, audio_mode,
+                first_event={'type': 'transcript', 'user_text': user_text}
+            ), on_close=tokens.close)
+        
+        bot_text = get_response(messages, current_model, deadline)
         
         if bot_text:
             # Agregar respuesta a la conversación
-            conversation_manager.add_message(session_id, "assistant", bot_text)
+            services.conversation_manager.add_message(session_id, "assistant", bot_text)
             
             # Generar audio
-            audio_base64 = tts_service.generate_audio(bot_text, voice)
+            payload = {'user_text': user_text, 'bot_text': bot_text}
+            payload.update(render_audio(bot_text, voice, audio_mode, base64_key='audio_response'))
             
-            return jsonify({
-                'user_text': user_text,
-                'bot_text': bot_text,
-                'audio_response': audio_base64
-            })
+            return json_payload(payload)
         else:
             logger.error("No se recibió respuesta de Ollama")
             return jsonify({'error': 'Error getting response from Ollama'}), 500
             
+    except AdmissionRejected as e:
+        return rejected_response(e)
+    except OllamaOverloadedError as e:
+        return overloaded_response(e)
     except Exception as e:
         logger.error(f"Error processing audio: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/models', methods=['GET'])
+@bp.route('/audio/<audio_id>')
+def get_audio(audio_id):
+    """Servir audio generado como MP3 binario (admite peticiones Range)"""
+    audio_data = services.audio_store.get(audio_id)
+    if audio_data is None:
+        return jsonify({'error': 'Audio not found'}), 404
+    
+    response = Response(audio_data, mimetype='audio/mpeg')
+    response.set_etag(audio_id)
+    response.headers['Cache-Control'] = f'private, max-age={int(Config.AUDIO_STORE_TTL)}'
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(audio_data))
+
+@sock.route('/ws/transcribe', bp=bp)
+def ws_transcribe(ws):
+    """
+    Reconocimiento de voz en streaming
+    
+    El cliente envía {"type": "start", "language", "voice"}, luego los
+    fragmentos binarios de MediaRecorder y opcionalmente {"type": "stop"}.
+    El servidor responde con transcripciones parciales y, al detectar el fin
+    de la frase, la final seguida de los eventos del turno (como en /chat).
+    """
+    from services.streaming_transcriber import StreamingDecoder, StreamingTranscriber
+    
+    # Cada conexión transcribe varias ventanas y llama al modelo: cuenta
+    # como una petición de la sesión
+    admission = services.admission
+    session_id = get_session_id()
+    try:
+        admission.check_ready(services.is_ready())
+        admission.check_session(session_id)
+    except AdmissionRejected as e:
+        ws.send(json.dumps({'type': 'error', 'error': str(e)}, ensure_ascii=False))
+        return
+    
+    def receive():
+        """Siguiente mensaje del cliente; si calla demasiado se cierra el socket"""
+        message = ws.receive(timeout=Config.STREAM_RECEIVE_TIMEOUT)
+        if message is None:
+            logger.warning(f"WebSocket sin datos durante {Config.STREAM_RECEIVE_TIMEOUT}s: se cierra")
+            ws.close(message='Tiempo de espera agotado')
+        return message
+    
+    start = receive()
+    if start is None:
+        return
+    start = json.loads(start)
+    language = start.get('language', Config.WHISPER_LANGUAGE)
+    voice = start.get('voice', Config.TTS_VOICE)
+    audio_mode = start.get('audio_mode', Config.AUDIO_RESPONSE_MODE)
+    
+    decoder = StreamingDecoder()
+    transcriber = StreamingTranscriber(
+        services.whisper_service, services.vad, language,
+        partial_interval=Config.STREAM_PARTIAL_INTERVAL,
+        max_window=Config.STREAM_MAX_WINDOW,
+        overlap=Config.STREAM_OVERLAP,
+        silence=Config.SILENCE_DURATION,
+        # Cada ventana ocupa un turno de transcripción, como /process_audio
+        stage=lambda: admission.stage('transcription', admission.deadline())
+    )
+    
+    try:
+        final = None
+        while final is None:
+            message = receive()
+            if message is None:
+                return
+            if isinstance(message, str):
+                if json.loads(message).get('type') == 'stop':
+                    break
+                continue
+            
+            decoder.feed(message)
+            for event in transcriber.add_audio(decoder.drain()):
+                ws.send(json.dumps(event, ensure_ascii=False))
+                if event['type'] == 'final':
+                    final = event
+        
+        if final is None:
+            final = transcriber.finish(decoder.close())
+            ws.send(json.dumps(final, ensure_ascii=False))
+        
+        user_text = final['text']
+        if not user_text:
+            ws.send(json.dumps({'type': 'error', 'error': 'No se detectó texto'}, ensure_ascii=False))
+            return
+        
+        # Fin de frase: lanzar la llamada al modelo sin esperar al cliente
+        services.conversation_manager.add_message(session_id, "user", user_text)
+        messages = services.conversation_manager.get_conversation(session_id)
+        current_model = session.get('current_model', Config.DEFAULT_MODEL)
+        
+        tokens = stream_tokens(messages, current_model, admission.deadline())
+        try:
+            for line in stream_turn(session_id, tokens, voice, audio_mode):
+                ws.send(line.rstrip())
+        finally:
+            tokens.close()
+    
+    except AdmissionRejected as e:
+        ws.send(json.dumps({'type': 'error', 'error': str(e)}, ensure_ascii=False))
+    except OllamaOverloadedError as e:
+        logger.warning(str(e))
+        ws.send(json.dumps({'type': 'error', 'error': 'Servidor ocupado, intenta de nuevo en unos segundos'}, ensure_ascii=False))
+    except Exception as e:
+        logger.error(f"Error en transcripción en streaming: {e}")
+    finally:
+        decoder.close()
+
+@bp.route('/api/models', methods=['GET'])
 def get_models():
     """Obtener modelos disponibles"""
     try:
-        models = ollama_client.get_available_models()
+        # ?refresh=1 fuerza una nueva consulta a Ollama
+        if request.args.get('refresh'):
+            services.ollama_client.invalidate_models()
+        
+        models = services.ollama_client.get_available_models()
         current = session.get('current_model', Config.DEFAULT_MODEL)
         
         # Si no hay modelo en sesión pero hay modelos disponibles, usar el primero
@@ -155,8 +513,7 @@ def get_models():
         
         # Verificar que el modelo actual existe en la lista
         if models:
-            model_exists = any(m['name'] == current for m in models)
-            if not model_exists and models:
+            if not services.ollama_client.has_model(current):
                 current = models[0]['name']
                 session['current_model'] = current
         
@@ -172,7 +529,7 @@ def get_models():
             'error': str(e)
         })
 
-@app.route('/api/change-model', methods=['POST'])
+@bp.route('/api/change-model', methods=['POST'])
 def change_model():
     """Cambiar modelo activo"""
     try:
@@ -183,10 +540,7 @@ def change_model():
             return jsonify({'error': 'No model specified'}), 400
         
         # Verificar que el modelo existe
-        models = ollama_client.get_available_models()
-        model_exists = any(m['name'] == new_model for m in models)
-        
-        if model_exists:
+        if services.ollama_client.has_model(new_model):
             session['current_model'] = new_model
             return jsonify({'success': True, 'model': new_model})
         else:
@@ -196,29 +550,84 @@ def change_model():
         logger.error(f"Error changing model: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/health')
+@bp.route('/health')
 def health():
     """Health check endpoint"""
     return jsonify({
         'status': 'ok',
-        'ollama': ollama_client.is_connected(),
-        'whisper': whisper_service.is_loaded(),
+        'ollama': services.ollama_client.is_connected(),
+        # No forzar la carga de Whisper desde un health check; True tras la primera inferencia
+        'whisper': services.is_loaded('whisper_service') and services.whisper_service.warmed,
+        'whisper_worker': services.whisper_service.get_stats() if services.is_loaded('whisper_service') else None,
+        'ollama_queues': services.ollama_client.get_queue_stats(),
+        'admission': services.admission.get_stats(),
+        'tts_cache': services.tts_service.get_cache_stats(),
+        'tts_pool': services.tts_service.get_pool_stats(),
+        # Llamadas que reutilizaron el resultado de otra idéntica en curso
+        'deduplicated': counter_values('deduplicated_calls'),
+        'conversations': services.conversation_manager.get_stats(),
         'https': request.is_secure
     })
 
 
-@app.route('/test_models')
+@bp.route('/livez')
+def livez():
+    """Liveness: el proceso responde y los hilos de fondo de sus servicios siguen vivos"""
+    checks = services.liveness()
+    alive = all(checks.values())
+    return jsonify({'status': 'ok' if alive else 'fail', 'checks': checks}), 200 if alive else 503
+
+
+@bp.route('/readyz')
+def readyz():
+    """Readiness: modelos cargados y calentados (con el desglose del arranque)"""
+    state = services.readiness()
+    return jsonify(state), 200 if state['ready'] else 503
+
+
+@bp.route('/metrics')
+def metrics():
+    """Histogramas de latencia por etapa (formato de texto de Prometheus)"""
+    if not Config.METRICS_ENABLED:
+        abort(404)
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/debug/profile')
+def debug_profile():
+    """
+    Perfilar el proceso durante unos segundos
+    
+    /debug/profile?seconds=10&interval_ms=5 devuelve las pilas muestreadas
+    de todos los hilos en formato collapsed (flamegraph.pl, speedscope).
+    """
+    if not Config.PROFILING_ENABLED:
+        abort(404)
+    seconds = request.args.get('seconds', 10, type=float)
+    interval_ms = request.args.get('interval_ms', 5, type=float)
+    # Un intervalo nulo dejaría el hilo de muestreo al 100 % de CPU
+    if not seconds > 0 or not interval_ms >= 1:
+        return jsonify({'error': 'seconds debe ser mayor que 0 e interval_ms al menos 1'}), 400
+    return Response(profile_for(min(seconds, 60), interval_ms / 1000), mimetype='text/plain')
+
+
+@bp.route('/test_models')
 def test_models():
     """Página de prueba para el selector de modelos"""
     return render_template('test_models.html')
 
 
-@app.route('/test_css')
+@bp.route('/test_css')
 def test_css():
     """Página de prueba CSS"""
     return render_template('test_css.html')
 
 if __name__ == '__main__':
+    app = create_app()
+    if Config.MODEL_LOADING == 'preload':
+        services.start_warmup()
+    ollama_client = services.ollama_client
+    
     # Verificar conexión con Ollama
     if ollama_client.is_connected():
         logger.info("Ollama conectado correctamente")
@@ -227,22 +636,25 @@ if __name__ == '__main__':
     else:
         logger.error("No se pudo conectar a Ollama")
     
-    # Iniciar servidor
-    if Config.ENABLE_HTTPS:
-        ssl_manager = SSLManager()
-        context = ssl_manager.get_context()
-        
-        if context:
-            logger.info(f"Iniciando servidor HTTPS en puerto {Config.HTTPS_PORT}")
-            app.run(
-                host='0.0.0.0',
-                port=Config.HTTPS_PORT,
-                debug=False,
-                ssl_context=context
-            )
+    # Servidor de desarrollo; en producción usar gunicorn -c gunicorn.conf.py wsgi:app
+    try:
+        if Config.ENABLE_HTTPS:
+            ssl_manager = SSLManager()
+            context = ssl_manager.get_context()
+            
+            if context:
+                logger.info(f"Iniciando servidor HTTPS en puerto {Config.HTTPS_PORT}")
+                app.run(
+                    host='0.0.0.0',
+                    port=Config.HTTPS_PORT,
+                    debug=False,
+                    ssl_context=context
+                )
+            else:
+                logger.error("No se pudo configurar HTTPS, iniciando en HTTP")
+                app.run(host='0.0.0.0', port=Config.HTTP_PORT, debug=False)
         else:
-            logger.error("No se pudo configurar HTTPS, iniciando en HTTP")
+            logger.info(f"Iniciando servidor HTTP en puerto {Config.HTTP_PORT}")
             app.run(host='0.0.0.0', port=Config.HTTP_PORT, debug=False)
-    else:
-        logger.info(f"Iniciando servidor HTTP en puerto {Config.HTTP_PORT}")
-        app.run(host='0.0.0.0', port=Config.HTTP_PORT, debug=False)
\ No newline at end of file
+    finally:
+        services.shutdown(Config.SHUTDOWN_DRAIN_TIMEOUT)
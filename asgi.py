@@ -0,0 +1,373 @@
+"""
+Punto de entrada ASGI con el turno de voz asíncrono
+
+    uvicorn asgi:app --host 0.0.0.0 --port 7860
+
+POST /chat y POST /process_audio se atienden en el loop de eventos con
+AsyncTurnPipeline: una petición esperando a Ollama o a edge-tts no ocupa un
+hilo. El resto de rutas de Flask se sirven a través de un pool de hilos
+(a2wsgi). El WebSocket /ws/transcribe requiere el servidor WSGI.
+"""
+import asyncio
+import io
+import json
+import logging
+import sys
+
+from a2wsgi import WSGIMiddleware
+from flask import request, session
+
+from app import create_app, services, get_session_id
+from config import Config
+from models.async_ollama_client import AsyncTokenStream
+from models.ollama_client import OllamaOverloadedError
+from services.admission import AdmissionRejected
+from services.turn_pipeline import AsyncTurnPipeline
+from utils.metrics import span, start_request, end_request, current_request
+
+logger = logging.getLogger(__name__)
+
+flask_app = create_app()
+wsgi_app = WSGIMiddleware(flask_app, workers=Config.ASYNC_WSGI_THREADS)
+pipeline = AsyncTurnPipeline(services, whisper_threads=Config.ASYNC_WHISPER_THREADS)
+
+
+class Turn:
+    """Datos de la petición leídos con el contexto de Flask"""
+
+    def __init__(self, session_id: str, model: str, cookies: list):
+        self.session_id = session_id
+        self.model = model
+        self.cookies = cookies
+        self.data = {}
+        self.deadline = None
+
+
+def build_environ(scope, body: bytes) -> dict:
+    """Construir el entorno WSGI de una petición ASGI ya leída"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': '',
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'CONTENT_LENGTH': str(len(body)),
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = f'HTTP_{key}'
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ and key.startswith('HTTP_') else value
+    return environ
+
+
+def read_turn(environ: dict) -> Turn:
+    """
+    Leer sesión, JSON o formulario con el contexto de Flask
+
+    Reutiliza get_session_id y la cookie firmada de Flask, así que la sesión
+    es la misma que en las rutas WSGI. No hay esperas dentro del contexto.
+    """
+    with flask_app.request_context(environ):
+        turn = Turn(get_session_id(), session.get('current_model', Config.DEFAULT_MODEL), [])
+        if request.path == '/chat':
+            data = request.get_json(silent=True) or {}
+            turn.data = {
+                'message': data.get('message', ''),
+                'voice': data.get('voice', Config.TTS_VOICE),
+                'audio_mode': data.get('audio_mode', Config.AUDIO_RESPONSE_MODE),
+                'stream': bool(data.get('stream'))
+            }
+        else:
+            audio_file = request.files.get('audio')
+            turn.data = {
+                'audio': audio_file.read() if audio_file else None,
+                'language': request.form.get('language', 'es'),
+                'voice': request.form.get('voice', Config.TTS_VOICE),
+                'audio_mode': request.form.get('audio_mode', Config.AUDIO_RESPONSE_MODE),
+                'stream': request.form.get('stream') == 'true'
+            }
+
+        # Serializar la sesión (p. ej. si se acaba de crear el session_id)
+        response = flask_app.response_class()
+        flask_app.session_interface.save_session(flask_app, session._get_current_object(), response)
+        turn.cookies = response.headers.getlist('Set-Cookie')
+    return turn
+
+
+# Respuestas
+
+def server_timing_header() -> list:
+    timings = current_request()
+    if timings is None or not timings.stages:
+        return []
+    return [(b'server-timing', timings.server_timing().encode('latin-1'))]
+
+
+class JSONResponse:
+    def __init__(self, payload: dict, status: int = 200, headers: dict = None):
+        self.payload = payload
+        self.status = status
+        self.headers = headers or {}
+
+    async def send(self, send, extra_headers):
+        with span('encode'):
+            body = json.dumps(self.payload, ensure_ascii=False).encode('utf-8')
+        headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+        headers += [(k.lower().encode(), str(v).encode()) for k, v in self.headers.items()]
+        headers += extra_headers + server_timing_header()
+        await send({'type': 'http.response.start', 'status': self.status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+class NDJSONResponse:
+    """Respuesta NDJSON: cada evento se envía en cuanto se genera"""
+
+    def __init__(self, events, on_close=None):
+        self.events = events
+        self.on_close = on_close
+
+    async def send(self, send, extra_headers):
+        headers = [(b'content-type', b'application/x-ndjson'),
+                   (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]
+        # Server-Timing solo incluye las etapas previas al primer byte
+        headers += extra_headers + server_timing_header()
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+            async for event in self.events:
+                line = json.dumps(event, ensure_ascii=False) + "\n"
+                await send({'type': 'http.response.body', 'body': line.encode('utf-8'), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            await self.events.aclose()
+            # Libera el turno de Ollama aunque el generador no llegara a empezar
+            if self.on_close:
+                await self.on_close()
+
+
+def overloaded_response(error: OllamaOverloadedError) -> JSONResponse:
+    """Responder 503 con Retry-After cuando la cola del modelo está llena"""
+    logger.warning(str(error))
+    return JSONResponse({'error': 'Servidor ocupado, intenta de nuevo en unos segundos'}, 503,
+                        {'Retry-After': error.retry_after})
+
+
+def rejected_response(error: AdmissionRejected) -> JSONResponse:
+    """Responder 413, 429 o 503 cuando el control de admisión rechaza la petición"""
+    return JSONResponse({'error': str(error)}, error.status,
+                        {'Retry-After': error.retry_after} if error.retry_after else None)
+
+
+# Rutas asíncronas
+
+async def stream_tokens(turn: Turn, messages) -> AsyncTokenStream:
+    """Abrir el stream del modelo ocupando un turno de la etapa 'llm' hasta cerrarlo"""
+    release = await services.admission.acquire_async('llm', turn.deadline)
+    try:
+        return AsyncTokenStream(await pipeline.ollama.stream_response(messages, turn.model), release)
+    except BaseException:
+        release()
+        raise
+
+
+async def reply(turn: Turn, messages, voice: str, audio_mode: str, user_text: str = None):
+    """Consultar el modelo y construir la respuesta (completa o en streaming)"""
+    if turn.data['stream']:
+        tokens = await stream_tokens(turn, messages)
+        first_event = {'type': 'transcript', 'user_text': user_text} if user_text else None
+        return NDJSONResponse(pipeline.stream_events(turn.session_id, tokens, voice, audio_mode, first_event),
+                              on_close=tokens.aclose)
+
+    async with services.admission.stage_async('llm', turn.deadline):
+        bot_text = await pipeline.ollama.get_response(messages, turn.model)
+    if not bot_text:
+        logger.error("No se recibió respuesta de Ollama")
+        return JSONResponse({'error': 'Error getting response from Ollama'}, 500)
+
+    await pipeline.add_bot_message(turn.session_id, bot_text)
+    if user_text is None:
+        payload = {'response': bot_text}
+        payload.update(await pipeline.render_audio(bot_text, voice, audio_mode))
+    else:
+        payload = {'user_text': user_text, 'bot_text': bot_text}
+        payload.update(await pipeline.render_audio(bot_text, voice, audio_mode, base64_key='audio_response'))
+    return JSONResponse(payload)
+
+
+async def chat(turn: Turn):
+    """Endpoint para chat de texto"""
+    message = turn.data['message']
+    if not message:
+        return JSONResponse({'error': 'No message provided'}, 400)
+
+    services.admission.check_session(turn.session_id)
+    messages = await pipeline.add_user_message(turn.session_id, message)
+    return await reply(turn, messages, turn.data['voice'], turn.data['audio_mode'])
+
+
+async def process_audio(turn: Turn):
+    """Endpoint para procesar audio"""
+    if turn.data['audio'] is None:
+        return JSONResponse({'error': 'No audio file'}, 400)
+
+    admission = services.admission
+    admission.check_ready(services.is_ready())
+    admission.check_session(turn.session_id)
+    admission.check_audio(turn.data['audio'])
+    async with admission.stage_async('transcription', turn.deadline):
+        user_text = await pipeline.transcribe(turn.data['audio'], turn.data['language'])
+    if not user_text:
+        return JSONResponse({'error': 'No se detectó texto'}, 400)
+
+    messages = await pipeline.add_user_message(turn.session_id, user_text)
+    return await reply(turn, messages, turn.data['voice'], turn.data['audio_mode'], user_text=user_text)
+
+
+ROUTES = {'/chat': chat, '/process_audio': process_audio}
+
+
+class ClientDisconnected(Exception):
+    """El cliente cerró la conexión antes de enviar la petición completa"""
+
+
+async def read_body(receive, limit: int):
+    """Leer el cuerpo completo; None si supera el límite"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ClientDisconnected()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def handle_turn(handler, scope, receive, send):
+    """
+    Ejecutar una ruta asíncrona cancelándola si el cliente se desconecta
+
+    La cancelación llega a todas las etapas: la espera por Whisper, la
+    conexión con Ollama y las síntesis de voz pendientes.
+    """
+    token = start_request()[1] if Config.SERVER_TIMING else None
+    try:
+        await run_turn(handler, scope, receive, send)
+    finally:
+        if token:
+            end_request(token)
+
+
+def content_length(scope) -> int:
+    for name, value in scope['headers']:
+        if name == b'content-length':
+            return int(value) if value.isdigit() else 0
+    return 0
+
+
+async def run_turn(handler, scope, receive, send):
+    deadline = services.admission.deadline()
+    if handler is process_audio:
+        # Rechazar por tamaño antes de leer el cuerpo
+        try:
+            services.admission.check_upload_size(content_length(scope))
+        except AdmissionRejected as e:
+            await rejected_response(e).send(send, [])
+            return
+
+    try:
+        with span('upload'):
+            body = await read_body(receive, Config.MAX_CONTENT_LENGTH)
+    except ClientDisconnected:
+        return
+    if body is None:
+        await JSONResponse({'error': 'Request too large'}, 413).send(send, [])
+        return
+
+    async def run():
+        try:
+            turn = read_turn(build_environ(scope, body))
+        except Exception as e:
+            # Como en las rutas de Flask: error en JSON, no una respuesta cortada
+            logger.error(f"Error in {scope['path']}: {e}")
+            await JSONResponse({'error': str(e)}, 500).send(send, [])
+            return
+        turn.deadline = deadline
+        try:
+            response = await handler(turn)
+        except AdmissionRejected as e:
+            response = rejected_response(e)
+        except OllamaOverloadedError as e:
+            response = overloaded_response(e)
+        except Exception as e:
+            logger.error(f"Error in {scope['path']}: {e}")
+            response = JSONResponse({'error': str(e)}, 500)
+        await response.send(send, [(b'set-cookie', c.encode('latin-1')) for c in turn.cookies])
+
+    task = asyncio.ensure_future(run())
+    watcher = asyncio.ensure_future(wait_disconnect(receive))
+    done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    if task not in done:
+        logger.info(f"Cliente desconectado, cancelando {scope['path']}")
+        task.cancel()
+    watcher.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def lifespan(receive, send):
+    """Calentar servicios al arrancar (sin bloquear) y drenar al detenerse"""
+    loop = asyncio.get_running_loop()
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if Config.MODEL_LOADING == 'preload':
+                # Con 'background' ya lo inició create_app; /readyz indica cuándo termina
+                services.start_warmup()
+            # Conexiones con el servicio de voz para el TTS que corre en este loop
+            services.tts_service.start_pool()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await pipeline.close()
+            if services.is_loaded('tts_service'):
+                await services.tts_service.close_pool()
+            await loop.run_in_executor(None, services.shutdown, Config.SHUTDOWN_DRAIN_TIMEOUT)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    elif scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] in ROUTES:
+        await handle_turn(ROUTES[scope['path']], scope, receive, send)
+    elif scope['type'] == 'websocket':
+        # El reconocimiento en streaming solo está disponible con el servidor WSGI
+        await receive()
+        await send({'type': 'websocket.close', 'code': 1003})
+    else:
+        await wsgi_app(scope, receive, send)
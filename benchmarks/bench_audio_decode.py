@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: decodificación de audio en disco vs en memoria
+
+Compara la ruta anterior (guardar la subida en un .webm temporal y dejar que
+Whisper invoque ffmpeg sobre la ruta) con la decodificación por stdin, y con
+el WAV a 16 kHz mono que sube el navegador (mu-law y PCM), que se lee sin
+ffmpeg.
+
+Uso:
+    python benchmarks/bench_audio_decode.py grabacion.webm --iterations 20
+    python benchmarks/bench_audio_decode.py grabacion.webm --transcribe --model tiny
+"""
+import argparse
+import os
+import statistics
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import whisper  # noqa: E402
+from utils.audio_decoder import decode_audio, SAMPLE_RATE  # noqa: E402
+
+
+def decode_via_tempfile(data: bytes):
+    """Ruta anterior: escribir a disco y decodificar desde la ruta"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as tmp_file:
+        tmp_file.write(data)
+        temp_path = tmp_file.name
+    try:
+        return whisper.load_audio(temp_path)
+    finally:
+        os.unlink(temp_path)
+
+
+def client_wav(audio: np.ndarray, encoding: str) -> bytes:
+    """WAV mono a 16 kHz como el que genera audio-handler.js ('mulaw' o 'pcm16')"""
+    pcm = np.clip(audio * 32768, -32768, 32767).astype(np.int32)
+    if encoding == 'mulaw':
+        sign = np.where(pcm < 0, 0x80, 0)
+        value = np.minimum(np.abs(pcm), 32635) + 0x84
+        exponent = np.maximum(np.floor(np.log2(value)).astype(np.int32) - 7, 0)
+        mantissa = (value >> (exponent + 3)) & 0x0F
+        payload = (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+        audio_format, width = 7, 1
+    else:
+        payload = pcm.astype('<i2').tobytes()
+        audio_format, width = 1, 2
+    header = struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + len(payload), b'WAVE', b'fmt ', 16,
+                         audio_format, 1, SAMPLE_RATE, SAMPLE_RATE * width, width, width * 8,
+                         b'data', len(payload))
+    return header + payload
+
+
+def measure(func, data: bytes, iterations: int):
+    """Ejecutar una función varias veces y devolver los tiempos en ms"""
+    func(data)  # Calentamiento
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func(data)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{name:<22} media {statistics.mean(timings):8.1f} ms | "
+          f"p50 {statistics.median(timings):8.1f} ms | p95 {p95:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('audio', help='Archivo de audio de prueba (webm, ogg, wav...)')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--transcribe', action='store_true', help='Incluir la transcripción completa')
+    parser.add_argument('--model', default='tiny', help='Modelo Whisper para --transcribe')
+    parser.add_argument('--language', default='es')
+    args = parser.parse_args()
+
+    with open(args.audio, 'rb') as f:
+        data = f.read()
+
+    print(f"Archivo: {args.audio} ({len(data) / 1024:.1f} KB), {args.iterations} iteraciones\n")
+
+    report("disco (tempfile)", measure(decode_via_tempfile, data, args.iterations))
+    report("memoria (stdin)", measure(decode_audio, data, args.iterations))
+
+    # Lo que subiría el navegador con el AudioWorklet: sin ffmpeg en el servidor
+    audio = decode_audio(data)
+    for encoding in ('mulaw', 'pcm16'):
+        wav = client_wav(audio, encoding)
+        report(f"cliente wav {encoding}", measure(decode_audio, wav, args.iterations))
+        print(f"{'':<22} {len(wav) / 1024:.1f} KB ({len(wav) / len(data):.0%} del original)")
+
+    if args.transcribe:
+        model = whisper.load_model(args.model)
+        print(f"\nTranscripción completa con '{args.model}':")
+        report("disco (tempfile)", measure(
+            lambda d: model.transcribe(decode_via_tempfile(d), language=args.language), data, args.iterations))
+        report("memoria (stdin)", measure(
+            lambda d: model.transcribe(decode_audio(d), language=args.language), data, args.iterations))
+
+
+if __name__ == '__main__':
+    main()
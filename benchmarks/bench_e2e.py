@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Benchmark de extremo a extremo: carga y latencia por etapa
+
+Levanta la aplicación contra un Ollama simulado (benchmarks/fake_ollama.py)
+y un edge-tts sustituto (benchmarks/stubs), con un modelo Whisper pequeño,
+y lanza peticiones a /chat y /process_audio con la concurrencia indicada.
+No necesita red ni GPU.
+
+Informa p50/p95/p99 de cada etapa (cabecera Server-Timing), la latencia
+vista por el cliente, el throughput y la memoria RSS del servidor.
+
+Uso:
+    python benchmarks/bench_e2e.py --endpoint chat --concurrency 8 --requests 200
+    python benchmarks/bench_e2e.py --endpoint process_audio --stream --server gunicorn
+    python benchmarks/bench_e2e.py --server uvicorn --env WHISPER_BATCHING=true --json resultado.json
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.webm', '.ogg', '.m4a')
+
+sys.path.insert(0, BENCH_DIR)
+
+from fake_ollama import start_fake_ollama, MODEL_NAME  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server: str, port: int):
+    """Comando para arrancar la aplicación en el modo de servidor elegido"""
+    if server == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-b', f'127.0.0.1:{port}', 'wsgi:app']
+    if server == 'uvicorn':
+        return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                '--log-level', 'warning']
+    return [sys.executable, '-c',
+            f"from app import create_app; create_app().run(host='127.0.0.1', port={port}, threaded=True)"]
+
+
+def tree_rss(pid: int):
+    """RSS en bytes del proceso y sus descendientes (Linux, /proc)"""
+    children = defaultdict(list)
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # El nombre puede contener espacios: los campos siguen al último ')'
+                fields = f.read().rsplit(')', 1)[1].split()
+            children[int(fields[1])].append(int(entry))
+        except (OSError, IndexError):
+            continue
+
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class RSSSampler:
+    """Muestrear la memoria del servidor durante la carga"""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.samples.append(tree_rss(self.pid))
+
+    def start(self):
+        if os.path.isdir('/proc'):
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def parse_server_timing(header: str):
+    """'whisper;dur=812.4, tts;dur=95.0' -> {'whisper': 812.4, 'tts': 95.0}"""
+    stages = {}
+    for item in filter(None, (part.strip() for part in (header or '').split(','))):
+        name, _, params = item.partition(';')
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'dur':
+                stages[name] = float(value)
+    return stages
+
+
+def scrape_histograms(base_url: str):
+    """Leer los histogramas de /metrics: {etapa: {límite: conteo acumulado}}"""
+    histograms = defaultdict(dict)
+    text = requests.get(f"{base_url}/metrics", timeout=10).text
+    for line in text.splitlines():
+        if not line.startswith('voice_stage_duration_seconds_bucket'):
+            continue
+        labels, value = line.rsplit(' ', 1)
+        stage = labels.split('stage="', 1)[1].split('"', 1)[0]
+        bound = labels.split('le="', 1)[1].split('"', 1)[0]
+        histograms[stage][float(bound)] = int(value)
+    return histograms
+
+
+def histogram_quantile(buckets: dict, fraction: float) -> float:
+    """Cuantil interpolado dentro del bucket, como histogram_quantile de Prometheus"""
+    bounds = sorted(buckets)
+    total = buckets[bounds[-1]]
+    rank = fraction * total
+    previous_bound, previous_count = 0.0, 0
+    for bound in bounds:
+        count = buckets[bound]
+        if count >= rank:
+            if bound == float('inf'):
+                return previous_bound
+            share = (rank - previous_count) / (count - previous_count) if count > previous_count else 0.0
+            return previous_bound + (bound - previous_bound) * share
+        previous_bound, previous_count = bound, count
+    return previous_bound
+
+
+def histogram_delta(before: dict, after: dict) -> dict:
+    """Observaciones por etapa registradas durante la carga"""
+    delta = {}
+    for stage, buckets in after.items():
+        counts = {bound: count - before.get(stage, {}).get(bound, 0) for bound, count in buckets.items()}
+        if counts.get(float('inf')):
+            delta[stage] = counts
+    return delta
+
+
+def percentile(values, fraction: float) -> float:
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def load_audio_fixtures(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(p for p in glob.glob(os.path.join(path, '*')) if p.endswith(AUDIO_EXTENSIONS)))
+        else:
+            files.append(path)
+    fixtures = []
+    for path in files:
+        with open(path, 'rb') as f:
+            fixtures.append((os.path.basename(path), f.read()))
+    return fixtures
+
+
+class LoadGenerator:
+    """Peticiones concurrentes; cada hilo mantiene su propia sesión (cookie)"""
+
+    def __init__(self, base_url: str, args, fixtures):
+        self.base_url = base_url
+        self.args = args
+        self.fixtures = fixtures
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.get(f"{self.base_url}/")
+        return session
+
+    def run_one(self, index: int) -> dict:
+        endpoint = self.args.endpoint
+        if endpoint == 'mixed':
+            endpoint = 'process_audio' if index % 2 else 'chat'
+        if endpoint == 'process_audio':
+            name, data = self.fixtures[index % len(self.fixtures)]
+            request = dict(files={'audio': (name, data)},
+                           data={'language': 'es', 'stream': 'true' if self.args.stream else 'false',
+                                 'audio_mode': self.args.audio_mode})
+        else:
+            message = random.choice(("Hola, ¿cómo estás?", "Explícame cómo funciona la aplicación.",
+                                     "¿Qué me recomiendas para el fin de semana?"))
+            request = dict(json={'message': message, 'stream': self.args.stream,
+                                 'audio_mode': self.args.audio_mode})
+
+        result = {'endpoint': endpoint, 'ok': False, 'status': None, 'stages': {}}
+        start = time.perf_counter()
+        try:
+            response = self._session().post(f"{self.base_url}/{endpoint}", stream=self.args.stream,
+                                             timeout=self.args.timeout, **request)
+            result['status'] = response.status_code
+            result['stages'] = parse_server_timing(response.headers.get('Server-Timing'))
+            if self.args.stream and response.ok:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    now = (time.perf_counter() - start) * 1000
+                    result.setdefault('ttfb', now)
+                    if event['type'] == 'audio':
+                        result.setdefault('first_audio', now)
+                    elif event['type'] == 'error':
+                        result['status'] = 'stream_error'
+                        break
+                    elif event['type'] == 'done':
+                        result['ok'] = True
+            else:
+                response.content
+                result['ttfb'] = (time.perf_counter() - start) * 1000
+                result['ok'] = response.ok
+        except requests.RequestException as e:
+            result['status'] = type(e).__name__
+        result['total'] = (time.perf_counter() - start) * 1000
+        return result
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("El servidor terminó durante el arranque")
+        try:
+            # /readyz: modelos cargados y calentados, no solo el servidor en marcha
+            if requests.get(f"{base_url}/readyz", timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("El servidor no respondió a tiempo")
+
+
+def report(results, elapsed: float, rss_samples, histograms, args) -> dict:
+    ok = [r for r in results if r['ok']]
+    errors = defaultdict(int)
+    for r in results:
+        if not r['ok']:
+            errors[str(r['status'])] += 1
+
+    series = defaultdict(list)
+    for r in ok:
+        for stage, duration in r['stages'].items():
+            series[f"stage:{stage}"].append(duration)
+        series['client:total'].append(r['total'])
+        if 'ttfb' in r:
+            series['client:ttfb'].append(r['ttfb'])
+        if 'first_audio' in r:
+            series['client:first_audio'].append(r['first_audio'])
+
+    summary = {
+        'config': {k: v for k, v in vars(args).items() if k != 'audio'},
+        'requests': len(results),
+        'ok': len(ok),
+        'errors': dict(errors),
+        'elapsed_s': elapsed,
+        'throughput_rps': len(ok) / elapsed if elapsed else 0.0,
+        'latency_ms': {},
+        'rss_bytes': {'peak': max(rss_samples), 'last': rss_samples[-1]} if rss_samples else None,
+    }
+
+    print(f"\nServidor: {args.server} | endpoint: {args.endpoint} | stream: {args.stream} | "
+          f"concurrencia: {args.concurrency}")
+    print(f"{'serie':<24}{'n':>6}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}")
+    for name in sorted(series):
+        values = series[name]
+        stats = {'n': len(values), 'p50': percentile(values, 0.50),
+                 'p95': percentile(values, 0.95), 'p99': percentile(values, 0.99)}
+        summary['latency_ms'][name] = stats
+        print(f"{name:<24}{stats['n']:>6}{stats['p50']:>11.1f}{stats['p95']:>11.1f}{stats['p99']:>11.1f}")
+
+    # En streaming Server-Timing no incluye las etapas posteriores al primer byte:
+    # los histogramas del servidor sí (estimación por buckets; con varios
+    # workers de gunicorn solo reflejan el que atendió /metrics)
+    if histograms:
+        print(f"\n{'histograma /metrics':<24}{'n':>6}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}")
+        summary['histogram_ms'] = {}
+        for stage in sorted(histograms):
+            buckets = histograms[stage]
+            stats = {'n': buckets[float('inf')]}
+            for label, fraction in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+                stats[label] = histogram_quantile(buckets, fraction) * 1000
+            summary['histogram_ms'][stage] = stats
+            print(f"{stage:<24}{stats['n']:>6}{stats['p50']:>11.1f}{stats['p95']:>11.1f}{stats['p99']:>11.1f}")
+
+    print(f"\nCompletadas: {len(ok)}/{len(results)} en {elapsed:.1f} s -> {summary['throughput_rps']:.2f} req/s")
+    if errors:
+        print(f"Errores: {dict(errors)}")
+    if summary['rss_bytes']:
+        print(f"RSS del servidor: pico {summary['rss_bytes']['peak'] / 2**20:.0f} MiB, "
+              f"final {summary['rss_bytes']['last'] / 2**20:.0f} MiB")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=('flask', 'gunicorn', 'uvicorn'), default='flask')
+    parser.add_argument('--endpoint', choices=('chat', 'process_audio', 'mixed'), default='chat')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=100, help='Peticiones medidas')
+    parser.add_argument('--warmup', type=int, default=4, help='Peticiones de calentamiento (no se miden)')
+    parser.add_argument('--stream', action='store_true', help='Usar las respuestas en streaming')
+    parser.add_argument('--audio-mode', choices=('base64', 'url'), default='base64')
+    parser.add_argument('--audio', nargs='*', default=[FIXTURES_DIR], help='Audios o directorios de prueba')
+    parser.add_argument('--whisper-model', default='tiny')
+    parser.add_argument('--token-rate', type=float, default=40.0, help='Tokens/s del Ollama simulado')
+    parser.add_argument('--ttft-ms', type=float, default=300.0, help='Tiempo al primer token simulado')
+    parser.add_argument('--tokens', type=int, default=40, help='Tokens por respuesta simulada')
+    parser.add_argument('--tts-latency-ms', type=float, default=150.0, help='Latencia base del TTS simulado')
+    parser.add_argument('--tts-cache', action='store_true', help='Mantener activa la caché de TTS')
+    parser.add_argument('--env', action='append', default=[], metavar='CLAVE=VALOR',
+                        help='Variables extra para el servidor (p. ej. WHISPER_BATCHING=true)')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--startup-timeout', type=float, default=300.0)
+    parser.add_argument('--json', help='Guardar el resumen en este archivo')
+    args = parser.parse_args()
+
+    fixtures = []
+    if args.endpoint != 'chat':
+        fixtures = load_audio_fixtures(args.audio)
+        if not fixtures:
+            parser.error("No hay audios de prueba: ejecuta benchmarks/fixtures/make_fixtures.py o usa --audio")
+
+    ollama = start_fake_ollama(0, args.token_rate, args.ttft_ms / 1000, args.tokens)
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': os.pathsep.join(filter(None, (os.path.join(BENCH_DIR, 'stubs'), ROOT_DIR,
+                                                    env.get('PYTHONPATH')))),
+        'ENABLE_HTTPS': 'false',
+        'SECRET_KEY': env.get('SECRET_KEY') or 'bench-e2e',
+        'HTTP_PORT': str(port),
+        'OLLAMA_HOST': '127.0.0.1',
+        'OLLAMA_PORT': str(ollama.server_address[1]),
+        'DEFAULT_MODEL': MODEL_NAME,
+        'WHISPER_MODEL': args.whisper_model,
+        'SERVER_TIMING': 'true',
+        'METRICS_ENABLED': 'true',
+        'BENCH_TTS_LATENCY_MS': str(args.tts_latency_ms),
+        # Cada hilo reutiliza su sesión: el límite por sesión cortaría la carga
+        'ADMISSION_SESSION_RATE': '0',
+        # El sustituto de edge-tts reemplaza Communicate; el pool de conexiones
+        # se mide aparte con bench_tts_pool.py
+        'TTS_POOL_SIZE': '0',
+    })
+    if not args.tts_cache:
+        env['TTS_CACHE_MEMORY_MB'] = '0'
+    for item in args.env:
+        key, _, value = item.partition('=')
+        env[key] = value
+
+    log = tempfile.NamedTemporaryFile(prefix='bench_server_', suffix='.log', delete=False)
+    process = subprocess.Popen(server_command(args.server, port), cwd=ROOT_DIR, env=env,
+                               stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    try:
+        print(f"Arrancando servidor ({args.server}); log en {log.name}")
+        wait_until_ready(base_url, process, args.startup_timeout)
+
+        generator = LoadGenerator(base_url, args, fixtures)
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(generator.run_one, range(args.warmup)))
+
+            before = scrape_histograms(base_url)
+            sampler = RSSSampler(process.pid)
+            sampler.start()
+            start = time.perf_counter()
+            results = list(pool.map(generator.run_one, range(args.requests)))
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+            histograms = histogram_delta(before, scrape_histograms(base_url))
+
+        summary = report(results, elapsed, sampler.samples, histograms, args)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(summary, f, indent=2)
+            print(f"Resumen guardado en {args.json}")
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+        ollama.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: limpieza de texto para TTS en varias pasadas vs normalizador
+
+Compara la limpieza anterior (cuatro re.sub sobre el texto completo) con
+utils.text_normalizer, que hace una tabla de traducción y una sola
+expresión regular, además de escribir números, unidades y abreviaturas.
+También mide el modo incremental alimentado token a token.
+
+Uso:
+    python benchmarks/bench_text_normalizer.py --iterations 2000
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.text_normalizer import normalizer_for_voice  # noqa: E402
+
+SAMPLES = {
+    "corta": "¡Claro! 😊 Con gusto te ayudo.",
+    "prosa": ("**Buena pregunta** 🤔 El reconocimiento de voz convierte tu audio en texto, "
+              "el modelo lo interpreta y genera una respuesta, y esa respuesta se sintetiza "
+              "con una voz natural para que la escuches enseguida. *asiente* ¿Algo más? 🙂"),
+    "media": ("*sonríe* El Sr. García recorrió 21 km en 1 h y 30 min (más o menos), "
+              "gastó $1,500 y llegó a las 10:30 p. m. ¿Te parece bien? 👍"),
+    "larga": ("Aquí tienes algunas ideas para tu viaje 🏔️:\n\n"
+              "1. Lleva ropa abrigadora, la temperatura puede bajar a -5 °C por la noche.\n"
+              "2. Un saco de dormir para 0 °C, una lámpara y 2 l de agua por persona.\n"
+              "3. Presupuesto aproximado: $2,500 pesos por persona, un 15% más si rentas equipo.\n"
+              "*piensa un momento* También conviene revisar el pronóstico, p. ej. en el sitio oficial, "
+              "y avisar a alguien de tu ruta (por seguridad). ¡Disfruta el 1º fin de semana del mes! 🎒") * 3,
+}
+
+
+def legacy_clean(text: str) -> str:
+    """Limpieza anterior de TTSService, cuatro pasadas"""
+    text = re.sub(r'\*[^*]+\*', '', text)
+    text = re.sub(r'[^\w\s.,;:!?¿¡áéíóúñÁÉÍÓÚÑüÜ\-]', ' ', text)
+    text = re.sub(r'\([^)]*\)', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def stream_tokens(normalizer, tokens):
+    """Alimentar el normalizador incremental token a token"""
+    stream = normalizer.stream()
+    return ''.join(stream.feed(token) for token in tokens) + stream.flush()
+
+
+def measure(func, iterations: int):
+    """Ejecutar una función varias veces y devolver los tiempos en µs"""
+    func()  # Calentamiento
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    return timings
+
+
+def report(name: str, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"  {name:<20} media {statistics.mean(timings):8.1f} µs | "
+          f"p50 {statistics.median(timings):8.1f} µs | p95 {p95:8.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--voice', default='es-MX-DaliaNeural')
+    parser.add_argument('--show', action='store_true', help='Mostrar el texto resultante')
+    args = parser.parse_args()
+
+    normalizer = normalizer_for_voice(args.voice)
+
+    for name, text in SAMPLES.items():
+        # Tokens parecidos a los de Ollama: palabra con su espacio
+        tokens = re.findall(r'\S+\s*|\s+', text)
+        print(f"{name} ({len(text)} caracteres, {len(tokens)} tokens)")
+        report("anterior (4 pasadas)", measure(lambda: legacy_clean(text), args.iterations))
+        report("normalizador", measure(lambda: normalizer.normalize(text), args.iterations))
+        report("incremental", measure(lambda: stream_tokens(normalizer, tokens), args.iterations))
+        if args.show:
+            print(f"  anterior:     {legacy_clean(text)!r}")
+            print(f"  normalizador: {normalizer.normalize(text)!r}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
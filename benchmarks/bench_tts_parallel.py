@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: síntesis de respuestas largas en una llamada vs por oraciones
+
+Mide el tiempo de TTSService.synthesize() sobre una respuesta de varios
+párrafos con TTS_PARALLEL_SENTENCES = 1 (una sola llamada a edge-tts) y con
+varias oraciones en vuelo. Usa el edge-tts sustituto de benchmarks/stubs,
+cuya latencia crece con la longitud del texto como la del servicio real;
+con --real se usa edge-tts de verdad (requiere red).
+
+Uso:
+    python benchmarks/bench_tts_parallel.py --parallel 1 2 4 8 --iterations 5
+    BENCH_TTS_MS_PER_CHAR=8 python benchmarks/bench_tts_parallel.py
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+if '--real' not in sys.argv:
+    sys.path.insert(0, os.path.join(BENCH_DIR, 'stubs'))
+
+from services.tts_cache import TTSCache  # noqa: E402
+from services.tts_service import TTSService  # noqa: E402
+
+REPLY = (
+    "Para preparar un viaje de fin de semana a la montaña conviene empezar por la ropa. "
+    "Lleva varias capas, porque por la mañana hace frío y a mediodía puede hacer calor. "
+    "Una chaqueta impermeable es imprescindible si hay pronóstico de lluvia.\n\n"
+    "En cuanto al equipo, necesitarás una tienda adecuada para la temporada y un saco de dormir abrigador. "
+    "No olvides una lámpara frontal con pilas de repuesto y un botiquín básico. "
+    "El agua es lo más importante, calcula al menos dos litros por persona y por día.\n\n"
+    "Para la comida, elige alimentos ligeros que no necesiten refrigeración. "
+    "Las frutas secas, el pan y las latas son prácticos y aguantan bien el transporte. "
+    "Si vas a cocinar, revisa antes que el hornillo funcione y que tengas suficiente combustible.\n\n"
+    "Por último, avisa a alguien de tu ruta y de la hora a la que piensas volver. "
+    "Consulta el estado de los caminos y respeta las indicaciones del parque. "
+    "Así podrás disfrutar del paisaje con tranquilidad."
+)
+
+
+def measure(service: TTSService, text: str, iterations: int):
+    """Sintetizar varias veces y devolver los tiempos en ms"""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        audio = service.synthesize(text)
+        timings.append((time.perf_counter() - start) * 1000)
+        if audio is None:
+            raise RuntimeError("La síntesis falló")
+    return timings, len(audio)
+
+
+def report(name: str, timings, size: int):
+    print(f"{name:<28} media {statistics.mean(timings):8.1f} ms | "
+          f"p50 {statistics.median(timings):8.1f} ms | máx {max(timings):8.1f} ms | {size / 1024:6.1f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parallel', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Valores de TTS_PARALLEL_SENTENCES a comparar')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--voice', default='es-MX-DaliaNeural')
+    parser.add_argument('--real', action='store_true', help='Usar edge-tts real en lugar del sustituto')
+    args = parser.parse_args()
+
+    print(f"Respuesta de {len(REPLY)} caracteres, {args.iterations} iteraciones\n")
+
+    for parallel in args.parallel:
+        # Sin caché: cada iteración sintetiza todo
+        service = TTSService(args.voice, parallel_sentences=parallel, timeout=120)
+        try:
+            report(f"{parallel} en vuelo", *measure(service, REPLY, args.iterations))
+        finally:
+            service.shutdown()
+
+    # Con caché por oración: una respuesta nueva que repite oraciones ya dichas
+    service = TTSService(args.voice, parallel_sentences=max(args.parallel), timeout=120,
+                         cache=TTSCache(max_memory_bytes=64 * 1024 * 1024))
+    try:
+        service.synthesize(REPLY)
+        variant = REPLY + "\n\n¿Quieres que te ayude con algo más?"
+        report(f"{max(args.parallel)} en vuelo, caché caliente", *measure(service, variant, 1))
+    finally:
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
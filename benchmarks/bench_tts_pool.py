@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: síntesis con conexión nueva por petición vs pool de conexiones
+
+Arranca el servicio de voz simulado (fake_tts_server.py) y sintetiza
+oraciones con EdgeTTSPool de distintos tamaños. Con tamaño 0 cada síntesis
+abre y cierra su propio WebSocket, como edge_tts.Communicate; con pool las
+conexiones ya están abiertas y se reutilizan. --connect-ms fija el coste
+simulado de abrir una conexión (handshake TLS incluido).
+
+Uso:
+    python benchmarks/bench_tts_pool.py --requests 100 --concurrency 4 --connect-ms 250
+    python benchmarks/bench_tts_pool.py --pool-sizes 0,1,2,4 --idle-timeout 2 --pause 3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_tts_server import FakeTTSServer  # noqa: E402
+from services.tts_pool import EdgeTTSPool  # noqa: E402
+
+SENTENCES = [
+    "Claro, te explico cómo funciona.",
+    "El sistema transcribe tu voz y la envía al modelo.",
+    "Después el modelo responde y la respuesta se convierte en audio.",
+    "Todo ocurre en unos pocos segundos si el servidor no está saturado.",
+]
+
+
+async def run(pool: EdgeTTSPool, args) -> list:
+    """Lanzar `requests` síntesis con `concurrency` en vuelo; latencias en s"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one(index: int):
+        async with semaphore:
+            start = time.perf_counter()
+            audio = await pool.synthesize(SENTENCES[index % len(SENTENCES)], args.voice)
+            latencies.append(time.perf_counter() - start)
+            if not audio:
+                raise RuntimeError("Síntesis sin audio")
+
+    half = args.requests // 2 if args.pause else args.requests
+    await asyncio.gather(*(one(i) for i in range(half)))
+    if args.pause:
+        # Con --idle-timeout el servidor cierra las conexiones libres entretanto
+        await asyncio.sleep(args.pause)
+        await asyncio.gather(*(one(i) for i in range(half, args.requests)))
+    return latencies
+
+
+async def bench(size: int, server: FakeTTSServer, args):
+    pool = EdgeTTSPool(size=size, url=server.url, check_interval=1.0)
+    pool.start()
+    # Medir en régimen: esperar a que el pool esté caliente
+    while pool.get_stats()['idle'] < size:
+        await asyncio.sleep(0.05)
+
+    connections = server.connections
+    start = time.perf_counter()
+    latencies = sorted(await run(pool, args))
+    elapsed = time.perf_counter() - start
+    stats = pool.get_stats()
+    await pool.close()
+
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    label = "sin pool" if size == 0 else f"pool de {size}"
+    print(f"{label:<12} p50 {statistics.median(latencies) * 1000:7.1f} ms | p95 {p95 * 1000:7.1f} ms | "
+          f"{len(latencies) / elapsed:6.1f} síntesis/s | conexiones abiertas {server.connections - connections:4d} | "
+          f"reutilizadas {stats['reused']:4d} | descartadas {stats['discarded']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pool-sizes', default='0,2,4', help='Tamaños a comparar (0 = conexión por síntesis)')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--connect-ms', type=float, default=250.0, help='Coste simulado de abrir una conexión')
+    parser.add_argument('--latency-ms', type=float, default=150.0, help='Latencia simulada hasta el primer audio')
+    parser.add_argument('--idle-timeout', type=float, default=0.0,
+                        help='El servidor cierra conexiones inactivas tras estos segundos')
+    parser.add_argument('--pause', type=float, default=0.0, help='Pausa a mitad de la prueba (s)')
+    parser.add_argument('--voice', default='es-MX-DaliaNeural')
+    args = parser.parse_args()
+
+    server = FakeTTSServer(connect_ms=args.connect_ms, latency_ms=args.latency_ms,
+                           idle_timeout=args.idle_timeout)
+    print(f"{args.requests} síntesis, {args.concurrency} a la vez, conexión {args.connect_ms:.0f} ms, "
+          f"latencia {args.latency_ms:.0f} ms\n")
+    for size in args.pool_sizes.split(','):
+        asyncio.run(bench(int(size), server, args))
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: precisión y latencia de los backends de Whisper
+
+Transcribe los audios de benchmarks/fixtures con cada combinación
+backend:compute_type y compara el texto con la frase original (WER, sin
+mayúsculas, signos ni tildes). La latencia es la de transcribe() sobre el
+audio ya decodificado; RTF = latencia / duración del audio.
+
+Uso:
+    python benchmarks/fixtures/make_fixtures.py   # una sola vez
+    python benchmarks/bench_whisper_backends.py --model base --iterations 5
+    python benchmarks/bench_whisper_backends.py --backends openai:default,openai:int8,faster-whisper:int8
+"""
+import argparse
+import glob
+import os
+import re
+import statistics
+import sys
+import time
+import unicodedata
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, FIXTURES_DIR)
+
+from make_fixtures import PHRASES  # noqa: E402
+from services.whisper_backends import load_backend  # noqa: E402
+from utils.audio_decoder import decode_audio, SAMPLE_RATE  # noqa: E402
+
+
+def normalize(text: str) -> list:
+    """Palabras en minúsculas, sin signos de puntuación ni tildes"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^\w\s]", ' ', text).split()
+
+
+def word_errors(reference: list, hypothesis: list) -> int:
+    """Distancia de edición por palabras (sustituciones + inserciones + borrados)"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+
+def load_fixtures(paths):
+    fixtures = []
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'rb') as f:
+            audio = decode_audio(f.read())
+        fixtures.append((name, audio, PHRASES.get(name)))
+    return fixtures
+
+
+def run_backend(spec: str, args, fixtures):
+    backend_name, _, compute_type = spec.partition(':')
+    start = time.perf_counter()
+    try:
+        backend = load_backend(backend_name, args.model, compute_type or 'default', device=args.device)
+    except (ImportError, ValueError) as e:
+        print(f"{spec:<26} no disponible: {e}")
+        return
+    load_seconds = time.perf_counter() - start
+
+    # Calentamiento: la primera inferencia inicializa kernels y cachés
+    backend.transcribe(fixtures[0][1], args.language)
+
+    errors = words = 0
+    latencies, rtfs = [], []
+    for name, audio, reference in fixtures:
+        timings = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            text = backend.transcribe(audio, args.language)
+            timings.append(time.perf_counter() - start)
+        latencies.extend(timings)
+        rtfs.append(statistics.median(timings) / (len(audio) / SAMPLE_RATE))
+        if reference:
+            errors += word_errors(normalize(reference), normalize(text))
+            words += len(normalize(reference))
+        if args.verbose:
+            print(f"    {name}: {text}")
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    wer = f"{errors / words:6.1%}" if words else "     -"
+    print(f"{spec:<26} carga {load_seconds:6.1f} s | p50 {statistics.median(latencies) * 1000:7.0f} ms | "
+          f"p95 {p95 * 1000:7.0f} ms | RTF {statistics.mean(rtfs):5.2f} | WER {wer}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', default='openai:default,openai:int8,faster-whisper:int8',
+                        help='Lista backend:compute_type separada por comas')
+    parser.add_argument('--model', default='base')
+    parser.add_argument('--device', default=None, help='cpu, cuda (por defecto, el que elija cada backend)')
+    parser.add_argument('--language', default='es')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--audio', nargs='*', help='Audios propios (por defecto, benchmarks/fixtures)')
+    parser.add_argument('--verbose', action='store_true', help='Mostrar cada transcripción')
+    args = parser.parse_args()
+
+    paths = args.audio or sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.mp3')))
+    if not paths:
+        parser.error("No hay audios de prueba: ejecuta benchmarks/fixtures/make_fixtures.py o usa --audio")
+    fixtures = load_fixtures(paths)
+
+    total = sum(len(audio) for _, audio, _ in fixtures) / SAMPLE_RATE
+    print(f"Modelo {args.model}, {len(fixtures)} audios ({total:.1f} s), {args.iterations} iteraciones\n")
+    for spec in args.backends.split(','):
+        run_backend(spec.strip(), args, fixtures)
+
+
+if __name__ == '__main__':
+    main()
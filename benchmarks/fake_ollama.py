@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita la API de Ollama para los benchmarks
+
+Responde /api/tags y /api/chat (con y sin streaming) generando tokens a un
+ritmo configurable, sin modelo ni GPU.
+
+Uso:
+    python benchmarks/fake_ollama.py --port 11434 --token-rate 40 --ttft-ms 300
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODEL_NAME = "bench"
+
+# Texto de la respuesta: oraciones completas para que el TTS por oraciones actúe
+_WORDS = ("Claro, te explico cómo funciona. El sistema transcribe tu voz y la envía al modelo. "
+          "Después el modelo responde y la respuesta se convierte en audio. "
+          "Todo ocurre en unos pocos segundos si el servidor no está saturado.").split()
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": MODEL_NAME, "size": 0}]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if self.path != "/api/chat":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        settings = self.server.settings
+        tokens = list(itertools.islice(itertools.cycle(_WORDS), settings["tokens"]))
+        interval = 1.0 / settings["token_rate"]
+        time.sleep(settings["ttft"])
+
+        if not body.get("stream", True):
+            time.sleep(interval * (len(tokens) - 1))
+            self._send_json({"model": MODEL_NAME, "message": {"role": "assistant", "content": " ".join(tokens)},
+                             "done": True})
+            return
+
+        # Streaming NDJSON con transferencia chunked, como Ollama
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for index, token in enumerate(tokens):
+                if index:
+                    time.sleep(interval)
+                self._write_chunk({"model": MODEL_NAME, "message": {"role": "assistant", "content": token + " "},
+                                   "done": False})
+            self._write_chunk({"model": MODEL_NAME, "message": {"role": "assistant", "content": ""}, "done": True})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente canceló la generación
+            self.close_connection = True
+
+    def _write_chunk(self, payload: dict):
+        data = json.dumps(payload).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_fake_ollama(port: int = 0, token_rate: float = 40.0, ttft: float = 0.3,
+                      tokens: int = 40) -> ThreadingHTTPServer:
+    """Arrancar el servidor en un hilo; server.server_address[1] es el puerto"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeOllamaHandler)
+    server.daemon_threads = True
+    server.settings = {"token_rate": token_rate, "ttft": ttft, "tokens": tokens}
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--token-rate', type=float, default=40.0, help='Tokens por segundo')
+    parser.add_argument('--ttft-ms', type=float, default=300.0, help='Tiempo hasta el primer token')
+    parser.add_argument('--tokens', type=int, default=40, help='Tokens por respuesta')
+    args = parser.parse_args()
+
+    server = start_fake_ollama(args.port, args.token_rate, args.ttft_ms / 1000, args.tokens)
+    print(f"Ollama simulado en http://127.0.0.1:{server.server_address[1]} (modelo '{MODEL_NAME}')")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
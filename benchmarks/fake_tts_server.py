@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Servidor WebSocket local que imita el servicio de voz de Edge
+
+Habla el mismo protocolo que edge-tts (speech.config, ssml, turn.start,
+audio binario y turn.end) y admite varias síntesis por conexión. Simula el
+coste de abrir la conexión (handshake TLS incluido) y el de sintetizar, y
+devuelve un MP3 de tamaño proporcional al texto. Con --idle-timeout cierra
+las conexiones inactivas, como el servicio real.
+
+Uso:
+    python benchmarks/fake_tts_server.py --port 8765 --connect-ms 250
+    TTS_POOL_URL="ws://127.0.0.1:8765/edge/v1?TrustedClientToken=bench" python app.py
+"""
+import argparse
+import asyncio
+import re
+import threading
+import time
+
+from aiohttp import web, WSMsgType
+
+# Cabecera de trama MPEG-1 Layer III, 48 kbps, 24 kHz
+_FRAME = b'\xff\xf3\x64\xc4' + bytes(140)
+_SSML_TEXT = re.compile(r"<prosody[^>]*>(.*)</prosody>", re.S)
+
+
+def _headers(message: str) -> dict:
+    head = message.split('\r\n\r\n', 1)[0]
+    return dict(line.split(':', 1) for line in head.split('\r\n') if ':' in line)
+
+
+class FakeTTSServer:
+    """Servidor en un hilo propio; `url` es la dirección para TTS_POOL_URL"""
+
+    def __init__(self, port: int = 0, connect_ms: float = 250.0, latency_ms: float = 150.0,
+                 ms_per_char: float = 2.0, bytes_per_char: int = 400, idle_timeout: float = 0.0):
+        self.connect_delay = connect_ms / 1000
+        self.latency = latency_ms / 1000
+        self.per_char = ms_per_char / 1000
+        self.bytes_per_char = bytes_per_char
+        self.idle_timeout = idle_timeout
+        self.connections = 0
+        self.requests = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._port = port
+        threading.Thread(target=self._run, name="fake-tts", daemon=True).start()
+        self._ready.wait()
+        self.url = f"ws://127.0.0.1:{self.port}/edge/v1?TrustedClientToken=bench"
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get('/edge/v1', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, '127.0.0.1', self._port)
+        self._loop.run_until_complete(site.start())
+        self.port = self._runner.addresses[0][1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        # Coste de abrir la conexión: DNS, TCP, TLS y upgrade
+        await asyncio.sleep(self.connect_delay)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+
+        while True:
+            try:
+                message = await asyncio.wait_for(ws.receive(), self.idle_timeout or None)
+            except asyncio.TimeoutError:
+                await ws.close()
+                break
+            if message.type != WSMsgType.TEXT:
+                break
+            headers = _headers(message.data)
+            if headers.get('Path') == 'ssml':
+                match = _SSML_TEXT.search(message.data)
+                await self._synthesize(ws, headers.get('X-RequestId', ''), match.group(1) if match else '')
+        return ws
+
+    async def _synthesize(self, ws: web.WebSocketResponse, request_id: str, text: str):
+        self.requests += 1
+        prefix = f"X-RequestId:{request_id}\r\nX-Timestamp:{time.time()}\r\n"
+        await ws.send_str(f"{prefix}Content-Type:application/json; charset=utf-8\r\nPath:turn.start\r\n\r\n{{}}")
+        await asyncio.sleep(self.latency)
+
+        size = max(len(text) * self.bytes_per_char, len(_FRAME))
+        frames = _FRAME * (size // len(_FRAME))
+        header = f"{prefix}Content-Type:audio/mpeg\r\nPath:audio\r\n".encode()
+        chunk_size = 4096
+        chunk_delay = self.per_char * len(text) / max(1, len(frames) // chunk_size)
+        for offset in range(0, len(frames), chunk_size):
+            await asyncio.sleep(chunk_delay)
+            await ws.send_bytes(len(header).to_bytes(2, 'big') + header + frames[offset:offset + chunk_size])
+
+        await ws.send_str(f"{prefix}Content-Type:application/json; charset=utf-8\r\nPath:turn.end\r\n\r\n{{}}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--connect-ms', type=float, default=250.0, help='Coste de abrir una conexión')
+    parser.add_argument('--latency-ms', type=float, default=150.0, help='Latencia hasta el primer audio')
+    parser.add_argument('--ms-per-char', type=float, default=2.0)
+    parser.add_argument('--idle-timeout', type=float, default=0.0, help='Cerrar conexiones inactivas (s, 0 = nunca)')
+    args = parser.parse_args()
+
+    server = FakeTTSServer(args.port, args.connect_ms, args.latency_ms, args.ms_per_char,
+                           idle_timeout=args.idle_timeout)
+    print(f"Servicio de voz simulado en {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
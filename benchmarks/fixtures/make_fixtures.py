@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Generar los audios de prueba de los benchmarks (requiere red una sola vez)
+
+Sintetiza frases en español con edge-tts y las guarda en este directorio.
+Los archivos resultantes se versionan para que los benchmarks no dependan
+de la red. Cualquier grabación propia (webm, ogg, wav, mp3) sirve igual.
+
+Uso:
+    python benchmarks/fixtures/make_fixtures.py
+"""
+import asyncio
+import os
+
+import edge_tts
+
+FIXTURES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PHRASES = {
+    "corta": "Hola, ¿cómo estás?",
+    "media": "¿Me puedes explicar cómo funciona el reconocimiento de voz en esta aplicación?",
+    "larga": ("Estoy planeando un viaje de fin de semana a la montaña con unos amigos. "
+              "¿Qué cosas debería llevar si va a hacer frío por la noche y queremos acampar?"),
+}
+
+
+async def main():
+    for name, text in PHRASES.items():
+        path = os.path.join(FIXTURES_DIR, f"{name}.mp3")
+        await edge_tts.Communicate(text, "es-MX-JorgeNeural").save(path)
+        print(f"{path}: {os.path.getsize(path)} bytes")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+"""
+Sustituto de edge-tts para los benchmarks (sin red)
+
+Se antepone al PYTHONPATH del servidor bajo prueba. Simula la latencia del
+servicio y devuelve un MP3 de tamaño proporcional al texto:
+
+    BENCH_TTS_LATENCY_MS    latencia base por petición (150)
+    BENCH_TTS_MS_PER_CHAR   latencia adicional por carácter (2)
+    BENCH_TTS_BYTES_PER_CHAR tamaño del audio por carácter (400)
+"""
+import asyncio
+import os
+
+_LATENCY = float(os.getenv('BENCH_TTS_LATENCY_MS', '150')) / 1000
+_PER_CHAR = float(os.getenv('BENCH_TTS_MS_PER_CHAR', '2')) / 1000
+_BYTES_PER_CHAR = int(os.getenv('BENCH_TTS_BYTES_PER_CHAR', '400'))
+
+# Cabecera de trama MPEG-1 Layer III, 48 kbps, 24 kHz
+_FRAME = b'\xff\xf3\x64\xc4' + bytes(140)
+
+
+class Communicate:
+    def __init__(self, text: str, voice: str = "", **kwargs):
+        self.text = text
+        self.voice = voice
+
+    async def stream(self):
+        await asyncio.sleep(_LATENCY)
+        size = max(len(self.text) * _BYTES_PER_CHAR, len(_FRAME))
+        frames = _FRAME * (size // len(_FRAME))
+        # Entregar en varios fragmentos, como el servicio real
+        chunk_size = 4096
+        chunk_delay = _PER_CHAR * len(self.text) / max(1, len(frames) // chunk_size)
+        for offset in range(0, len(frames), chunk_size):
+            await asyncio.sleep(chunk_delay)
+            yield {"type": "audio", "data": frames[offset:offset + chunk_size]}
+        yield {"type": "WordBoundary", "offset": 0, "duration": 0, "text": self.text}
+
+    async def save(self, path: str):
+        with open(path, 'wb') as f:
+            async for chunk in self.stream():
+                if chunk["type"] == "audio":
+                    f.write(chunk["data"])
+
+
+async def list_voices():
+    return []
@@ -7,7 +7,7 @@ class Config:
     """Configuración principal de la aplicación"""
     
     # Configuración de Flask
-    SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
+    SECRET_KEY = os.getenv('SECRET_KEY', '')  # Obligatoria fuera de DEBUG
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max
     
     # Configuración de Ollama
@@ -15,16 +15,52 @@ class Config:
     OLLAMA_PORT = os.getenv('OLLAMA_PORT', '11434')
     DEFAULT_MODEL = os.getenv('OLLAMA_MODEL', 'llama2:7b')
     OLLAMA_TIMEOUT = 60
+    OLLAMA_POOL_SIZE = int(os.getenv('OLLAMA_POOL_SIZE', '20'))  # Conexiones keep-alive
+    OLLAMA_MAX_CONCURRENCY = int(os.getenv('OLLAMA_MAX_CONCURRENCY', '4'))  # Peticiones simultáneas por modelo
+    OLLAMA_MAX_QUEUE = int(os.getenv('OLLAMA_MAX_QUEUE', '16'))  # Peticiones en espera por modelo
+    OLLAMA_QUEUE_TIMEOUT = float(os.getenv('OLLAMA_QUEUE_TIMEOUT', '30'))  # Segundos máximos en cola
+    OLLAMA_RETRY_AFTER = int(os.getenv('OLLAMA_RETRY_AFTER', '5'))  # Valor de Retry-After en 503
+    OLLAMA_MODELS_TTL = float(os.getenv('OLLAMA_MODELS_TTL', '30'))  # Vigencia del catálogo de modelos
+    OLLAMA_MODELS_ERROR_TTL = float(os.getenv('OLLAMA_MODELS_ERROR_TTL', '3'))  # Segundos hasta reintentar tras un fallo
+    OLLAMA_MODELS_REFRESH_INTERVAL = float(os.getenv('OLLAMA_MODELS_REFRESH_INTERVAL', '15'))  # 0 = sin refresco
+    OLLAMA_TEMPERATURE = os.getenv('OLLAMA_TEMPERATURE', '')  # Vacío = la del modelo
+    OLLAMA_RESPONSE_CACHE_TTL = float(os.getenv('OLLAMA_RESPONSE_CACHE_TTL', '0'))  # Segundos; solo con temperatura 0 (0 = sin caché)
+    OLLAMA_RESPONSE_CACHE_SIZE = int(os.getenv('OLLAMA_RESPONSE_CACHE_SIZE', '256'))  # Respuestas guardadas
+    SINGLE_FLIGHT_ENABLED = os.getenv('SINGLE_FLIGHT_ENABLED', 'true').lower() == 'true'  # Agrupar llamadas idénticas a Ollama y TTS
     
     # Configuración de Whisper
     WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'base')
     WHISPER_LANGUAGE = os.getenv('WHISPER_LANGUAGE', 'es')
     WHISPER_DEVICE = os.getenv('WHISPER_DEVICE', 'cuda')
+    WHISPER_BACKEND = os.getenv('WHISPER_BACKEND', 'openai')  # openai o faster-whisper (CTranslate2, opcional)
+    WHISPER_COMPUTE_TYPE = os.getenv('WHISPER_COMPUTE_TYPE', 'default')  # default, float32, int8 (int8: solo CPU en openai)
+    WHISPER_IN_MEMORY_DECODE = os.getenv('WHISPER_IN_MEMORY_DECODE', 'true').lower() == 'true'
+    WHISPER_BATCHING = os.getenv('WHISPER_BATCHING', 'false').lower() == 'true'
+    WHISPER_BATCH_SIZE = int(os.getenv('WHISPER_BATCH_SIZE', '8'))
+    WHISPER_BATCH_WINDOW_MS = float(os.getenv('WHISPER_BATCH_WINDOW_MS', '50'))  # Espera para formar un lote
+    WHISPER_BATCH_WORKERS = int(os.getenv('WHISPER_BATCH_WORKERS', '1'))  # Hilos que ejecutan el modelo (lotes y faster-whisper)
+    WHISPER_PROCESSES = int(os.getenv('WHISPER_PROCESSES', '0'))  # Pool multiproceso en CPU (0 = desactivado)
+    WHISPER_THREADS_PER_WORKER = int(os.getenv('WHISPER_THREADS_PER_WORKER', '1'))  # Hilos de torch por proceso
     
     # Configuración de TTS
     TTS_VOICE = os.getenv('TTS_VOICE', 'es-MX-DaliaNeural')
-    TTS_RATE = float(os.getenv('TTS_RATE', '1.0'))
-    TTS_PITCH = float(os.getenv('TTS_PITCH', '1.0'))
+    TTS_RATE = float(os.getenv('TTS_RATE', '1.0'))  # Multiplicador de velocidad (1.2 = +20%)
+    TTS_PITCH = float(os.getenv('TTS_PITCH', '1.0'))  # Multiplicador de tono (1.2 = +20 Hz)
+    TTS_TIMEOUT = float(os.getenv('TTS_TIMEOUT', '30'))  # Segundos máximos por síntesis
+    TTS_STREAM_WORKERS = int(os.getenv('TTS_STREAM_WORKERS', '2'))  # Síntesis en paralelo al streaming
+    TTS_PARALLEL_SENTENCES = int(os.getenv('TTS_PARALLEL_SENTENCES', '4'))  # Respuestas largas: oraciones a la vez (1 = no dividir)
+    TTS_PARALLEL_MIN_CHARS = int(os.getenv('TTS_PARALLEL_MIN_CHARS', '300'))  # Caracteres mínimos para dividir
+    TTS_POOL_SIZE = int(os.getenv('TTS_POOL_SIZE', '0'))  # Conexiones calientes con edge-tts (0 = una por síntesis)
+    TTS_POOL_MAX_IDLE = float(os.getenv('TTS_POOL_MAX_IDLE', '60'))  # Segundos antes de renovar una conexión libre
+    TTS_POOL_RECEIVE_TIMEOUT = float(os.getenv('TTS_POOL_RECEIVE_TIMEOUT', '10'))  # Segundos máximos entre mensajes del servicio
+    TTS_POOL_URL = os.getenv('TTS_POOL_URL', '')  # Vacío = servicio de Edge (otra URL: servidor simulado)
+    TTS_CACHE_MEMORY_MB = int(os.getenv('TTS_CACHE_MEMORY_MB', '32'))  # 0 = sin caché
+    TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', '')  # Vacío = sin nivel en disco
+    TTS_CACHE_DISK_MB = int(os.getenv('TTS_CACHE_DISK_MB', '256'))
+    AUDIO_RESPONSE_MODE = os.getenv('AUDIO_RESPONSE_MODE', 'base64')  # 'base64' o 'url' (/audio/<id>)
+    AUDIO_STORE_TTL = float(os.getenv('AUDIO_STORE_TTL', '300'))  # Segundos que se conserva cada audio
+    AUDIO_STORE_MAX_MB = int(os.getenv('AUDIO_STORE_MAX_MB', '64'))
+    AUDIO_STORE_DIR = os.getenv('AUDIO_STORE_DIR', '')  # Vacío = en memoria (solo lo sirve el worker que lo generó)
     
     # Configuración del servidor
     SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
@@ -33,14 +69,63 @@ class Config:
     ENABLE_HTTPS = os.getenv('ENABLE_HTTPS', 'true').lower() == 'true'
     
     # Configuración de límites
-    MAX_RECORDING_DURATION = int(os.getenv('MAX_RECORDING_DURATION', '60'))
+    MAX_RECORDING_DURATION = int(os.getenv('MAX_RECORDING_DURATION', '60'))  # Segundos; se comprueba antes de decodificar
     MAX_RESPONSE_LENGTH = int(os.getenv('MAX_RESPONSE_LENGTH', '2000'))
-    MAX_CONVERSATION_LENGTH = 20
+    MAX_CONVERSATION_LENGTH = int(os.getenv('MAX_CONVERSATION_LENGTH', '2048'))  # Presupuesto de tokens del historial
+    CONVERSATION_SUMMARY_TOKENS = int(os.getenv('CONVERSATION_SUMMARY_TOKENS', '256'))  # Tokens reservados al resumen
+    CONVERSATION_TTL = float(os.getenv('CONVERSATION_TTL', '1800'))  # Segundos de inactividad antes de expirar
+    CONVERSATION_MAX_MEMORY_MB = int(os.getenv('CONVERSATION_MAX_MEMORY_MB', '64'))  # Límite global del historial
+    CONVERSATION_STORE = os.getenv('CONVERSATION_STORE', 'memory')  # memory, sqlite o redis
+    CONVERSATION_SQLITE_PATH = os.getenv('CONVERSATION_SQLITE_PATH', 'data/conversations.db')
+    CONVERSATION_REDIS_URL = os.getenv('CONVERSATION_REDIS_URL', 'redis://localhost:6379/0')
+    CONVERSATION_READBACK_TURNS = int(os.getenv('CONVERSATION_READBACK_TURNS', '40'))  # Mensajes sin resumir leídos por turno
+    CONVERSATION_BATCH_SIZE = int(os.getenv('CONVERSATION_BATCH_SIZE', '64'))  # Escrituras por commit
+    CONVERSATION_FLUSH_INTERVAL_MS = float(os.getenv('CONVERSATION_FLUSH_INTERVAL_MS', '20'))
+    
+    # Control de admisión (/chat y /process_audio), por proceso
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+    ADMISSION_MAX_AUDIO_MB = float(os.getenv('ADMISSION_MAX_AUDIO_MB', '4'))  # Audio más grande: 413 sin leerlo
+    ADMISSION_TRANSCRIPTION_CONCURRENCY = int(os.getenv('ADMISSION_TRANSCRIPTION_CONCURRENCY', '2'))  # Decodificación + Whisper
+    ADMISSION_TRANSCRIPTION_QUEUE = int(os.getenv('ADMISSION_TRANSCRIPTION_QUEUE', '8'))  # En espera; más allá, 503
+    ADMISSION_LLM_CONCURRENCY = int(os.getenv('ADMISSION_LLM_CONCURRENCY', '8'))  # Llamadas al modelo (todas las rutas)
+    ADMISSION_LLM_QUEUE = int(os.getenv('ADMISSION_LLM_QUEUE', '16'))  # En espera; más allá, 503
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '10'))  # Segundos máximos en cola por etapa
+    ADMISSION_DEADLINE = float(os.getenv('ADMISSION_DEADLINE', '15'))  # Segundos máximos en colas por petición
+    ADMISSION_SESSION_RATE = float(os.getenv('ADMISSION_SESSION_RATE', '20'))  # Peticiones por minuto y sesión (0 = sin límite)
+    ADMISSION_SESSION_BURST = int(os.getenv('ADMISSION_SESSION_BURST', '5'))
+    ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '2'))  # Valor de Retry-After en 429/503
     
     # Configuración de audio
     SILENCE_THRESHOLD = int(os.getenv('SILENCE_THRESHOLD', '500'))
     SILENCE_DURATION = float(os.getenv('SILENCE_DURATION', '1.5'))
     
+    # Detección de voz en el servidor (usa SILENCE_THRESHOLD y SILENCE_DURATION)
+    VAD_ENABLED = os.getenv('VAD_ENABLED', 'true').lower() == 'true'
+    VAD_PADDING_MS = int(os.getenv('VAD_PADDING_MS', '200'))  # Margen alrededor de cada tramo
+    VAD_MIN_SPEECH_MS = int(os.getenv('VAD_MIN_SPEECH_MS', '250'))  # Tramos más cortos se descartan
+    VAD_SPLIT_SECONDS = float(os.getenv('VAD_SPLIT_SECONDS', '30'))  # Clips más largos se dividen
+    
+    # Reconocimiento en streaming (WebSocket)
+    STREAM_PARTIAL_INTERVAL = float(os.getenv('STREAM_PARTIAL_INTERVAL', '1.0'))  # Segundos entre parciales
+    STREAM_MAX_WINDOW = float(os.getenv('STREAM_MAX_WINDOW', '15'))  # Ventana máxima antes de consolidar
+    STREAM_OVERLAP = float(os.getenv('STREAM_OVERLAP', '0.5'))  # Solapamiento entre ventanas
+    STREAM_RECEIVE_TIMEOUT = float(os.getenv('STREAM_RECEIVE_TIMEOUT', '10'))  # Segundos sin datos antes de cerrar el WebSocket
+    
+    # Servidor de producción (gunicorn)
+    MODEL_LOADING = os.getenv('MODEL_LOADING', 'background').lower()  # background (en un hilo), preload (antes del fork) o lazy (al primer uso)
+    GUNICORN_WORKERS = int(os.getenv('GUNICORN_WORKERS', '2'))
+    GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', '8'))  # Hilos por worker (clase gthread)
+    SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', '30'))  # Espera a transcripciones en curso
+    
+    # Servidor asíncrono (uvicorn asgi:app)
+    ASYNC_WHISPER_THREADS = int(os.getenv('ASYNC_WHISPER_THREADS', '4'))  # Transcripciones simultáneas
+    ASYNC_WSGI_THREADS = int(os.getenv('ASYNC_WSGI_THREADS', '16'))  # Hilos para el resto de rutas de Flask
+    
+    # Métricas y perfilado
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'  # Endpoint /metrics
+    SERVER_TIMING = os.getenv('SERVER_TIMING', 'false').lower() == 'true'  # Cabecera Server-Timing por petición
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'  # Endpoint /debug/profile
+    
     # Modo debug
     DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -0,0 +1,44 @@
+"""
+Configuración de gunicorn
+
+- Clase gthread: cada worker atiende varias peticiones con hilos, necesario
+  para las respuestas en streaming y el WebSocket de transcripción
+- MODEL_LOADING=preload: la app se crea en el proceso maestro y los pesos de
+  Whisper se comparten copy-on-write entre workers; los servicios con hilos
+  se construyen y se calientan en segundo plano después del fork
+- MODEL_LOADING=background: cada worker carga y calienta sus modelos en
+  segundo plano mientras ya acepta conexiones (/readyz indica cuándo termina)
+- Apagado ordenado: al recibir SIGTERM el worker deja de aceptar conexiones,
+  termina las peticiones en curso y drena las transcripciones pendientes
+"""
+from config import Config
+from utils.ssl_manager import SSLManager
+
+worker_class = 'gthread'
+workers = Config.GUNICORN_WORKERS
+threads = Config.GUNICORN_THREADS
+preload_app = Config.MODEL_LOADING == 'preload'
+
+# Una respuesta puede esperar a Ollama y luego sintetizar audio
+timeout = int(Config.OLLAMA_TIMEOUT + Config.TTS_TIMEOUT)
+graceful_timeout = int(Config.SHUTDOWN_DRAIN_TIMEOUT)
+
+if Config.ENABLE_HTTPS and SSLManager().get_context():
+    bind = f'0.0.0.0:{Config.HTTPS_PORT}'
+    certfile = Config.CERT_PATH
+    keyfile = Config.KEY_PATH
+else:
+    bind = f'0.0.0.0:{Config.HTTP_PORT}'
+
+
+def post_fork(server, worker):
+    """Construir y calentar los servicios del worker sin retrasar su arranque"""
+    if Config.MODEL_LOADING == 'preload':
+        from app import services
+        services.start_warmup()
+
+
+def worker_exit(server, worker):
+    """Drenar transcripciones y detener los hilos del worker"""
+    from app import services
+    services.shutdown(Config.SHUTDOWN_DRAIN_TIMEOUT)
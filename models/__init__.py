@@ -0,0 +1 @@
+# Paquete models
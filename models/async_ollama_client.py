@@ -0,0 +1,271 @@
+"""
+Cliente asíncrono para la API de Ollama
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Optional, List, Dict, AsyncIterator, Callable
+
+import aiohttp
+
+from config import Config
+from models.ollama_client import OllamaOverloadedError, OllamaStreamError, chat_options, create_response_cache
+from models.response_cache import ResponseCache
+from utils.metrics import span, observe
+from utils.single_flight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class _AsyncModelSlots:
+    """Estado de concurrencia de un modelo (versión asyncio)"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.semaphore = asyncio.BoundedSemaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+
+class AsyncTokenStream:
+    """Iterador asíncrono de tokens que libera el turno del modelo al cerrarse"""
+
+    def __init__(self, chunks: AsyncIterator[str], release: Callable[[], None]):
+        self._chunks = chunks
+        self._release = release
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            await self.aclose()
+            raise
+
+    async def aclose(self):
+        """Cerrar la conexión y liberar el turno (idempotente)"""
+        if self._release:
+            release, self._release = self._release, None
+            try:
+                await self._chunks.aclose()
+            finally:
+                release()
+
+
+async def _iter_cached(text: str) -> AsyncIterator[str]:
+    """Respuesta en caché como stream de un solo fragmento"""
+    yield text
+
+
+class AsyncOllamaClient:
+    """
+    Cliente HTTP asíncrono para Ollama
+
+    Mismos límites por modelo que OllamaClient, pero la espera por un turno
+    y la lectura de la respuesta no ocupan un hilo. Cancelar la tarea que lo
+    usa cierra la conexión, y Ollama deja de generar.
+    Debe usarse siempre desde el mismo loop de eventos.
+    """
+
+    def __init__(self, host: str = "localhost", port: str = "11434"):
+        self.base_url = f"http://{host}:{port}"
+        self.timeout = aiohttp.ClientTimeout(total=Config.OLLAMA_TIMEOUT)
+        # En streaming el plazo es entre fragmentos, como el (connect, read)
+        # de requests en OllamaClient: una respuesta larga no se corta
+        self.stream_timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=Config.OLLAMA_TIMEOUT, sock_read=Config.OLLAMA_TIMEOUT
+        )
+        self.pool_size = Config.OLLAMA_POOL_SIZE
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        self.max_concurrency = Config.OLLAMA_MAX_CONCURRENCY
+        self.max_queue = Config.OLLAMA_MAX_QUEUE
+        self.queue_timeout = Config.OLLAMA_QUEUE_TIMEOUT
+        self.retry_after = Config.OLLAMA_RETRY_AFTER
+        self._slots: Dict[str, _AsyncModelSlots] = {}
+
+        # Llamadas idénticas simultáneas comparten una sola petición
+        self.options = chat_options()
+        self._flight = AsyncSingleFlight('llm') if Config.SINGLE_FLIGHT_ENABLED else None
+        self.response_cache = create_response_cache(self.options)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Sesión persistente, creada dentro del loop que la usa"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=self.timeout
+            )
+        return self._session
+
+    async def close(self):
+        """Cerrar las conexiones abiertas"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    async def _acquire_slot(self, model: str) -> Callable[[], None]:
+        """
+        Reservar un turno para el modelo
+
+        Returns:
+            Función que libera el turno
+
+        Raises:
+            OllamaOverloadedError: si la cola está llena o se agota la espera
+        """
+        slots = self._slots.get(model)
+        if slots is None:
+            slots = self._slots[model] = _AsyncModelSlots(self.max_concurrency)
+        if slots.in_flight + slots.waiting >= slots.limit + self.max_queue:
+            slots.rejected += 1
+            raise OllamaOverloadedError(model, self.retry_after)
+
+        slots.waiting += 1
+        try:
+            await asyncio.wait_for(slots.semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            slots.rejected += 1
+            raise OllamaOverloadedError(model, self.retry_after)
+        finally:
+            slots.waiting -= 1
+        slots.in_flight += 1
+
+        def release():
+            slots.in_flight -= 1
+            slots.semaphore.release()
+
+        return release
+
+    def get_queue_stats(self) -> Dict[str, Dict[str, int]]:
+        """Obtener métricas de concurrencia y cola por modelo"""
+        return {
+            model: {
+                'limit': slots.limit,
+                'in_flight': slots.in_flight,
+                'queue_depth': slots.waiting,
+                'rejected': slots.rejected
+            }
+            for model, slots in self._slots.items()
+        }
+
+    async def get_response(self, messages: List[Dict[str, str]], model: str) -> Optional[str]:
+        """
+        Obtener respuesta completa del modelo
+
+        Las llamadas idénticas simultáneas esperan a la misma petición.
+
+        Returns:
+            Texto de la respuesta o None si hay error
+
+        Raises:
+            OllamaOverloadedError: si el modelo no admite más peticiones
+        """
+        key = ResponseCache.make_key(model, messages, self.options)
+        if self.response_cache:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+
+        if self._flight:
+            return await self._flight.do(key, lambda: self._fetch_response(messages, model, key))
+        return await self._fetch_response(messages, model, key)
+
+    async def _fetch_response(self, messages: List[Dict[str, str]], model: str, key: str) -> Optional[str]:
+        release = await self._acquire_slot(model)
+        try:
+            with span('ollama_total'):
+                content = await self._post_chat(messages, model)
+        finally:
+            release()
+
+        if content and self.response_cache:
+            self.response_cache.put(key, content)
+        return content
+
+    async def _post_chat(self, messages: List[Dict[str, str]], model: str) -> Optional[str]:
+        try:
+            async with self._get_session().post(
+                f"{self.base_url}/api/chat",
+                json=self._payload(messages, model, stream=False)
+            ) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+                return data.get('message', {}).get('content', '').strip() or None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error obteniendo respuesta de Ollama: {e}")
+            return None
+
+    def _payload(self, messages: List[Dict[str, str]], model: str, stream: bool) -> Dict:
+        payload = {"model": model, "messages": messages, "stream": stream}
+        if self.options:
+            payload["options"] = self.options
+        return payload
+
+    async def stream_response(self, messages: List[Dict[str, str]], model: str) -> AsyncTokenStream:
+        """
+        Obtener la respuesta del modelo token a token
+
+        El turno se reserva al llamar, de modo que la sobrecarga se detecta
+        antes de empezar a responder al cliente.
+
+        Raises:
+            OllamaOverloadedError: si el modelo no admite más peticiones
+        """
+        key = None
+        if self.response_cache:
+            key = ResponseCache.make_key(model, messages, self.options)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return AsyncTokenStream(_iter_cached(cached), lambda: None)
+
+        release = await self._acquire_slot(model)
+        return AsyncTokenStream(self._iter_stream(messages, model, key), release)
+
+    async def _iter_stream(self, messages: List[Dict[str, str]], model: str,
+                           key: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Leer el stream NDJSON de /api/chat (con clave, la respuesta completa se guarda en caché)
+
+        Raises:
+            OllamaStreamError: si la conexión o el stream fallan a mitad de la respuesta
+        """
+        start = time.perf_counter()
+        first_token = True
+        parts = []
+        try:
+            async with self._get_session().post(
+                f"{self.base_url}/api/chat",
+                json=self._payload(messages, model, stream=True),
+                timeout=self.stream_timeout
+            ) as response:
+                response.raise_for_status()
+                async for line in response.content:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    content = chunk.get('message', {}).get('content', '')
+                    if content:
+                        if first_token:
+                            first_token = False
+                            observe('ollama_ttft', time.perf_counter() - start)
+                        if key:
+                            parts.append(content)
+                        yield content
+                    if chunk.get('done'):
+                        if key and parts:
+                            self.response_cache.put(key, ''.join(parts).strip())
+                        break
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except Exception as e:
+            logger.error(f"Error en streaming de Ollama: {e}")
+            raise OllamaStreamError(e) from e
+        finally:
+            observe('ollama_total', time.perf_counter() - start)
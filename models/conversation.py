@@ -0,0 +1,228 @@
+"""
+Gestión del historial de conversaciones por sesión
+"""
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import List, Dict, Optional, Callable
+from config import Config
+from models.conversation_store import ConversationStore
+
+logger = logging.getLogger(__name__)
+
+_FIRST_SENTENCE = re.compile(r'^(.+?[.!?])(\s|$)', re.S)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimar tokens sin tokenizador (~4 caracteres por token en español)"""
+    return len(text) // 4 + 4
+
+
+def extractive_summary(previous: str, messages: List[Dict[str, str]], max_tokens: int) -> str:
+    """
+    Resumen barato de los turnos compactados
+
+    Conserva la primera oración de cada mensaje; si el resumen supera el
+    presupuesto se descarta lo más antiguo.
+    """
+    lines = [previous] if previous else []
+    for message in messages:
+        match = _FIRST_SENTENCE.match(message['content'].strip())
+        sentence = match.group(1) if match else message['content'].strip()[:200]
+        speaker = 'Usuario' if message['role'] == 'user' else 'Asistente'
+        lines.append(f"{speaker}: {sentence}")
+
+    summary = '\n'.join(lines)
+    max_chars = max_tokens * 4
+    if len(summary) > max_chars:
+        summary = summary[-max_chars:].split('\n', 1)[-1]
+    return summary
+
+
+class _Session:
+    """Estado de una conversación"""
+
+    __slots__ = ('messages', 'tokens', 'summary', 'size', 'last_access')
+
+    def __init__(self):
+        self.messages = deque()
+        self.tokens = 0
+        self.summary = ''
+        self.size = 0
+        self.last_access = time.monotonic()
+
+
+class ConversationManager:
+    """
+    Historial de conversaciones en memoria
+
+    - Presupuesto de tokens: cuando el historial supera max_tokens, los
+      turnos más antiguos se compactan en un resumen que se envía en su lugar
+    - Las sesiones inactivas más de session_ttl segundos se eliminan
+    - Si la memoria total supera max_memory_bytes se expulsan las sesiones
+      usadas hace más tiempo
+
+    Con un `store` el historial vive fuera del proceso (SQLite o Redis) y se
+    comparte entre workers. En cada turno se leen a lo sumo los últimos
+    readback_turns mensajes sin resumir; los anteriores se leen una sola vez
+    y pasan al resumen, así que ninguno se pierde sin resumirse. Si
+    readback_turns cubre los mensajes que caben en max_tokens, el contexto
+    es el mismo que en memoria.
+    """
+
+    def __init__(self, max_tokens: int = Config.MAX_CONVERSATION_LENGTH,
+                 summary_tokens: int = Config.CONVERSATION_SUMMARY_TOKENS,
+                 session_ttl: float = Config.CONVERSATION_TTL,
+                 max_memory_bytes: int = Config.CONVERSATION_MAX_MEMORY_MB * 1024 * 1024,
+                 summarizer: Optional[Callable[[str, List[Dict[str, str]], int], str]] = None,
+                 store: Optional[ConversationStore] = None,
+                 readback_turns: int = Config.CONVERSATION_READBACK_TURNS):
+        self.system_message = {"role": "system", "content": Config.SYSTEM_MESSAGE}
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.session_ttl = session_ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.summarizer = summarizer or extractive_summary
+        self.store = store
+        self.readback_turns = readback_turns
+
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'expired': 0, 'evicted': 0, 'compacted_messages': 0}
+
+    def add_message(self, session_id: str, role: str, content: str):
+        """Agregar un mensaje al historial de la sesión"""
+        if self.store:
+            self.store.append(session_id, {"role": role, "content": content})
+            return
+        
+        with self._lock:
+            conversation = self._touch(session_id)
+            conversation.messages.append({"role": role, "content": content})
+            conversation.tokens += estimate_tokens(content)
+            self._resize(conversation, len(content))
+
+            self._compact(conversation)
+            self._evict()
+
+    def get_conversation(self, session_id: str) -> List[Dict[str, str]]:
+        """Obtener los mensajes a enviar al modelo"""
+        if self.store:
+            return self._get_stored_conversation(session_id)
+        
+        with self._lock:
+            conversation = self._touch(session_id)
+            messages = [self.system_message]
+            if conversation.summary:
+                messages.append({
+                    "role": "system",
+                    "content": f"Resumen de la conversación anterior:\n{conversation.summary}"
+                })
+            messages.extend(conversation.messages)
+            self._evict()
+            return messages
+
+    def clear_conversation(self, session_id: str):
+        """Borrar el historial de una sesión"""
+        if self.store:
+            self.store.delete(session_id)
+            return
+        
+        with self._lock:
+            conversation = self._sessions.pop(session_id, None)
+            if conversation:
+                self._memory_bytes -= conversation.size
+
+    def get_stats(self) -> Dict[str, int]:
+        """Obtener ocupación y contadores de expulsión"""
+        if self.store:
+            return dict(self.store.get_stats(), compacted_messages=self.stats['compacted_messages'])
+        
+        with self._lock:
+            return dict(self.stats, sessions=len(self._sessions), memory_bytes=self._memory_bytes)
+
+    def _get_stored_conversation(self, session_id: str) -> List[Dict[str, str]]:
+        """Leer el historial del almacén aplicando el presupuesto de tokens"""
+        summary, upto = self.store.get_summary(session_id)
+        rows = self.store.load(session_id, self.readback_turns, after=upto)
+        
+        # Mensajes sin resumir que quedan fuera de la ventana de lectura: se
+        # resumen todos de una vez (normalmente solo los que salieron de la
+        # ventana desde el turno anterior)
+        older = []
+        if rows and len(rows) == self.readback_turns and rows[0][0] - upto > 1:
+            older = self.store.load(session_id, rows[0][0] - upto - 1, after=upto, before=rows[0][0])
+        
+        # Conservar los mensajes más recientes que caben en el presupuesto
+        budget = self.max_tokens - estimate_tokens(self.system_message['content']) - self.summary_tokens
+        kept = 0
+        tokens = 0
+        for _, message in reversed(rows):
+            tokens += estimate_tokens(message['content'])
+            if tokens > budget and kept:
+                break
+            kept += 1
+        
+        dropped = older + rows[:len(rows) - kept]
+        if dropped:
+            summary = self.summarizer(summary, [message for _, message in dropped], self.summary_tokens)
+            self.store.set_summary(session_id, summary, dropped[-1][0])
+            with self._lock:
+                self.stats['compacted_messages'] += len(dropped)
+        
+        messages = [self.system_message]
+        if summary:
+            messages.append({
+                "role": "system",
+                "content": f"Resumen de la conversación anterior:\n{summary}"
+            })
+        messages.extend(message for _, message in rows[len(rows) - kept:])
+        return messages
+    
+    def _touch(self, session_id: str) -> _Session:
+        """Obtener (o crear) la sesión y marcarla como usada recientemente"""
+        conversation = self._sessions.get(session_id)
+        if conversation is None:
+            conversation = self._sessions[session_id] = _Session()
+        else:
+            self._sessions.move_to_end(session_id)
+        conversation.last_access = time.monotonic()
+        return conversation
+
+    def _resize(self, conversation: _Session, delta: int):
+        conversation.size += delta
+        self._memory_bytes += delta
+
+    def _compact(self, conversation: _Session):
+        """Mover los turnos más antiguos al resumen hasta cumplir el presupuesto"""
+        budget = self.max_tokens - estimate_tokens(self.system_message['content']) - self.summary_tokens
+        evicted = []
+        # Siempre se conserva al menos el último mensaje
+        while conversation.tokens > budget and len(conversation.messages) > 1:
+            message = conversation.messages.popleft()
+            conversation.tokens -= estimate_tokens(message['content'])
+            self._resize(conversation, -len(message['content']))
+            evicted.append(message)
+
+        if evicted:
+            previous = len(conversation.summary)
+            conversation.summary = self.summarizer(conversation.summary, evicted, self.summary_tokens)
+            self._resize(conversation, len(conversation.summary) - previous)
+            self.stats['compacted_messages'] += len(evicted)
+
+    def _evict(self):
+        """Eliminar sesiones inactivas y, si hace falta, las menos recientes"""
+        now = time.monotonic()
+        while self._sessions:
+            session_id, conversation = next(iter(self._sessions.items()))
+            if now - conversation.last_access > self.session_ttl:
+                self.stats['expired'] += 1
+            elif self._memory_bytes > self.max_memory_bytes and len(self._sessions) > 1:
+                self.stats['evicted'] += 1
+            else:
+                break
+            del self._sessions[session_id]
+            self._memory_bytes -= conversation.size
@@ -0,0 +1,320 @@
+"""
+Almacenamiento externo de conversaciones (compartido entre procesos y nodos)
+"""
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (secuencia, mensaje): la secuencia crece con cada mensaje de la sesión
+StoredMessage = Tuple[int, Dict[str, str]]
+
+
+class ConversationStore:
+    """
+    Interfaz de almacenamiento con escrituras en lote
+
+    Las escrituras son solo de anexado y se encolan; un hilo las agrupa y las
+    confirma juntas (group commit). Antes de leer una sesión se espera a que
+    las escrituras previas de este proceso estén confirmadas.
+    """
+
+    def __init__(self, batch_size: int = 64, flush_interval: float = 0.02):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._enqueued = 0
+        self._written = 0
+        self._batches = 0
+        self._cond = threading.Condition()
+        self._writer = threading.Thread(target=self._run_writer, name="conversation-writer", daemon=True)
+        self._writer.start()
+
+    # API pública
+
+    def append(self, session_id: str, message: Dict[str, str]):
+        """Anexar un mensaje (asíncrono)"""
+        self._enqueue(('append', session_id, message))
+
+    def set_summary(self, session_id: str, summary: str, upto: int):
+        """Guardar el resumen de los mensajes hasta la secuencia `upto` (asíncrono)"""
+        self._enqueue(('summary', session_id, summary, upto))
+
+    def flush(self, timeout: float = 5.0):
+        """Esperar a que las escrituras encoladas hasta ahora estén confirmadas"""
+        with self._cond:
+            target = self._enqueued
+            self._cond.wait_for(lambda: self._written >= target, timeout=timeout)
+
+    def load(self, session_id: str, limit: int, after: int = 0,
+             before: Optional[int] = None) -> List[StoredMessage]:
+        """
+        Leer los últimos `limit` mensajes, del más antiguo al más reciente
+
+        Solo se devuelven los mensajes con secuencia mayor que `after` y, si
+        se indica, menor que `before`.
+        """
+        raise NotImplementedError
+
+    def get_summary(self, session_id: str) -> Tuple[str, int]:
+        """Obtener (resumen, secuencia hasta la que resume)"""
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        """Borrar una sesión"""
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {'pending_writes': self._enqueued - self._written, 'batches': self._batches}
+
+    def close(self):
+        """Confirmar lo pendiente y detener el hilo de escritura"""
+        self._queue.put(None)
+        self._writer.join(timeout=10)
+
+    # Implementación del lote
+
+    def _write_batch(self, operations: List[tuple]):
+        raise NotImplementedError
+
+    def _enqueue(self, operation: tuple):
+        with self._cond:
+            self._enqueued += 1
+        self._queue.put(operation)
+
+    def _run_writer(self):
+        while True:
+            operation = self._queue.get()
+            if operation is None:
+                return
+
+            # Dar unos milisegundos para que lleguen más escrituras al lote
+            batch = [operation]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    operation = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if operation is None:
+                    stop = True
+                    break
+                batch.append(operation)
+
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                logger.error(f"Error guardando conversaciones ({len(batch)} operaciones): {e}")
+
+            with self._cond:
+                self._written += len(batch)
+                self._batches += 1
+                self._cond.notify_all()
+
+            if stop:
+                return
+
+
+class SQLiteConversationStore(ConversationStore):
+    """SQLite embebido en modo WAL: lectores concurrentes y un único escritor"""
+
+    def __init__(self, path: str, session_ttl: float = 1800, **kwargs):
+        self.path = path
+        self.session_ttl = session_ttl
+        self._local = threading.local()
+        self._last_prune = time.monotonic()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id);
+            CREATE TABLE IF NOT EXISTS summaries (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                upto INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+        connection.commit()
+        super().__init__(**kwargs)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def load(self, session_id: str, limit: int, after: int = 0,
+             before: Optional[int] = None) -> List[StoredMessage]:
+        self.flush()
+        if before is None:
+            before = -1  # Sin cota superior
+        rows = self._connection().execute(
+            "SELECT id, role, content FROM messages WHERE session_id = ? AND id > ? AND (? < 0 OR id < ?) "
+            "ORDER BY id DESC LIMIT ?",
+            (session_id, after, before, before, limit)
+        ).fetchall()
+        return [(row[0], {"role": row[1], "content": row[2]}) for row in reversed(rows)]
+
+    def get_summary(self, session_id: str) -> Tuple[str, int]:
+        self.flush()
+        row = self._connection().execute(
+            "SELECT summary, upto FROM summaries WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return (row[0], row[1]) if row else ('', 0)
+
+    def delete(self, session_id: str):
+        self.flush()
+        connection = self._connection()
+        connection.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        connection.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+        connection.commit()
+
+    def _write_batch(self, operations: List[tuple]):
+        now = time.time()
+        messages = [(op[1], op[2]['role'], op[2]['content'], now) for op in operations if op[0] == 'append']
+        summaries = [(op[1], op[2], op[3], now) for op in operations if op[0] == 'summary']
+
+        connection = self._connection()
+        with connection:
+            if messages:
+                connection.executemany(
+                    "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                    messages
+                )
+            if summaries:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO summaries (session_id, summary, upto, updated_at) VALUES (?, ?, ?, ?)",
+                    summaries
+                )
+
+        if time.monotonic() - self._last_prune > 60:
+            self._prune(connection)
+
+    def _prune(self, connection: sqlite3.Connection):
+        """Eliminar sesiones sin actividad durante session_ttl"""
+        self._last_prune = time.monotonic()
+        cutoff = time.time() - self.session_ttl
+        with connection:
+            expired = [row[0] for row in connection.execute(
+                "SELECT session_id FROM messages GROUP BY session_id HAVING MAX(created_at) < ?", (cutoff,)
+            )]
+            for session_id in expired:
+                connection.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                connection.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+            # Resúmenes cuyas sesiones ya no tienen mensajes (p. ej. borrados a mano)
+            connection.execute(
+                "DELETE FROM summaries WHERE updated_at < ? AND session_id NOT IN (SELECT session_id FROM messages)",
+                (cutoff,)
+            )
+        if expired:
+            logger.info(f"Conversaciones expiradas: {len(expired)}")
+
+
+class RedisConversationStore(ConversationStore):
+    """
+    Backend sobre el protocolo de Redis
+
+    Cada sesión es una lista (RPUSH/LRANGE) más un hash con el resumen; ambas
+    claves expiran tras session_ttl sin actividad. Acepta un cliente ya
+    creado, lo que permite probarlo contra un sustituto local (fakeredis).
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", session_ttl: float = 1800,
+                 prefix: str = "conversation", client=None, **kwargs):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.session_ttl = int(session_ttl)
+        self.prefix = prefix
+        super().__init__(**kwargs)
+
+    def _messages_key(self, session_id: str) -> str:
+        return f"{self.prefix}:{session_id}:messages"
+
+    def _summary_key(self, session_id: str) -> str:
+        return f"{self.prefix}:{session_id}:summary"
+
+    def load(self, session_id: str, limit: int, after: int = 0,
+             before: Optional[int] = None) -> List[StoredMessage]:
+        self.flush()
+        # La secuencia es la posición absoluta en la lista (empezando en 1)
+        if before is None:
+            pipeline = self.client.pipeline(transaction=True)
+            pipeline.llen(self._messages_key(session_id))
+            pipeline.lrange(self._messages_key(session_id), -limit, -1)
+            length, items = pipeline.execute()
+            first = length - len(items) + 1
+        else:
+            # La lista solo crece por el final: las posiciones anteriores a `before` no cambian
+            last = min(self.client.llen(self._messages_key(session_id)), before - 1)
+            first = max(after, last - limit) + 1
+            items = self.client.lrange(self._messages_key(session_id), first - 1, last - 1) if last >= first else []
+        return [(first + i, json.loads(item)) for i, item in enumerate(items) if first + i > after]
+
+    def get_summary(self, session_id: str) -> Tuple[str, int]:
+        self.flush()
+        data = self.client.hgetall(self._summary_key(session_id))
+        if not data:
+            return '', 0
+        summary = data.get(b'summary', data.get('summary', b''))
+        upto = data.get(b'upto', data.get('upto', 0))
+        if isinstance(summary, bytes):
+            summary = summary.decode('utf-8')
+        return summary, int(upto)
+
+    def delete(self, session_id: str):
+        self.flush()
+        self.client.delete(self._messages_key(session_id), self._summary_key(session_id))
+
+    def _write_batch(self, operations: List[tuple]):
+        pipeline = self.client.pipeline(transaction=False)
+        touched = set()
+        for op in operations:
+            if op[0] == 'append':
+                pipeline.rpush(self._messages_key(op[1]), json.dumps(op[2], ensure_ascii=False))
+            else:
+                pipeline.hset(self._summary_key(op[1]), mapping={'summary': op[2], 'upto': op[3]})
+            touched.add(op[1])
+        for session_id in touched:
+            pipeline.expire(self._messages_key(session_id), self.session_ttl)
+            pipeline.expire(self._summary_key(session_id), self.session_ttl)
+        pipeline.execute()
+
+
+def create_conversation_store(config) -> Optional[ConversationStore]:
+    """Crear el backend configurado en CONVERSATION_STORE (None = en memoria)"""
+    backend = config.CONVERSATION_STORE.lower()
+    options = {
+        'session_ttl': config.CONVERSATION_TTL,
+        'batch_size': config.CONVERSATION_BATCH_SIZE,
+        'flush_interval': config.CONVERSATION_FLUSH_INTERVAL_MS / 1000
+    }
+    if backend == 'sqlite':
+        return SQLiteConversationStore(config.CONVERSATION_SQLITE_PATH, **options)
+    if backend == 'redis':
+        return RedisConversationStore(config.CONVERSATION_REDIS_URL, **options)
+    return None
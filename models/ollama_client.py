@@ -0,0 +1,382 @@
+"""
+Cliente para la API de Ollama
+"""
+import json
+import logging
+import threading
+import time
+import requests
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from typing import Optional, List, Dict, Iterator, Callable, FrozenSet
+from config import Config
+from models.response_cache import ResponseCache
+from utils.metrics import span, observe
+from utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaOverloadedError(Exception):
+    """La cola de peticiones de un modelo está llena"""
+
+    def __init__(self, model: str, retry_after: int):
+        super().__init__(f"Demasiadas peticiones en cola para el modelo {model}")
+        self.model = model
+        self.retry_after = retry_after
+
+
+class OllamaStreamError(Exception):
+    """El stream de Ollama se cortó antes de terminar la respuesta"""
+
+    def __init__(self, cause: Exception):
+        super().__init__("La respuesta de Ollama se interrumpió")
+        self.cause = cause
+
+
+def chat_options() -> Dict:
+    """Opciones de generación configuradas (vacío = las del modelo)"""
+    if Config.OLLAMA_TEMPERATURE.strip():
+        return {'temperature': float(Config.OLLAMA_TEMPERATURE)}
+    return {}
+
+
+def create_response_cache(options: Dict) -> Optional[ResponseCache]:
+    """Caché de respuestas, solo si está activada y la generación es determinista"""
+    if Config.OLLAMA_RESPONSE_CACHE_TTL <= 0:
+        return None
+    if options.get('temperature') != 0:
+        logger.warning("OLLAMA_RESPONSE_CACHE_TTL requiere OLLAMA_TEMPERATURE=0; caché de respuestas desactivada")
+        return None
+    return ResponseCache(Config.OLLAMA_RESPONSE_CACHE_TTL, Config.OLLAMA_RESPONSE_CACHE_SIZE)
+
+
+class _ModelSlots:
+    """Estado de concurrencia de un modelo"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.semaphore = threading.BoundedSemaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+
+class TokenStream:
+    """Iterador de tokens que libera el turno del modelo al cerrarse"""
+
+    def __init__(self, chunks: Iterator[str], release: Callable[[], None]):
+        self._chunks = chunks
+        self._release = release
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        """Cerrar la conexión y liberar el turno (idempotente)"""
+        if self._release:
+            release, self._release = self._release, None
+            self._chunks.close()
+            release()
+
+
+def iter_cached(text: str) -> Iterator[str]:
+    """Respuesta en caché como stream de un solo fragmento"""
+    yield text
+
+
+class OllamaClient:
+    """Cliente HTTP para comunicarse con el servidor de Ollama"""
+
+    def __init__(self, host: str = "localhost", port: str = "11434"):
+        self.base_url = f"http://{host}:{port}"
+        self.timeout = Config.OLLAMA_TIMEOUT
+
+        # Sesión persistente: reutiliza conexiones keep-alive entre peticiones
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.OLLAMA_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Límite de concurrencia por modelo
+        self.max_concurrency = Config.OLLAMA_MAX_CONCURRENCY
+        self.max_queue = Config.OLLAMA_MAX_QUEUE
+        self.queue_timeout = Config.OLLAMA_QUEUE_TIMEOUT
+        self.retry_after = Config.OLLAMA_RETRY_AFTER
+        self._slots: Dict[str, _ModelSlots] = {}
+        self._slots_lock = threading.Lock()
+
+        # Llamadas idénticas simultáneas comparten una sola petición
+        self.options = chat_options()
+        self._flight = SingleFlight('llm') if Config.SINGLE_FLIGHT_ENABLED else None
+        self.response_cache = create_response_cache(self.options)
+
+        # Caché del catálogo de modelos (también sirve como estado de conexión)
+        self.models_ttl = Config.OLLAMA_MODELS_TTL
+        self.models_error_ttl = Config.OLLAMA_MODELS_ERROR_TTL
+        self._models: List[Dict] = []
+        self._model_names: FrozenSet[str] = frozenset()
+        self._connected = False
+        self._models_expire_at: Optional[float] = None
+        self._catalog_lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._refresher_stop = threading.Event()
+
+    def _acquire_slot(self, model: str) -> Callable[[], None]:
+        """
+        Reservar un turno para el modelo
+
+        Returns:
+            Función que libera el turno
+
+        Raises:
+            OllamaOverloadedError: si la cola está llena o se agota la espera
+        """
+        with self._slots_lock:
+            slots = self._slots.get(model)
+            if slots is None:
+                slots = self._slots[model] = _ModelSlots(self.max_concurrency)
+            if slots.in_flight + slots.waiting >= slots.limit + self.max_queue:
+                slots.rejected += 1
+                raise OllamaOverloadedError(model, self.retry_after)
+            slots.waiting += 1
+
+        acquired = slots.semaphore.acquire(timeout=self.queue_timeout)
+
+        with self._slots_lock:
+            slots.waiting -= 1
+            if not acquired:
+                slots.rejected += 1
+                raise OllamaOverloadedError(model, self.retry_after)
+            slots.in_flight += 1
+
+        def release():
+            with self._slots_lock:
+                slots.in_flight -= 1
+            slots.semaphore.release()
+
+        return release
+
+    @contextmanager
+    def _model_slot(self, model: str):
+        """Mantener un turno del modelo durante el bloque"""
+        release = self._acquire_slot(model)
+        try:
+            yield
+        finally:
+            release()
+
+    def get_queue_stats(self) -> Dict[str, Dict[str, int]]:
+        """Obtener métricas de concurrencia y cola por modelo"""
+        with self._slots_lock:
+            return {
+                model: {
+                    'limit': slots.limit,
+                    'in_flight': slots.in_flight,
+                    'queue_depth': slots.waiting,
+                    'rejected': slots.rejected
+                }
+                for model, slots in self._slots.items()
+            }
+
+    def get_response(self, messages: List[Dict[str, str]], model: str) -> Optional[str]:
+        """
+        Obtener respuesta completa del modelo
+
+        Si otra llamada con el mismo modelo y los mismos mensajes está en
+        curso, se espera a esa y se devuelve su misma respuesta.
+
+        Args:
+            messages: Historial de la conversación
+            model: Nombre del modelo
+
+        Returns:
+            Texto de la respuesta o None si hay error
+
+        Raises:
+            OllamaOverloadedError: si el modelo no admite más peticiones
+        """
+        key = ResponseCache.make_key(model, messages, self.options)
+        if self.response_cache:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+
+        if self._flight:
+            return self._flight.do(key, lambda: self._fetch_response(messages, model, key))
+        return self._fetch_response(messages, model, key)
+
+    def _fetch_response(self, messages: List[Dict[str, str]], model: str, key: str) -> Optional[str]:
+        """Pedir la respuesta completa a /api/chat"""
+        with self._model_slot(model), span('ollama_total'):
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/api/chat",
+                    json=self._payload(messages, model, stream=False),
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
+                content = response.json().get('message', {}).get('content', '').strip() or None
+            except Exception as e:
+                logger.error(f"Error obteniendo respuesta de Ollama: {e}")
+                return None
+
+        if content and self.response_cache:
+            self.response_cache.put(key, content)
+        return content
+
+    def _payload(self, messages: List[Dict[str, str]], model: str, stream: bool) -> Dict:
+        payload = {"model": model, "messages": messages, "stream": stream}
+        if self.options:
+            payload["options"] = self.options
+        return payload
+
+    def stream_response(self, messages: List[Dict[str, str]], model: str) -> TokenStream:
+        """
+        Obtener la respuesta del modelo token a token
+
+        El turno del modelo se reserva al llamar (no al iterar), de modo que
+        la sobrecarga se detecta antes de empezar a responder al cliente.
+
+        Args:
+            messages: Historial de la conversación
+            model: Nombre del modelo
+
+        Returns:
+            Iterador con los fragmentos de texto a medida que Ollama los genera
+
+        Raises:
+            OllamaOverloadedError: si el modelo no admite más peticiones
+        """
+        key = None
+        if self.response_cache:
+            key = ResponseCache.make_key(model, messages, self.options)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return TokenStream(iter_cached(cached), lambda: None)
+
+        release = self._acquire_slot(model)
+        return TokenStream(self._iter_stream(messages, model, key), release)
+
+    def _iter_stream(self, messages: List[Dict[str, str]], model: str, key: Optional[str] = None) -> Iterator[str]:
+        """
+        Leer el stream NDJSON de /api/chat (con clave, la respuesta completa se guarda en caché)
+
+        Raises:
+            OllamaStreamError: si la conexión o el stream fallan a mitad de la
+                respuesta, para que no se tome lo recibido como completo
+        """
+        start = time.perf_counter()
+        first_token = True
+        parts = []
+        try:
+            with self.session.post(
+                f"{self.base_url}/api/chat",
+                json=self._payload(messages, model, stream=True),
+                timeout=self.timeout,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    content = chunk.get('message', {}).get('content', '')
+                    if content:
+                        if first_token:
+                            first_token = False
+                            observe('ollama_ttft', time.perf_counter() - start)
+                        if key:
+                            parts.append(content)
+                        yield content
+                    if chunk.get('done'):
+                        if key and parts:
+                            self.response_cache.put(key, ''.join(parts).strip())
+                        break
+        except Exception as e:
+            logger.error(f"Error en streaming de Ollama: {e}")
+            raise OllamaStreamError(e) from e
+        finally:
+            observe('ollama_total', time.perf_counter() - start)
+
+    def _catalog_is_fresh(self) -> bool:
+        """Verificar si el catálogo en caché sigue vigente"""
+        return self._models_expire_at is not None and time.monotonic() < self._models_expire_at
+
+    def refresh_models(self) -> List[Dict]:
+        """
+        Consultar /api/tags y actualizar la caché del catálogo
+
+        Si la consulta falla se sigue sirviendo el último catálogo bueno, y el
+        fallo se guarda solo models_error_ttl segundos: basta para no repetir
+        la consulta en cada /health sin que un corte breve de Ollama deje
+        todos los modelos como no instalados hasta que caduque models_ttl.
+        """
+        try:
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=10)
+            response.raise_for_status()
+            models = response.json().get('models', [])
+        except Exception as e:
+            logger.error(f"Error obteniendo modelos: {e}")
+            self._connected = False
+            self._models_expire_at = time.monotonic() + self.models_error_ttl
+            return self._models
+
+        self._models = models
+        self._model_names = frozenset(m['name'] for m in models)
+        self._connected = True
+        self._models_expire_at = time.monotonic() + self.models_ttl
+        return models
+
+    def _ensure_catalog(self):
+        """Refrescar el catálogo si caducó (una sola consulta concurrente)"""
+        if self._catalog_is_fresh():
+            return
+        with self._catalog_lock:
+            if not self._catalog_is_fresh():
+                self.refresh_models()
+
+    def invalidate_models(self):
+        """Descartar el catálogo en caché (p. ej. tras instalar un modelo)"""
+        self._models_expire_at = None
+
+    def get_available_models(self) -> List[Dict]:
+        """Obtener lista de modelos instalados en Ollama"""
+        self._ensure_catalog()
+        return self._models
+
+    def has_model(self, name: str) -> bool:
+        """Verificar si un modelo está instalado"""
+        self._ensure_catalog()
+        return name in self._model_names
+
+    def is_connected(self) -> bool:
+        """Verificar conexión con Ollama"""
+        self._ensure_catalog()
+        return self._connected
+
+    def start_model_refresher(self, interval: float):
+        """Refrescar el catálogo periódicamente en segundo plano"""
+        if self._refresher and self._refresher.is_alive():
+            return
+
+        def run():
+            while not self._refresher_stop.is_set():
+                with self._catalog_lock:
+                    self.refresh_models()
+                self._refresher_stop.wait(interval)
+
+        self._refresher_stop.clear()
+        self._refresher = threading.Thread(target=run, name="ollama-models-refresher", daemon=True)
+        self._refresher.start()
+
+    def stop_model_refresher(self):
+        """Detener el refresco en segundo plano"""
+        self._refresher_stop.set()
@@ -0,0 +1,62 @@
+"""
+Caché de respuestas deterministas del modelo
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Tuple
+
+from utils.metrics import increment
+
+
+class ResponseCache:
+    """
+    Respuestas recientes de Ollama por (modelo, opciones, mensajes)
+
+    Solo tiene sentido con temperatura 0: con muestreo, repetir una respuesta
+    vieja no es lo que el modelo habría contestado. La vigencia es corta
+    (segundos) y el tamaño se acota por número de entradas.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], options: Optional[Dict] = None) -> str:
+        """Digest del modelo, las opciones y la lista de mensajes"""
+        raw = json.dumps([model, options or {}, messages], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Obtener la respuesta si sigue vigente"""
+        with self._lock:
+            self._expire()
+            item = self._items.get(key)
+            if item is None:
+                return None
+        increment('response_cache_hits', 'llm')
+        return item[1]
+
+    def put(self, key: str, response: str):
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = (time.monotonic() + self.ttl, response)
+            self._expire()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._items)}
+
+    def _expire(self):
+        """Eliminar lo caducado y lo más antiguo si se supera el tamaño"""
+        now = time.monotonic()
+        while self._items:
+            key, (expires_at, _) = next(iter(self._items.items()))
+            if expires_at > now and len(self._items) <= self.max_entries:
+                break
+            del self._items[key]
@@ -0,0 +1,321 @@
+"""
+Control de admisión para los endpoints costosos (/chat, /process_audio y /ws/transcribe)
+
+Rechaza pronto lo que el nodo no puede atender a tiempo, en lugar de
+aceptarlo todo y dejar que la latencia se dispare para todos:
+
+- Límite de peticiones (y de conexiones WebSocket) por sesión (429)
+- Audio demasiado grande o largo, antes de decodificarlo (413)
+- Concurrencia acotada por etapa con cola limitada y plazo de espera (503)
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from typing import Callable, Optional, Dict, Tuple
+
+from utils.audio_probe import probe_duration
+from utils.metrics import increment
+
+logger = logging.getLogger(__name__)
+
+
+def _noop():
+    pass
+
+
+class AdmissionRejected(Exception):
+    """La petición no se admite (sobrecarga, límite de sesión o tamaño)"""
+
+    def __init__(self, message: str, status: int, check: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.check = check
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """Petición en cola: `wake` la despierta cuando se le cede un turno"""
+
+    __slots__ = ('wake', 'granted')
+
+    def __init__(self, wake: Callable[[], None]):
+        self.wake = wake
+        self.granted = False
+
+
+class _StageSlots:
+    """
+    Estado de concurrencia de una etapa
+
+    Lo comparten hilos y corrutinas: al liberar un turno se cede
+    directamente al primero de la cola, sea del tipo que sea.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.waiters: "deque[_Waiter]" = deque()
+        self.rejected = 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self.waiters)
+
+
+class SessionRateLimiter:
+    """Cubeta de fichas por sesión: `rate` peticiones por minuto con ráfagas de `burst`"""
+
+    def __init__(self, rate: float, burst: int, max_sessions: int = 10000):
+        self.rate = rate / 60
+        self.burst = burst
+        self.max_sessions = max_sessions
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, session_id: str) -> Optional[float]:
+        """
+        Consumir una ficha
+
+        Returns:
+            None si se admite, o los segundos hasta la próxima ficha
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(session_id, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[session_id] = (tokens, now)
+                return (1 - tokens) / self.rate
+            self._buckets[session_id] = (tokens - 1, now)
+            if len(self._buckets) > self.max_sessions:
+                self._forget_idle(now)
+        return None
+
+    def _forget_idle(self, now: float):
+        """Olvidar las sesiones cuya cubeta ya estaría llena otra vez"""
+        refill = self.burst / self.rate
+        self._buckets = {session_id: bucket for session_id, bucket in self._buckets.items()
+                         if now - bucket[1] < refill}
+
+
+class AdmissionController:
+    """
+    Decide si una petición entra y cuánto espera cada etapa
+
+    Los límites son por proceso: con varios workers cada uno tiene los
+    suyos. La etapa 'llm' acota las llamadas al modelo del nodo en total;
+    además, OllamaClient limita cada modelo por separado
+    (OLLAMA_MAX_CONCURRENCY / OLLAMA_MAX_QUEUE).
+    """
+
+    def __init__(self, config):
+        # Los turnos de cada etapa se comparten entre las rutas WSGI (hilos) y
+        # las asíncronas (loop de eventos) del mismo proceso
+        self.enabled = config.ADMISSION_ENABLED
+        self.max_audio_bytes = config.ADMISSION_MAX_AUDIO_MB * 1024 * 1024
+        self.max_audio_seconds = config.MAX_RECORDING_DURATION
+        self.deadline_seconds = config.ADMISSION_DEADLINE
+        self.queue_timeout = config.ADMISSION_QUEUE_TIMEOUT
+        self.retry_after = config.ADMISSION_RETRY_AFTER
+
+        # Etapa -> (concurrencia, cola)
+        self.limits = {
+            'transcription': (config.ADMISSION_TRANSCRIPTION_CONCURRENCY, config.ADMISSION_TRANSCRIPTION_QUEUE),
+            'llm': (config.ADMISSION_LLM_CONCURRENCY, config.ADMISSION_LLM_QUEUE),
+        }
+        self._slots: Dict[str, _StageSlots] = {}
+        self._lock = threading.Lock()
+
+        self.rate_limiter = SessionRateLimiter(
+            config.ADMISSION_SESSION_RATE, config.ADMISSION_SESSION_BURST
+        ) if config.ADMISSION_SESSION_RATE > 0 else None
+
+    def _reject(self, message: str, status: int, check: str, retry_after: Optional[int] = None):
+        increment('admission_rejections', check)
+        logger.warning(f"Petición rechazada ({check}): {message}")
+        raise AdmissionRejected(message, status, check, retry_after)
+
+    def deadline(self) -> float:
+        """Instante límite para esperar en colas, contado desde ahora"""
+        return time.monotonic() + self.deadline_seconds
+
+    # Comprobaciones previas (baratas)
+
+    def check_session(self, session_id: str):
+        """Aplicar el límite de peticiones por sesión"""
+        if not self.enabled or not self.rate_limiter:
+            return
+        wait = self.rate_limiter.acquire(session_id)
+        if wait is not None:
+            self._reject("Demasiadas peticiones, espera unos segundos", 429, 'session', max(1, round(wait)))
+
+    def check_ready(self, ready: bool):
+        """Rechazar mientras los modelos se cargan en segundo plano"""
+        if self.enabled and not ready:
+            self._reject("El servidor se está iniciando, intenta de nuevo en unos segundos", 503, 'startup',
+                         self.retry_after)
+
+    def check_upload_size(self, content_length: Optional[int]):
+        """Rechazar por Content-Length antes de leer el cuerpo"""
+        if self.enabled and content_length and content_length > self.max_audio_bytes:
+            self._reject("El audio es demasiado grande", 413, 'size')
+
+    def check_audio(self, data: bytes):
+        """Rechazar por tamaño o por la duración declarada en el contenedor, antes de decodificar"""
+        if not self.enabled:
+            return
+        if len(data) > self.max_audio_bytes:
+            self._reject("El audio es demasiado grande", 413, 'size')
+        duration = probe_duration(data)
+        if duration is not None and duration > self.max_audio_seconds:
+            self._reject(f"La grabación supera los {self.max_audio_seconds} segundos", 413, 'duration')
+
+    # Etapas con concurrencia acotada
+
+    def _wait_timeout(self, stage: str, deadline: Optional[float]) -> float:
+        timeout = self.queue_timeout
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                self._reject("Se agotó el plazo de la petición", 503, stage, self.retry_after)
+        return timeout
+
+    def acquire(self, stage: str, deadline: Optional[float] = None) -> Callable[[], None]:
+        """
+        Reservar un turno de la etapa
+
+        Returns:
+            Función que libera el turno (idempotente); sirve para respuestas
+            en streaming, que lo mantienen hasta cerrarse
+
+        Raises:
+            AdmissionRejected: si la cola está llena o se agota el plazo
+        """
+        if not self.enabled:
+            return _noop
+
+        timeout = self._wait_timeout(stage, deadline)
+        event = threading.Event()
+        slots, waiter = self._enter(stage, event.set)
+        if waiter is not None and not event.wait(timeout):
+            self._abandon(stage, slots, waiter)
+        return self._releaser(slots)
+
+    @contextmanager
+    def stage(self, stage: str, deadline: Optional[float] = None):
+        """
+        Ocupar un turno de la etapa durante el bloque
+
+        Raises:
+            AdmissionRejected: si la cola está llena o se agota el plazo
+        """
+        release = self.acquire(stage, deadline)
+        try:
+            yield
+        finally:
+            release()
+
+    async def acquire_async(self, stage: str, deadline: Optional[float] = None) -> Callable[[], None]:
+        """Versión asyncio de acquire(): la espera no ocupa un hilo y los turnos son los mismos"""
+        if not self.enabled:
+            return _noop
+
+        timeout = self._wait_timeout(stage, deadline)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        slots, waiter = self._enter(stage, wake)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+            except asyncio.TimeoutError:
+                self._abandon(stage, slots, waiter)
+            except asyncio.CancelledError:
+                # Si el turno llegó a cederse, se devuelve
+                if not self._leave(slots, waiter):
+                    self._releaser(slots)()
+                raise
+        return self._releaser(slots)
+
+    def _enter(self, stage: str, wake: Callable[[], None]) -> Tuple[_StageSlots, Optional[_Waiter]]:
+        """Ocupar un turno libre o ponerse en la cola (None = turno obtenido)"""
+        limit, max_queue = self.limits[stage]
+        with self._lock:
+            slots = self._slots.get(stage)
+            if slots is None:
+                slots = self._slots[stage] = _StageSlots(limit)
+            if slots.in_flight + slots.waiting >= slots.limit + max_queue:
+                slots.rejected += 1
+                full = True
+            else:
+                full = False
+                if slots.in_flight < slots.limit and not slots.waiters:
+                    slots.in_flight += 1
+                    return slots, None
+                waiter = _Waiter(wake)
+                slots.waiters.append(waiter)
+        if full:
+            self._reject("Servidor ocupado, intenta de nuevo en unos segundos", 503, stage, self.retry_after)
+        return slots, waiter
+
+    def _leave(self, slots: _StageSlots, waiter: _Waiter) -> bool:
+        """Salir de la cola; False si el turno ya se había cedido"""
+        with self._lock:
+            if waiter.granted:
+                return False
+            slots.waiters.remove(waiter)
+            return True
+
+    def _abandon(self, stage: str, slots: _StageSlots, waiter: _Waiter):
+        """Se agotó la espera: rechazar, salvo que el turno llegara justo a tiempo"""
+        if self._leave(slots, waiter):
+            with self._lock:
+                slots.rejected += 1
+            self._reject("Servidor ocupado, intenta de nuevo en unos segundos", 503, stage, self.retry_after)
+
+    def _releaser(self, slots: _StageSlots) -> Callable[[], None]:
+        """Función que libera el turno (idempotente) cediéndolo al primero de la cola"""
+        released = False
+
+        def release():
+            nonlocal released
+            with self._lock:
+                if released:
+                    return
+                released = True
+                if not slots.waiters:
+                    slots.in_flight -= 1
+                    return
+                waiter = slots.waiters.popleft()
+                waiter.granted = True
+            waiter.wake()
+
+        return release
+
+    @asynccontextmanager
+    async def stage_async(self, stage: str, deadline: Optional[float] = None):
+        """Versión asyncio de stage(): la espera no ocupa un hilo"""
+        release = await self.acquire_async(stage, deadline)
+        try:
+            yield
+        finally:
+            release()
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Métricas de concurrencia y cola por etapa"""
+        with self._lock:
+            return {
+                stage: {
+                    'limit': slots.limit,
+                    'in_flight': slots.in_flight,
+                    'queue_depth': slots.waiting,
+                    'rejected': slots.rejected
+                }
+                for stage, slots in self._slots.items()
+            }
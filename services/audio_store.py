@@ -0,0 +1,164 @@
+"""
+Almacén temporal de audio servido por /audio/<id>
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class AudioStore:
+    """
+    Guarda respuestas de audio durante un tiempo limitado
+
+    Sin `directory` el audio vive en la memoria del proceso y solo lo puede
+    servir el worker que lo generó. Con `directory` (compartido entre
+    workers o nodos) cada audio se escribe como un archivo `<id>.mp3`, así
+    que /audio/<id> funciona aunque la petición llegue a otro worker.
+    """
+
+    def __init__(self, ttl: float = 300, max_bytes: int = 64 * 1024 * 1024,
+                 directory: Optional[str] = None):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.directory = directory or None
+        self._items: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def put(self, audio: bytes) -> Optional[str]:
+        """
+        Guardar audio y devolver su identificador
+
+        El identificador se deriva del contenido, así que el mismo audio
+        (p. ej. un saludo cacheado) reutiliza la misma entrada. Devuelve None
+        si el audio no cabe en el almacén; el llamador debe enviarlo en línea.
+        """
+        if len(audio) > self.max_bytes:
+            return None
+
+        audio_id = hashlib.sha256(audio).hexdigest()[:32]
+        if self.directory:
+            return audio_id if self._write_disk(audio_id, audio) else None
+
+        with self._lock:
+            previous = self._items.pop(audio_id, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+            self._items[audio_id] = (time.monotonic() + self.ttl, audio)
+            self._bytes += len(audio)
+            self._expire()
+        return audio_id
+
+    def get(self, audio_id: str) -> Optional[bytes]:
+        """Obtener audio si sigue vigente"""
+        if self.directory:
+            return self._read_disk(audio_id)
+
+        with self._lock:
+            self._expire()
+            item = self._items.get(audio_id)
+            return item[1] if item else None
+
+    def get_stats(self) -> Dict[str, int]:
+        if self.directory:
+            entries = self._disk_entries()
+            return {'entries': len(entries), 'bytes': sum(size for _, _, size in entries)}
+
+        with self._lock:
+            return {'entries': len(self._items), 'bytes': self._bytes}
+
+    def _expire(self):
+        """Eliminar lo caducado y lo más antiguo si se supera el tamaño"""
+        now = time.monotonic()
+        while self._items:
+            audio_id, (expires_at, audio) = next(iter(self._items.items()))
+            if expires_at > now and self._bytes <= self.max_bytes:
+                break
+            del self._items[audio_id]
+            self._bytes -= len(audio)
+
+    # Almacén en disco
+
+    def _disk_path(self, audio_id: str) -> str:
+        return os.path.join(self.directory, f"{audio_id}.mp3")
+
+    def _write_disk(self, audio_id: str, audio: bytes) -> bool:
+        """Escribir de forma atómica (o renovar la fecha si ya existe)"""
+        path = self._disk_path(audio_id)
+        try:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(audio)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el audio {audio_id}: {e}")
+            return False
+
+        self._prune_disk()
+        return True
+
+    def _read_disk(self, audio_id: str) -> Optional[bytes]:
+        # El identificador llega en la URL: solo se aceptan hashes
+        if not all(c in '0123456789abcdef' for c in audio_id):
+            return None
+        path = self._disk_path(audio_id)
+        try:
+            if os.path.getmtime(path) + self.ttl < time.time():
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _disk_entries(self):
+        """(fecha, ruta, tamaño) de cada audio, del más antiguo al más reciente"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.mp3'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+        return sorted(entries)
+
+    def _prune_disk(self):
+        """Eliminar lo caducado y lo más antiguo si se supera el tamaño (como mucho cada segundo)"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_prune < 1:
+                return
+            self._last_prune = now
+
+        try:
+            entries = self._disk_entries()
+        except OSError as e:
+            logger.warning(f"No se pudo revisar el almacén de audio: {e}")
+            return
+
+        cutoff = time.time() - self.ttl
+        total = sum(size for _, _, size in entries)
+        for mtime, path, size in entries:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
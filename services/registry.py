@@ -0,0 +1,265 @@
+"""
+Registro de servicios con carga diferida y ciclo de vida explícito
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from utils.startup import StartupReport
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """
+    Construye cada servicio la primera vez que se usa
+
+    Los servicios que arrancan hilos (loop de TTS, refresco de modelos,
+    workers de Whisper, escritura de conversaciones) deben crearse dentro del
+    proceso que los usa: los hilos no sobreviven a un fork. Lo único que se
+    puede cargar antes del fork es el peso del modelo Whisper
+    (preload_models), que los workers heredan copy-on-write. Con el backend
+    faster-whisper no hay precarga: CTranslate2 arranca sus propios hilos.
+
+    start_warmup() lo carga todo en segundo plano: el servidor responde
+    desde el primer momento y /readyz indica cuándo está listo.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._service_locks: Dict[str, threading.Lock] = {}
+        self._model_lock = threading.Lock()
+        self._whisper_backend = None
+
+        self.startup = StartupReport()
+        self._warmup: Optional[threading.Thread] = None
+        self._warmup_pid: Optional[int] = None
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        instance = self._instances.get(name)
+        if instance is None:
+            # Un candado por servicio: mientras se carga Whisper los demás siguen disponibles
+            with self._lock:
+                lock = self._service_locks.setdefault(name, threading.Lock())
+            with lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = self._instances[name] = factory()
+        return instance
+
+    def is_loaded(self, name: str) -> bool:
+        """Verificar si un servicio ya fue construido"""
+        return name in self._instances
+
+    # Carga
+
+    def preload_models(self):
+        """Cargar los pesos de Whisper (seguro antes de hacer fork)"""
+        from services.whisper_backends import load_backend
+
+        if self.config.WHISPER_BACKEND != 'openai':
+            logger.info(f"Whisper ({self.config.WHISPER_BACKEND}) se carga en cada worker, sin precarga")
+            return
+
+        with self._model_lock:
+            if self._whisper_backend is None:
+                device = "cpu" if self.config.WHISPER_PROCESSES > 0 else None
+                self._whisper_backend = load_backend('openai', self.config.WHISPER_MODEL,
+                                                     self.config.WHISPER_COMPUTE_TYPE, device=device)
+
+    def load_all(self):
+        """Construir todos los servicios (dentro del worker)"""
+        for name in ('vad', 'admission', 'conversation_manager', 'ollama_client', 'whisper_service',
+                     'tts_service', 'audio_store', 'tts_executor'):
+            getattr(self, name)
+
+    def start_warmup(self):
+        """Cargar y calentar los servicios en un hilo (una vez por proceso, después del fork)"""
+        with self._lock:
+            if self._warming_here():
+                return
+            self._warmup_pid = os.getpid()
+            self._warmup = threading.Thread(target=self.warmup, name="warmup", daemon=True)
+            self._warmup.start()
+
+    def warmup(self):
+        """Cargar Whisper, construir el resto de servicios y hacer una transcripción de prueba"""
+        try:
+            with self.startup.stage('whisper_load'):
+                whisper_service = self.whisper_service
+            with self.startup.stage('services'):
+                self.load_all()
+            with self.startup.stage('whisper_warmup'):
+                whisper_service.warmup(self.config.WHISPER_LANGUAGE)
+            self.startup.set_ready()
+        except Exception as e:
+            self.startup.set_failed(e)
+
+    def _warming_here(self) -> bool:
+        return self._warmup is not None and self._warmup_pid == os.getpid()
+
+    # Estado
+
+    def is_ready(self) -> bool:
+        """
+        Verificar si el proceso puede atender sin esperas de carga
+
+        Sin precalentamiento (MODEL_LOADING=lazy) siempre es True: cada
+        servicio se construye con su primera petición.
+        """
+        return self.startup.ready or not self._warming_here()
+
+    def readiness(self) -> Dict:
+        """Estado de la preparación para /readyz"""
+        state = self.startup.as_dict()
+        state['ready'] = self.is_ready()
+        state['services'] = sorted(self._instances)
+        return state
+
+    def liveness(self) -> Dict[str, bool]:
+        """Hilos de fondo de los servicios ya construidos (para /livez)"""
+        checks = {}
+        for name in ('tts_service', 'whisper_service'):
+            service = self._instances.get(name)
+            if service is not None:
+                checks[name] = service.is_alive()
+        return checks
+
+    # Servicios
+
+    @property
+    def vad(self):
+        from utils.vad import EnergyVAD
+
+        return self._get('vad', lambda: EnergyVAD(
+            threshold=self.config.SILENCE_THRESHOLD,
+            min_silence=self.config.SILENCE_DURATION,
+            padding_ms=self.config.VAD_PADDING_MS,
+            min_speech_ms=self.config.VAD_MIN_SPEECH_MS,
+            split_seconds=self.config.VAD_SPLIT_SECONDS
+        ))
+
+    @property
+    def admission(self):
+        from services.admission import AdmissionController
+
+        return self._get('admission', lambda: AdmissionController(self.config))
+
+    @property
+    def conversation_manager(self):
+        from models.conversation import ConversationManager
+        from models.conversation_store import create_conversation_store
+
+        return self._get('conversation_manager', lambda: ConversationManager(
+            store=create_conversation_store(self.config)
+        ))
+
+    @property
+    def ollama_client(self):
+        from models.ollama_client import OllamaClient
+
+        def create():
+            client = OllamaClient(self.config.OLLAMA_HOST, self.config.OLLAMA_PORT)
+            if self.config.OLLAMA_MODELS_REFRESH_INTERVAL > 0:
+                client.start_model_refresher(self.config.OLLAMA_MODELS_REFRESH_INTERVAL)
+            return client
+
+        return self._get('ollama_client', create)
+
+    @property
+    def whisper_service(self):
+        from services.whisper_service import WhisperService
+
+        return self._get('whisper_service', lambda: WhisperService(
+            self.config.WHISPER_MODEL,
+            in_memory_decode=self.config.WHISPER_IN_MEMORY_DECODE,
+            batching=self.config.WHISPER_BATCHING,
+            batch_size=self.config.WHISPER_BATCH_SIZE,
+            batch_window=self.config.WHISPER_BATCH_WINDOW_MS / 1000,
+            batch_workers=self.config.WHISPER_BATCH_WORKERS,
+            processes=self.config.WHISPER_PROCESSES,
+            threads_per_worker=self.config.WHISPER_THREADS_PER_WORKER,
+            vad=self.vad if self.config.VAD_ENABLED else None,
+            model=self._whisper_backend,
+            backend=self.config.WHISPER_BACKEND,
+            compute_type=self.config.WHISPER_COMPUTE_TYPE
+        ))
+
+    @property
+    def tts_service(self):
+        from services.tts_service import TTSService
+        from services.tts_cache import TTSCache
+
+        def create():
+            cache = TTSCache(
+                max_memory_bytes=self.config.TTS_CACHE_MEMORY_MB * 1024 * 1024,
+                disk_dir=self.config.TTS_CACHE_DIR,
+                max_disk_bytes=self.config.TTS_CACHE_DISK_MB * 1024 * 1024
+            ) if self.config.TTS_CACHE_MEMORY_MB > 0 else None
+            return TTSService(self.config.TTS_VOICE, self.config.TTS_RATE, self.config.TTS_PITCH,
+                              cache=cache, timeout=self.config.TTS_TIMEOUT,
+                              parallel_sentences=self.config.TTS_PARALLEL_SENTENCES,
+                              parallel_min_chars=self.config.TTS_PARALLEL_MIN_CHARS,
+                              single_flight=self.config.SINGLE_FLIGHT_ENABLED,
+                              pool_size=self.config.TTS_POOL_SIZE,
+                              pool_url=self.config.TTS_POOL_URL,
+                              pool_max_idle=self.config.TTS_POOL_MAX_IDLE,
+                              pool_receive_timeout=self.config.TTS_POOL_RECEIVE_TIMEOUT)
+
+        return self._get('tts_service', create)
+
+    @property
+    def audio_store(self):
+        from services.audio_store import AudioStore
+
+        return self._get('audio_store', lambda: AudioStore(
+            ttl=self.config.AUDIO_STORE_TTL,
+            max_bytes=self.config.AUDIO_STORE_MAX_MB * 1024 * 1024,
+            directory=self.config.AUDIO_STORE_DIR
+        ))
+
+    @property
+    def tts_executor(self) -> ThreadPoolExecutor:
+        """Pool para sintetizar oraciones mientras el modelo sigue generando"""
+        return self._get('tts_executor', lambda: ThreadPoolExecutor(
+            max_workers=self.config.TTS_STREAM_WORKERS, thread_name_prefix="tts-stream"
+        ))
+
+    # Apagado
+
+    def shutdown(self, drain_timeout: float = 30.0):
+        """
+        Apagado ordenado
+
+        Espera a que terminen las transcripciones en curso y luego detiene
+        workers, loops y escrituras pendientes.
+        """
+        instances = dict(self._instances)
+
+        whisper_service = instances.get('whisper_service')
+        if whisper_service:
+            if not whisper_service.drain(drain_timeout):
+                logger.warning("Tiempo de espera agotado con transcripciones en curso")
+            whisper_service.shutdown()
+
+        executor = instances.get('tts_executor')
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        tts_service = instances.get('tts_service')
+        if tts_service:
+            tts_service.shutdown()
+
+        ollama_client = instances.get('ollama_client')
+        if ollama_client:
+            ollama_client.stop_model_refresher()
+
+        conversation_manager = instances.get('conversation_manager')
+        if conversation_manager and conversation_manager.store:
+            conversation_manager.store.close()
+
+        logger.info("Servicios detenidos")
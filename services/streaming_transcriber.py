@@ -0,0 +1,168 @@
+"""
+Transcripción en streaming: decodificación incremental y ventana deslizante
+"""
+import logging
+import subprocess
+import threading
+from contextlib import nullcontext
+from typing import Callable, ContextManager, List, Dict, Optional
+
+import numpy as np
+
+from utils.vad import EnergyVAD, SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingDecoder:
+    """Proceso ffmpeg persistente que convierte fragmentos webm/ogg en PCM 16 kHz"""
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE):
+        self._process = subprocess.Popen(
+            ["ffmpeg", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate),
+             "pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self._pending: List[np.ndarray] = []
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_output, daemon=True)
+        self._reader.start()
+
+    def _read_output(self):
+        leftover = b""
+        while True:
+            data = self._process.stdout.read1(8192)
+            if not data:
+                break
+            data = leftover + data
+            usable = len(data) - len(data) % 2
+            leftover = data[usable:]
+            samples = np.frombuffer(data[:usable], np.int16).astype(np.float32) / 32768.0
+            with self._lock:
+                self._pending.append(samples)
+
+    def feed(self, data: bytes):
+        """Enviar un fragmento del contenedor tal como lo produce MediaRecorder"""
+        self._process.stdin.write(data)
+        self._process.stdin.flush()
+
+    def drain(self) -> np.ndarray:
+        """Obtener las muestras decodificadas desde la última llamada"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return np.zeros(0, np.float32)
+        return np.concatenate(pending)
+
+    def close(self) -> np.ndarray:
+        """Cerrar la entrada, esperar a ffmpeg y devolver lo que quede"""
+        if self._process.poll() is None:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+            self._reader.join(timeout=5)
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        return self.drain()
+
+
+class StreamingTranscriber:
+    """
+    Mantiene un buffer de audio y produce transcripciones parciales y finales
+
+    La ventana actual se retranscribe cada partial_interval segundos de audio
+    nuevo. Si supera max_window se consolida su texto y la siguiente ventana
+    arranca con overlap segundos de contexto. El fin de frase se detecta con
+    el VAD cuando el final del buffer lleva silence segundos en silencio.
+
+    stage() devuelve el contexto en el que se ejecuta cada transcripción
+    (el turno del control de admisión); si rechaza, la excepción se propaga.
+    """
+
+    def __init__(self, whisper_service, vad: EnergyVAD, language: str = "es",
+                 partial_interval: float = 1.0, max_window: float = 15.0,
+                 overlap: float = 0.5, silence: float = 1.5,
+                 stage: Callable[[], ContextManager] = nullcontext):
+        self.whisper_service = whisper_service
+        self.stage = stage
+        self.vad = vad
+        self.language = language
+        self.partial_samples = int(partial_interval * SAMPLE_RATE)
+        self.max_window_samples = int(max_window * SAMPLE_RATE)
+        self.overlap_samples = int(overlap * SAMPLE_RATE)
+        self.silence_samples = int(silence * SAMPLE_RATE)
+
+        self.window = np.zeros(0, np.float32)
+        self.committed: List[str] = []
+        self.finished = False
+        self._since_partial = 0
+
+    def add_audio(self, samples: np.ndarray) -> List[Dict]:
+        """
+        Agregar muestras nuevas
+
+        Returns:
+            Eventos generados: {'type': 'partial'|'final', 'text': ...}
+        """
+        if self.finished or len(samples) == 0:
+            return []
+
+        self.window = np.concatenate((self.window, samples))
+        self._since_partial += len(samples)
+        if self._since_partial < self.partial_samples:
+            return []
+        self._since_partial = 0
+
+        if self._endpoint_reached():
+            return [self.finish()]
+
+        if len(self.window) >= self.max_window_samples:
+            self._commit_window()
+            return [{'type': 'partial', 'text': self._text()}]
+
+        partial = self._transcribe(self.window)
+        return [{'type': 'partial', 'text': self._text(partial)}]
+
+    def finish(self, samples: Optional[np.ndarray] = None) -> Dict:
+        """Transcribir lo pendiente y devolver el evento final"""
+        if samples is not None and len(samples):
+            self.window = np.concatenate((self.window, samples))
+        if not self.finished:
+            self._commit_window(keep_overlap=False)
+            self.finished = True
+        return {'type': 'final', 'text': self._text()}
+
+    def _endpoint_reached(self) -> bool:
+        spans = self.vad.speech_spans(self.window)
+        return bool(spans) and len(self.window) - spans[-1][1] >= self.silence_samples
+
+    def _commit_window(self, keep_overlap: bool = True):
+        text = self._transcribe(self.window)
+        if text:
+            self.committed.append(self._drop_repeated_prefix(text))
+        self.window = self.window[-self.overlap_samples:] if keep_overlap else self.window[:0]
+
+    def _transcribe(self, audio: np.ndarray) -> str:
+        if len(audio) == 0:
+            return ''
+        with self.stage():
+            return self.whisper_service.transcribe_array(audio, self.language) or ''
+
+    def _drop_repeated_prefix(self, text: str, max_words: int = 6) -> str:
+        """Quitar las palabras que el solapamiento repite del texto anterior"""
+        if not self.committed:
+            return text
+        previous = self.committed[-1].lower().split()
+        words = text.split()
+        lowered = [w.lower() for w in words]
+        for size in range(min(max_words, len(previous), len(words)), 0, -1):
+            if previous[-size:] == lowered[:size]:
+                return ' '.join(words[size:])
+        return text
+
+    def _text(self, partial: str = '') -> str:
+        return ' '.join(t for t in self.committed + [partial] if t).strip()
@@ -0,0 +1,188 @@
+"""
+Worker de transcripción por lotes para Whisper
+"""
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Optional, List, Dict
+
+import numpy as np
+import torch
+import whisper
+
+logger = logging.getLogger(__name__)
+
+
+class _Job:
+    """Petición de transcripción pendiente"""
+
+    __slots__ = ('audio', 'language', 'future', 'enqueued_at')
+
+    def __init__(self, audio: np.ndarray, language: str):
+        self.audio = audio
+        self.language = language
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class TranscriptionWorker:
+    """
+    Serializa el acceso al modelo Whisper y agrupa peticiones en lotes
+
+    Los clips que caben en una ventana de 30 s se agrupan por idioma: sus
+    espectrogramas log-mel se rellenan, pasan juntos por el encoder y luego
+    se decodifican en un solo lote. Los clips más largos usan transcribe().
+    """
+
+    def __init__(self, model, max_batch_size: int = 8, batch_window: float = 0.05,
+                 num_workers: int = 1):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_window = batch_window
+        self.fp16 = model.device.type == 'cuda'
+
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes: Dict[int, int] = defaultdict(int)
+        self._stages: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+        )
+
+        self._threads = [
+            threading.Thread(target=self._run, name=f"whisper-worker-{i}", daemon=True)
+            for i in range(max(1, num_workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, audio: np.ndarray, language: str = "es") -> Future:
+        """Encolar audio (float32, 16 kHz) y devolver un Future con el texto"""
+        job = _Job(audio, language)
+        self._queue.put(job)
+        return job.future
+
+    def transcribe(self, audio: np.ndarray, language: str = "es",
+                   timeout: Optional[float] = None) -> str:
+        """Encolar y esperar el resultado"""
+        return self.submit(audio, language).result(timeout=timeout)
+
+    def is_alive(self) -> bool:
+        """Verificar que ningún hilo del worker ha muerto"""
+        return all(thread.is_alive() for thread in self._threads)
+
+    def shutdown(self):
+        """Detener los workers tras vaciar la cola"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def get_stats(self) -> Dict:
+        """Obtener profundidad de cola, histograma de lotes y tiempos por etapa"""
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'batch_sizes': dict(self._batch_sizes),
+                'stages': {
+                    name: dict(stage, avg_ms=stage['total_ms'] / stage['count'] if stage['count'] else 0.0)
+                    for name, stage in self._stages.items()
+                }
+            }
+
+    def _record(self, stage: str, elapsed_ms: float, count: int = 1):
+        with self._stats_lock:
+            entry = self._stages[stage]
+            entry['count'] += count
+            entry['total_ms'] += elapsed_ms * count
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+
+    def _collect_batch(self, first: _Job) -> List[_Job]:
+        """Reunir las peticiones que llegan dentro de la ventana"""
+        batch = [first]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job is None:
+                # Reencolar la señal de parada para este mismo worker
+                self._queue.put(None)
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+
+            batch = self._collect_batch(job)
+            now = time.perf_counter()
+            for item in batch:
+                self._record('queue_wait', (now - item.enqueued_at) * 1000)
+            with self._stats_lock:
+                self._batch_sizes[len(batch)] += 1
+
+            short, long_jobs = [], []
+            for item in batch:
+                (short if len(item.audio) <= whisper.audio.N_SAMPLES else long_jobs).append(item)
+
+            by_language: Dict[str, List[_Job]] = defaultdict(list)
+            for item in short:
+                by_language[item.language].append(item)
+
+            for language, jobs in by_language.items():
+                self._run_batched(jobs, language)
+            for item in long_jobs:
+                self._run_single(item)
+
+    def _run_batched(self, jobs: List[_Job], language: str):
+        """Encoder y decoder en lote para clips de hasta 30 s"""
+        try:
+            start = time.perf_counter()
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(job.audio), self.model.dims.n_mels)
+                for job in jobs
+            ]).to(self.model.device)
+            if self.fp16:
+                mel = mel.half()
+            self._record('mel', (time.perf_counter() - start) * 1000 / len(jobs), len(jobs))
+
+            start = time.perf_counter()
+            with torch.no_grad():
+                audio_features = self.model.embed_audio(mel)
+            self._record('encode', (time.perf_counter() - start) * 1000 / len(jobs), len(jobs))
+
+            start = time.perf_counter()
+            options = whisper.DecodingOptions(language=language, fp16=self.fp16, without_timestamps=True)
+            results = whisper.decode(self.model, audio_features, options)
+            self._record('decode', (time.perf_counter() - start) * 1000 / len(jobs), len(jobs))
+
+            for job, result in zip(jobs, results):
+                # Mismo criterio de silencio que transcribe()
+                silent = result.no_speech_prob > 0.6 and result.avg_logprob < -1.0
+                job.future.set_result('' if silent else result.text.strip())
+        except Exception as e:
+            logger.error(f"Error en transcripción por lotes: {e}")
+            for job in jobs:
+                if not job.future.done():
+                    job.future.set_exception(e)
+
+    def _run_single(self, job: _Job):
+        """Transcripción completa para clips de más de 30 s"""
+        try:
+            start = time.perf_counter()
+            result = self.model.transcribe(job.audio, language=job.language, fp16=self.fp16)
+            self._record('transcribe_long', (time.perf_counter() - start) * 1000)
+            job.future.set_result(result['text'].strip())
+        except Exception as e:
+            logger.error(f"Error en transcripción: {e}")
+            job.future.set_exception(e)
@@ -0,0 +1,163 @@
+"""
+Caché de audio TTS direccionada por contenido
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class TTSCache:
+    """
+    Caché de audio sintetizado en dos niveles
+
+    - Memoria: LRU acotada por bytes
+    - Disco (opcional): un archivo .mp3 por clave, con expulsión por tamaño total
+    """
+
+    def __init__(self, max_memory_bytes: int = 32 * 1024 * 1024,
+                 disk_dir: Optional[str] = None,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir or None
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0
+        }
+
+        if self.disk_dir:
+            self._load_disk_index()
+
+    @staticmethod
+    def make_key(text: str, voice: str, rate: float = 1.0, pitch: float = 1.0) -> str:
+        """Calcular la clave de contenido para (texto limpio, voz, velocidad, tono)"""
+        raw = f"{text}\0{voice}\0{rate}\0{pitch}".encode('utf-8')
+        return hashlib.sha256(raw).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Buscar audio en memoria y luego en disco"""
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return audio
+
+            if key in self._disk_index:
+                audio = self._read_disk(key)
+                if audio is not None:
+                    self._disk_index.move_to_end(key)
+                    self._store_memory(key, audio)
+                    self.stats['disk_hits'] += 1
+                    return audio
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key: str, audio: bytes):
+        """Guardar audio en ambos niveles"""
+        with self._lock:
+            self._store_memory(key, audio)
+            if self.disk_dir and key not in self._disk_index:
+                self._write_disk(key, audio)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Obtener contadores y ocupación de la caché"""
+        with self._lock:
+            return dict(
+                self.stats,
+                memory_entries=len(self._memory),
+                memory_bytes=self._memory_bytes,
+                disk_entries=len(self._disk_index),
+                disk_bytes=self._disk_bytes
+            )
+
+    def _store_memory(self, key: str, audio: bytes):
+        """Insertar en la LRU de memoria expulsando lo menos usado"""
+        if len(audio) > self.max_memory_bytes:
+            return
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats['memory_evictions'] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.mp3")
+
+    def _load_disk_index(self):
+        """Reconstruir el índice del disco, de más antiguo a más reciente"""
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.disk_dir):
+                if not name.endswith('.mp3'):
+                    continue
+                stat = os.stat(os.path.join(self.disk_dir, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+
+            for _, key, size in sorted(entries):
+                self._disk_index[key] = size
+                self._disk_bytes += size
+
+            self._evict_disk()
+            logger.info(f"Caché TTS en disco: {len(self._disk_index)} archivos")
+        except Exception as e:
+            logger.error(f"Error cargando caché TTS en disco: {e}")
+            self.disk_dir = None
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            # El archivo desapareció: olvidar la entrada
+            self._disk_bytes -= self._disk_index.pop(key, 0)
+            return None
+
+    def _write_disk(self, key: str, audio: bytes):
+        """Escribir de forma atómica y aplicar el límite de tamaño"""
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(audio)
+            os.replace(tmp_path, self._disk_path(key))
+
+            self._disk_index[key] = len(audio)
+            self._disk_bytes += len(audio)
+            self._evict_disk()
+        except Exception as e:
+            logger.warning(f"No se pudo escribir en la caché TTS en disco: {e}")
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.max_disk_bytes and self._disk_index:
+            key, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+            self.stats['disk_evictions'] += 1
+            try:
+                os.unlink(self._disk_path(key))
+            except OSError as e:
+                logger.warning(f"No se pudo eliminar {key} de la caché TTS: {e}")
@@ -0,0 +1,422 @@
+"""
+Pool de conexiones con el servicio de voz de Edge
+
+edge_tts.Communicate abre un WebSocket nuevo (con su handshake TLS) en cada
+síntesis. El protocolo admite varias peticiones seguidas por la misma
+conexión, así que el pool mantiene abiertas `size` conexiones ya calentadas
+y las reutiliza. La voz va en cada petición SSML: una misma conexión sirve
+para cualquier voz.
+
+Las conexiones de aiohttp pertenecen a un loop de eventos: cada loop
+necesita su propio pool.
+"""
+import asyncio
+import logging
+import random
+import re
+import ssl
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+from xml.sax.saxutils import escape
+
+import aiohttp
+import certifi
+from edge_tts.constants import WSS_URL
+
+from utils.metrics import increment
+
+try:
+    # Versiones recientes de edge-tts: el servicio exige un token Sec-MS-GEC
+    from edge_tts.constants import SEC_MS_GEC_VERSION, WSS_HEADERS
+    from edge_tts.drm import DRM
+except ImportError:
+    DRM = None
+
+logger = logging.getLogger(__name__)
+
+_HEADERS = {
+    "Pragma": "no-cache",
+    "Cache-Control": "no-cache",
+    "Origin": "chrome-extension://jdiccldimpdaibmpdkjnbmckianbfold",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Accept-Language": "en-US,en;q=0.9",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+                  " (KHTML, like Gecko) Chrome/91.0.4472.77 Safari/537.36 Edg/91.0.864.41",
+}
+
+_SSL_CONTEXT = ssl.create_default_context(cafile=certifi.where())
+
+# Texto máximo por petición SSML (el servicio corta los mensajes de 64 KB)
+_MAX_TEXT_BYTES = 32768
+
+_INCOMPATIBLE_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_SHORT_VOICE = re.compile(r'^([a-z]{2,})-([A-Z]{2,})-(.+Neural)$')
+
+
+def _timestamp() -> str:
+    return time.strftime("%a %b %d %Y %H:%M:%S GMT+0000 (Coordinated Universal Time)", time.gmtime())
+
+
+def _full_voice_name(voice: str) -> str:
+    """'es-MX-DaliaNeural' -> nombre completo que espera el servicio (como edge-tts)"""
+    match = _SHORT_VOICE.match(voice)
+    if not match:
+        return voice
+    lang, region, name = match.groups()
+    if '-' in name:
+        region = f"{region}-{name[:name.find('-')]}"
+        name = name[name.find('-') + 1:]
+    return f"Microsoft Server Speech Text to Speech Voice ({lang}-{region}, {name})"
+
+
+def _split_text(text: str) -> List[str]:
+    """Trozos escapados para XML de hasta _MAX_TEXT_BYTES, cortando en espacios"""
+    pieces, current = [], ''
+    for word in text.split(' '):
+        candidate = f"{current} {word}" if current else word
+        if len(escape(candidate).encode('utf-8')) <= _MAX_TEXT_BYTES:
+            current = candidate
+            continue
+        if current:
+            pieces.append(escape(current))
+        # Una "palabra" más larga que el límite se corta por caracteres
+        while len(escape(word).encode('utf-8')) > _MAX_TEXT_BYTES:
+            cut = _MAX_TEXT_BYTES // 8
+            pieces.append(escape(word[:cut]))
+            word = word[cut:]
+        current = word
+    if current:
+        pieces.append(escape(current))
+    return pieces
+
+
+def _text_path(data: str) -> Optional[str]:
+    """Valor de la cabecera Path de un mensaje de texto del servicio"""
+    headers = data.split('\r\n\r\n', 1)[0]
+    for line in headers.split('\r\n'):
+        if line.startswith('Path:'):
+            return line[5:].strip()
+    return None
+
+
+class ConnectionLost(Exception):
+    """El servicio cerró la conexión en mitad de una síntesis"""
+
+
+class _Connection:
+    """
+    WebSocket abierto y su historial de uso
+
+    Un lector recibe siempre del WebSocket, también mientras la conexión
+    está libre: si el servicio la cierra se nota al momento y no al
+    intentar reutilizarla.
+    """
+
+    def __init__(self, ws: aiohttp.ClientWebSocketResponse, on_lost: Callable[[], None]):
+        self.ws = ws
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.requests = 0
+        self.messages: "asyncio.Queue[aiohttp.WSMessage]" = asyncio.Queue()
+        self._on_lost = on_lost
+        self.reader = asyncio.ensure_future(self._read())
+
+    async def _read(self):
+        try:
+            while True:
+                message = await self.ws.receive()
+                self.messages.put_nowait(message)
+                if message.type not in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                    break
+        finally:
+            self._on_lost()
+
+    def healthy(self, max_idle: float) -> bool:
+        # Un mensaje sin leer con la conexión libre también la invalida
+        return (not self.reader.done() and self.messages.empty()
+                and time.monotonic() - self.last_used < max_idle)
+
+    async def close(self):
+        try:
+            await self.ws.close()
+        except Exception:
+            pass
+
+
+class EdgeTTSPool:
+    """
+    Conexiones calientes con el servicio de voz
+
+    - Al pedir una conexión se descartan las cerradas, con error o inactivas
+      más de `max_idle` segundos (el servicio cierra las que no usa).
+    - Cada `check_interval` segundos, o en cuanto se cierra una conexión, se
+      comprueban las libres con un ping y se repone el pool hasta `size`.
+      Si conectar falla, los reintentos se espacian con backoff exponencial
+      (con jitter) hasta `max_backoff`.
+    - Si hacen falta más de `size` conexiones a la vez se abren otras, que
+      se cierran al devolverlas si ya hay `size` libres.
+    - Una síntesis que falla en una conexión reutilizada se repite una vez
+      con una conexión nueva (pudo cerrarse mientras esperaba). Si el
+      servicio deja de enviar mensajes durante `receive_timeout` segundos,
+      la conexión se da por perdida.
+    """
+
+    def __init__(self, size: int = 2, url: Optional[str] = None, max_idle: float = 60.0,
+                 check_interval: float = 10.0, connect_timeout: float = 10.0,
+                 max_backoff: float = 30.0, receive_timeout: float = 10.0):
+        self.size = size
+        self.url = url or WSS_URL
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+        self.connect_timeout = connect_timeout
+        self.max_backoff = max_backoff
+        self.receive_timeout = receive_timeout
+
+        self._idle: List[_Connection] = []
+        self._busy = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._maintainer: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._failures = 0
+        self._closed = False
+        self._stats = {'connects': 0, 'reused': 0, 'connect_errors': 0, 'discarded': 0, 'connect_ms': 0.0}
+
+    def start(self):
+        """Abrir las conexiones en segundo plano (desde el loop del pool)"""
+        if self._maintainer is None and self.size > 0:
+            self._wakeup = asyncio.Event()
+            self._maintainer = asyncio.ensure_future(self._maintain())
+
+    async def close(self):
+        """Cerrar todas las conexiones y la sesión"""
+        self._closed = True
+        if self._maintainer:
+            self._maintainer.cancel()
+        for conn in self._idle:
+            await conn.close()
+        self._idle.clear()
+        if self._session:
+            await self._session.close()
+
+    # Síntesis
+
+    async def synthesize(self, text: str, voice: str,
+                         rate: str = '+0%', pitch: str = '+0Hz') -> bytes:
+        """
+        Sintetizar texto a MP3 por una conexión del pool
+
+        Raises:
+            aiohttp.ClientError, ConnectionLost, asyncio.TimeoutError: si falla
+            también con una conexión nueva
+        """
+        chunks = _split_text(_INCOMPATIBLE_CHARS.sub(' ', text))
+        ssml_voice = _full_voice_name(voice)
+
+        conn = await self._acquire()
+        while True:
+            reused = conn.requests > 0
+            try:
+                audio = await self._request(conn, chunks, ssml_voice, rate, pitch)
+            except (aiohttp.ClientError, ConnectionLost, ConnectionError):
+                self._discard(conn)
+                if not reused:
+                    raise
+                logger.info("Conexión TTS reutilizada caída, se reintenta con una nueva")
+                conn = await self._open_busy()
+                continue
+            except BaseException:
+                # Cancelación o timeout a mitad de turno: el estado del
+                # protocolo es incierto, la conexión no se reutiliza
+                self._discard(conn)
+                raise
+            self._release(conn)
+            return audio
+
+    async def _request(self, conn: _Connection, chunks: List[str], voice: str,
+                       rate: str, pitch: str) -> bytes:
+        """Enviar cada trozo como una petición SSML y juntar el audio hasta turn.end"""
+        audio = bytearray()
+        for chunk in chunks:
+            await conn.ws.send_str(
+                f"X-RequestId:{uuid.uuid4().hex}\r\n"
+                "Content-Type:application/ssml+xml\r\n"
+                f"X-Timestamp:{_timestamp()}Z\r\n"
+                "Path:ssml\r\n\r\n"
+                "<speak version='1.0' xmlns='http://www.w3.org/2001/10/synthesis' xml:lang='en-US'>"
+                f"<voice name='{voice}'><prosody pitch='{pitch}' rate='{rate}' volume='+0%'>"
+                f"{chunk}</prosody></voice></speak>"
+            )
+            while True:
+                try:
+                    message = await asyncio.wait_for(conn.messages.get(), self.receive_timeout)
+                except asyncio.TimeoutError:
+                    raise ConnectionLost(f"El servicio de voz no respondió en {self.receive_timeout} s") from None
+                if message.type == aiohttp.WSMsgType.TEXT:
+                    if _text_path(message.data) == 'turn.end':
+                        break
+                elif message.type == aiohttp.WSMsgType.BINARY:
+                    # 2 bytes con la longitud de la cabecera, cabecera y audio
+                    header_length = int.from_bytes(message.data[:2], 'big')
+                    audio.extend(message.data[2 + header_length:])
+                else:
+                    raise ConnectionLost(f"El servicio de voz cerró la conexión ({message.type.name})")
+        conn.requests += 1
+        return bytes(audio)
+
+    # Conexiones
+
+    async def _acquire(self) -> _Connection:
+        while self._idle:
+            conn = self._idle.pop()
+            if conn.healthy(self.max_idle):
+                self._busy += 1
+                self._stats['reused'] += 1
+                increment('tts_connections', 'reused')
+                return conn
+            await self._close(conn)
+        if self._wakeup:
+            # Reponer el pool en segundo plano
+            self._wakeup.set()
+        return await self._open_busy()
+
+    async def _open_busy(self) -> _Connection:
+        conn = await self._connect()
+        self._busy += 1
+        return conn
+
+    def _release(self, conn: _Connection):
+        self._busy -= 1
+        conn.last_used = time.monotonic()
+        if self._closed or len(self._idle) >= self.size:
+            asyncio.ensure_future(self._close(conn))
+        else:
+            self._idle.append(conn)
+
+    def _discard(self, conn: _Connection):
+        self._busy -= 1
+        self._stats['discarded'] += 1
+        asyncio.ensure_future(self._close(conn))
+
+    async def _close(self, conn: _Connection):
+        await conn.close()
+
+    def _connection_lost(self):
+        """Una conexión terminó: revisar y reponer el pool cuanto antes"""
+        if self._wakeup and not self._closed:
+            self._wakeup.set()
+
+    async def _connect(self) -> _Connection:
+        """Abrir un WebSocket y enviar la configuración de salida"""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(trust_env=True)
+
+        url = f"{self.url}&ConnectionId={uuid.uuid4().hex}"
+        headers = _HEADERS
+        if DRM is not None and self.url == WSS_URL:
+            url += f"&Sec-MS-GEC={DRM.generate_sec_ms_gec()}&Sec-MS-GEC-Version={SEC_MS_GEC_VERSION}"
+            headers = DRM.headers_with_muid(WSS_HEADERS)
+
+        start = time.perf_counter()
+        try:
+            ws = await asyncio.wait_for(
+                self._session.ws_connect(url, compress=15, headers=headers, ssl=_SSL_CONTEXT),
+                self.connect_timeout
+            )
+        except Exception:
+            self._stats['connect_errors'] += 1
+            raise
+        try:
+            await ws.send_str(
+                f"X-Timestamp:{_timestamp()}\r\n"
+                "Content-Type:application/json; charset=utf-8\r\n"
+                "Path:speech.config\r\n\r\n"
+                '{"context":{"synthesis":{"audio":{"metadataoptions":{'
+                '"sentenceBoundaryEnabled":"true","wordBoundaryEnabled":"false"},'
+                '"outputFormat":"audio-24khz-48kbitrate-mono-mp3"}}}}\r\n'
+            )
+        except BaseException as error:
+            # El WebSocket ya está abierto: cerrarlo para no perder el socket
+            try:
+                await ws.close()
+            except Exception:
+                pass
+            if isinstance(error, Exception):
+                self._stats['connect_errors'] += 1
+            raise
+        self._stats['connects'] += 1
+        self._stats['connect_ms'] += (time.perf_counter() - start) * 1000
+        increment('tts_connections', 'new')
+        return _Connection(ws, self._connection_lost)
+
+    # Mantenimiento
+
+    async def _maintain(self):
+        """Comprobar las conexiones libres y reponer el pool con backoff"""
+        while not self._closed:
+            flapping = await self._check_idle()
+            delay = self.check_interval
+            if not await self._refill() or flapping:
+                self._failures += 1
+                delay = min(self.max_backoff, 0.5 * 2 ** (self._failures - 1)) * random.uniform(0.5, 1.0)
+                logger.warning(f"No se pudo conectar con el servicio de voz, reintento en {delay:.1f} s")
+            elif self._failures:
+                logger.info("Conexión con el servicio de voz recuperada")
+                self._failures = 0
+            if self._failures:
+                # Durante el backoff no se adelanta el siguiente intento
+                await asyncio.sleep(delay)
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+
+    async def _check_idle(self) -> bool:
+        """
+        Cerrar las conexiones libres caducadas o que no responden al ping
+
+        Returns:
+            True si alguna murió sin llegar a usarse y recién abierta (el
+            servicio acepta y corta): se trata como un fallo al conectar
+        """
+        flapping = False
+        for conn in list(self._idle):
+            alive = conn.healthy(self.max_idle)
+            if alive:
+                try:
+                    await conn.ws.ping()
+                except Exception:
+                    alive = False
+            if not alive and conn in self._idle:
+                self._idle.remove(conn)
+                await self._close(conn)
+                if not conn.requests and time.monotonic() - conn.created < self.check_interval:
+                    flapping = True
+        return flapping
+
+    async def _refill(self) -> bool:
+        """Abrir conexiones hasta tener `size` libres; False si falla alguna"""
+        while not self._closed and len(self._idle) + self._busy < self.size:
+            try:
+                conn = await self._connect()
+            except Exception as e:
+                logger.debug(f"Error conectando con el servicio de voz: {e}")
+                return False
+            conn.last_used = time.monotonic()
+            self._idle.append(conn)
+        return True
+
+    def get_stats(self) -> Dict[str, float]:
+        connects = self._stats['connects']
+        return {
+            'size': self.size,
+            'idle': len(self._idle),
+            'busy': self._busy,
+            'connects': connects,
+            'reused': self._stats['reused'],
+            'connect_errors': self._stats['connect_errors'],
+            'discarded': self._stats['discarded'],
+            'avg_connect_ms': round(self._stats['connect_ms'] / connects, 1) if connects else 0.0
+        }
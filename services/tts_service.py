@@ -2,23 +2,123 @@
 Servicio de Text-to-Speech con edge-tts
 """
 import edge_tts
-import tempfile
-import os
 import base64
 import asyncio
 import logging
-import re
+import threading
 from typing import Optional, List, Dict
+from services.tts_cache import TTSCache
+from utils.metrics import span
+from utils.sentence_splitter import SentenceSplitter
+from utils.single_flight import SingleFlight, AsyncSingleFlight
+from utils.text_normalizer import normalizer_for_voice
 
 logger = logging.getLogger(__name__)
 
+
+def join_mp3(parts: List[bytes]) -> bytes:
+    """
+    Unir varios MP3 en uno sin recodificar
+    
+    Las tramas MPEG se pueden concatenar tal cual; solo se quita la cabecera
+    ID3v2 de los fragmentos que no van primero.
+    """
+    audio = bytearray(parts[0])
+    for part in parts[1:]:
+        audio.extend(part[_id3_size(part):])
+    return bytes(audio)
+
+
+def _id3_size(data: bytes) -> int:
+    """Tamaño de la cabecera ID3v2 al inicio de un MP3 (0 si no tiene)"""
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    # Tamaño "synchsafe": 4 bytes de 7 bits
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def prosody(rate: float, pitch: float) -> Dict[str, str]:
+    """
+    Convertir los multiplicadores de velocidad y tono al formato de edge-tts
+
+    edge-tts expresa la velocidad en porcentaje relativo y el tono en Hz
+    relativos: 1.2 → '+20%' y '+20Hz'; 1.0 deja la voz sin cambios.
+    """
+    return {
+        'rate': f"{round((rate - 1) * 100):+d}%",
+        'pitch': f"{round((pitch - 1) * 100):+d}Hz",
+    }
+
+
 class TTSService:
     """Servicio para convertir texto a voz usando edge-tts"""
     
-    def __init__(self, default_voice: str = "es-MX-DaliaNeural"):
+    def __init__(self, default_voice: str = "es-MX-DaliaNeural",
+                 rate: float = 1.0, pitch: float = 1.0,
+                 cache: Optional[TTSCache] = None,
+                 timeout: float = 30.0,
+                 parallel_sentences: int = 1,
+                 parallel_min_chars: int = 300,
+                 single_flight: bool = True,
+                 pool_size: int = 0,
+                 pool_url: str = '',
+                 pool_max_idle: float = 60.0,
+                 pool_receive_timeout: float = 10.0):
         self.default_voice = default_voice
+        self.rate = rate
+        self.pitch = pitch
+        self._prosody = prosody(rate, pitch)
+        self.cache = cache
+        self.timeout = timeout
+        # Textos largos: se sintetizan por oraciones, varias a la vez
+        self.parallel_sentences = parallel_sentences
+        self.parallel_min_chars = parallel_min_chars
+        # Síntesis idénticas simultáneas (mismo texto y voz) comparten el resultado
+        self._flight = SingleFlight('tts') if single_flight else None
+        self._async_flight = AsyncSingleFlight('tts') if single_flight else None
         self.voices = self._get_spanish_voices()
         
+        # Conexiones calientes con el servicio de voz: un pool por loop de
+        # eventos (el del servicio y, con uvicorn, el del servidor)
+        self.pool_size = pool_size
+        self._pool_options = {'size': pool_size, 'url': pool_url or None, 'max_idle': pool_max_idle,
+                              'receive_timeout': pool_receive_timeout}
+        self._pools = {}
+        
+        # Loop de eventos persistente: edge-tts es asíncrono y las peticiones
+        # llegan desde hilos de Flask, así que se le envían corrutinas
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(
+            target=self._run_loop, name="tts-event-loop", daemon=True
+        )
+        self._loop_thread.start()
+        if pool_size > 0:
+            # Abrir las conexiones ya, sin esperar a la primera respuesta
+            self._loop.call_soon_threadsafe(self._get_pool)
+    
+    def _run_loop(self):
+        """Ejecutar el loop de eventos en su hilo dedicado"""
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+    
+    def is_alive(self) -> bool:
+        """Verificar que el loop de eventos sigue en marcha"""
+        return self._loop_thread.is_alive()
+    
+    def shutdown(self):
+        """Cerrar las conexiones del pool y detener el loop de eventos"""
+        if self._loop.is_running():
+            if self._loop in self._pools:
+                future = asyncio.run_coroutine_threadsafe(self.close_pool(), self._loop)
+                try:
+                    future.result(timeout=5)
+                except Exception as e:
+                    logger.warning(f"No se pudo cerrar el pool de TTS: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join(timeout=5)
+        
     def generate_audio(self, text: str, voice: Optional[str] = None) -> Optional[str]:
         """
         Generar audio desde texto
@@ -30,74 +130,189 @@ class TTSService:
         Returns:
             Audio en base64 o None si hay error
         """
-        if not voice:
-            voice = self.default_voice
+        audio_data = self.synthesize(text, voice)
+        if audio_data is None:
+            return None
+        with span('encode'):
+            return base64.b64encode(audio_data).decode('utf-8')
+    
+    def synthesize(self, text: str, voice: Optional[str] = None) -> Optional[bytes]:
+        """
+        Generar audio MP3 desde texto
+        
+        Si ya se está sintetizando el mismo texto con la misma voz, espera
+        a esa síntesis en lugar de repetirla.
         
-        # Limpiar el texto antes de convertirlo a voz
-        text = self._clean_text_for_speech(text)
+        Args:
+            text: Texto a convertir
+            voice: Voz a usar (opcional)
             
+        Returns:
+            Bytes del MP3 o None si hay error
+        """
+        text, voice, cache_key, audio_data = self._prepare(text, voice)
+        if audio_data is not None:
+            return audio_data
+        
+        with span('tts'):
+            if self._flight:
+                key = cache_key or TTSCache.make_key(text, voice, self.rate, self.pitch)
+                return self._flight.do(key, lambda: self._render_sync(text, voice, cache_key))
+            return self._render_sync(text, voice, cache_key)
+    
+    def _render_sync(self, text: str, voice: str, cache_key: Optional[str]) -> Optional[bytes]:
+        """Sintetizar en el loop del servicio y esperar el resultado"""
+        future = asyncio.run_coroutine_threadsafe(
+            self._render(text, voice, cache_key), self._loop
+        )
         try:
-            # Edge-tts es asíncrono, así que lo ejecutamos en un loop
-            audio_base64 = asyncio.run(self._generate_audio_async(text, voice))
-            return audio_base64
+            return future.result(timeout=self.timeout)
         except Exception as e:
+            future.cancel()
             logger.error(f"Error generando audio: {e}")
             return None
     
-    def _clean_text_for_speech(self, text: str) -> str:
-        """Limpiar texto para síntesis de voz"""
+    async def synthesize_async(self, text: str, voice: Optional[str] = None) -> Optional[bytes]:
+        """
+        Generar audio MP3 desde texto en el loop de eventos actual
+        
+        Versión para código asíncrono: edge-tts se ejecuta directamente en el
+        loop del llamador, sin pasar por el hilo del servicio. Si la tarea se
+        cancela, la conexión con el servicio de voz se cierra.
+        
+        Returns:
+            Bytes del MP3 o None si hay error
+        """
+        text, voice, cache_key, audio_data = self._prepare(text, voice)
+        if audio_data is not None:
+            return audio_data
+        
+        with span('tts'):
+            if self._async_flight:
+                key = cache_key or TTSCache.make_key(text, voice, self.rate, self.pitch)
+                return await self._async_flight.do(key, lambda: self._render_async(text, voice, cache_key))
+            return await self._render_async(text, voice, cache_key)
+    
+    async def _render_async(self, text: str, voice: str, cache_key: Optional[str]) -> Optional[bytes]:
         try:
-            # Primero, eliminar contenido entre asteriscos (como *adjusts glasses*)
-            text = re.sub(r'\*[^*]+\*', '', text)
-            
-            # Eliminar emojis usando un patrón más simple
-            text = re.sub(r'[^\w\s.,;:!?¿¡áéíóúñÁÉÍÓÚÑüÜ\-]', ' ', text)
-            
-            # Eliminar texto entre paréntesis
-            text = re.sub(r'\([^)]*\)', '', text)
-            
-            # Eliminar múltiples espacios
-            text = re.sub(r'\s+', ' ', text)
-            
-            # Eliminar espacios al inicio y final
-            text = text.strip()
-            
-            return text
-        except Exception as e:
-            logger.error(f"Error limpiando texto: {e}")
-            # Si hay error, devolver el texto original sin caracteres problemáticos
-            return ''.join(c for c in text if c.isalnum() or c.isspace() or c in '.,;:!?¿¡-')
+            return await asyncio.wait_for(self._render(text, voice, cache_key), self.timeout)
+        except asyncio.TimeoutError:
+            logger.error("Tiempo de espera agotado generando audio")
+            return None
+    
+    def _prepare(self, text: str, voice: Optional[str]):
+        """Limpiar el texto y consultar la caché: (texto, voz, clave, audio en caché)"""
+        if not voice:
+            voice = self.default_voice
+        
+        # Limpiar y normalizar el texto antes de convertirlo a voz
+        text = normalizer_for_voice(voice).normalize(text)
+        
+        # Buscar en caché antes de sintetizar
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.make_key(text, voice, self.rate, self.pitch)
+            audio_data = self.cache.get(cache_key)
+            if audio_data is not None:
+                return text, voice, cache_key, audio_data
+        
+        return text, voice, cache_key, None
+    
+    async def _render(self, text: str, voice: str, cache_key: Optional[str]) -> Optional[bytes]:
+        """
+        Sintetizar texto ya limpio que no estaba en caché
+        
+        Los textos largos se dividen en oraciones que se sintetizan a la vez,
+        como máximo parallel_sentences en vuelo, y se unen en orden. Cada
+        oración pasa por la caché, así que las que se repiten no cuestan nada.
+        """
+        sentences = self._split_sentences(text)
+        if len(sentences) < 2:
+            audio_data = await self._generate_audio_async(text, voice)
+            if audio_data is not None and cache_key:
+                self.cache.put(cache_key, audio_data)
+            return audio_data
+        
+        semaphore = asyncio.Semaphore(self.parallel_sentences)
+        
+        async def render_sentence(sentence: str) -> Optional[bytes]:
+            sentence_key = self.cache.make_key(sentence, voice, self.rate, self.pitch) if self.cache else None
+            audio_data = self.cache.get(sentence_key) if sentence_key else None
+            if audio_data is not None:
+                return audio_data
+            async with semaphore:
+                audio_data = await self._generate_audio_async(sentence, voice)
+            if audio_data is not None and sentence_key:
+                self.cache.put(sentence_key, audio_data)
+            return audio_data
+        
+        parts = await asyncio.gather(*(render_sentence(sentence) for sentence in sentences))
+        if any(part is None for part in parts):
+            return None
+        audio_data = join_mp3(parts)
+        # La respuesta completa también se guarda: repetirla es un solo acierto
+        if cache_key:
+            self.cache.put(cache_key, audio_data)
+        return audio_data
+    
+    def _split_sentences(self, text: str) -> List[str]:
+        """Oraciones para la síntesis en paralelo; las mismas que produce el streaming"""
+        if self.parallel_sentences < 2 or len(text) < self.parallel_min_chars:
+            return [text]
+        splitter = SentenceSplitter()
+        return splitter.feed(text) + splitter.flush()
     
-    async def _generate_audio_async(self, text: str, voice: str) -> Optional[str]:
-        """Generar audio de forma asíncrona"""
-        temp_path = None
+    def get_cache_stats(self) -> Optional[Dict[str, int]]:
+        """Obtener estadísticas de la caché de audio"""
+        return self.cache.get_stats() if self.cache else None
+    
+    def get_pool_stats(self) -> Optional[Dict[str, Dict[str, float]]]:
+        """Obtener estadísticas de las conexiones con el servicio de voz"""
+        if not self._pools:
+            return None
+        return {'service' if loop is self._loop else 'server': pool.get_stats()
+                for loop, pool in list(self._pools.items())}
+    
+    def _get_pool(self):
+        """Pool del loop de eventos actual (se crea y calienta la primera vez)"""
+        from services.tts_pool import EdgeTTSPool
+        
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None:
+            pool = self._pools[loop] = EdgeTTSPool(**self._pool_options)
+            pool.start()
+        return pool
+    
+    def start_pool(self):
+        """Calentar el pool del loop de eventos actual (p. ej. el de uvicorn)"""
+        if self.pool_size > 0:
+            self._get_pool()
+    
+    async def close_pool(self):
+        """Cerrar el pool del loop de eventos actual"""
+        pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool:
+            await pool.close()
+    
+    async def _generate_audio_async(self, text: str, voice: str) -> Optional[bytes]:
+        """Generar audio de forma asíncrona, acumulando el stream en memoria"""
         try:
-            # Crear comunicación con edge-tts
-            communicate = edge_tts.Communicate(text, voice)
+            if self.pool_size > 0:
+                return await self._get_pool().synthesize(text, voice, **self._prosody) or None
             
-            # Guardar en archivo temporal
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp_file:
-                temp_path = tmp_file.name
-                await communicate.save(tmp_file.name)
+            communicate = edge_tts.Communicate(text, voice, **self._prosody)
             
-            # Leer y convertir a base64
-            with open(temp_path, 'rb') as f:
-                audio_data = f.read()
+            audio_data = bytearray()
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    audio_data.extend(chunk["data"])
             
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-            return audio_base64
+            return bytes(audio_data) if audio_data else None
             
         except Exception as e:
             logger.error(f"Error en generación asíncrona: {e}")
             return None
-            
-        finally:
-            # Limpiar archivo temporal
-            if temp_path and os.path.exists(temp_path):
-                try:
-                    os.unlink(temp_path)
-                except Exception as e:
-                    logger.warning(f"No se pudo eliminar archivo temporal: {e}")
     
     def _get_spanish_voices(self) -> List[Dict[str, str]]:
         """Obtener lista de voces en español disponibles"""
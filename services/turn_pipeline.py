@@ -0,0 +1,165 @@
+"""
+Turno de voz asíncrono: Whisper → Ollama → TTS
+"""
+import asyncio
+import base64
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, AsyncIterator
+
+from models.async_ollama_client import AsyncOllamaClient, AsyncTokenStream
+from utils.sentence_splitter import SentenceSplitter
+from utils.text_normalizer import normalizer_for_voice
+from utils.metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTurnPipeline:
+    """
+    Ejecuta las etapas de un turno sin bloquear un hilo por petición
+
+    - Whisper (CPU/GPU) se ejecuta en un pool de hilos acotado
+    - Ollama se consulta con HTTP asíncrono
+    - edge-tts se usa de forma nativa en el loop de eventos
+
+    Todo lo que hace el turno cuelga de la tarea de la petición: si se
+    cancela (el cliente se desconectó), se cierra la conexión con Ollama y se
+    cancelan las síntesis pendientes.
+    """
+
+    def __init__(self, services, whisper_threads: int = 4):
+        self.services = services
+        self.config = services.config
+        self.ollama = AsyncOllamaClient(self.config.OLLAMA_HOST, self.config.OLLAMA_PORT)
+        self._whisper_executor = ThreadPoolExecutor(
+            max_workers=whisper_threads, thread_name_prefix="whisper-async"
+        )
+
+    async def close(self):
+        """Cerrar conexiones y el pool de Whisper"""
+        await self.ollama.close()
+        self._whisper_executor.shutdown(wait=False, cancel_futures=True)
+
+    async def transcribe(self, data: bytes, language: str = "es") -> Optional[str]:
+        """Transcribir audio comprimido en el pool de Whisper"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._whisper_executor, self._transcribe_sync, data, language)
+
+    def _transcribe_sync(self, data: bytes, language: str) -> Optional[str]:
+        # El servicio se construye (y el modelo se carga) fuera del loop
+        return self.services.whisper_service.transcribe_bytes(data, language)
+
+    async def add_user_message(self, session_id: str, text: str) -> List[Dict[str, str]]:
+        """Registrar el mensaje del usuario y devolver la conversación a enviar"""
+        return await self._run_conversation(self._add_user_message_sync, session_id, text)
+
+    def _add_user_message_sync(self, session_id: str, text: str) -> List[Dict[str, str]]:
+        conversation_manager = self.services.conversation_manager
+        conversation_manager.add_message(session_id, "user", text)
+        return conversation_manager.get_conversation(session_id)
+
+    async def add_bot_message(self, session_id: str, text: str):
+        await self._run_conversation(self.services.conversation_manager.add_message, session_id, "assistant", text)
+
+    async def _run_conversation(self, function, *args):
+        """
+        Ejecutar una operación del historial
+
+        Con un almacén externo (SQLite o Redis) leer espera a que se confirmen
+        las escrituras pendientes, así que se hace fuera del loop de eventos;
+        en memoria basta con tomar un lock.
+        """
+        if self.services.conversation_manager.store:
+            return await asyncio.to_thread(function, *args)
+        return function(*args)
+
+    async def render_audio(self, text: str, voice: str, audio_mode: str, base64_key: str = 'audio') -> dict:
+        """Sintetizar audio y devolverlo según el modo de respuesta (como render_audio de app.py)"""
+        audio_data = await self.services.tts_service.synthesize_async(text, voice)
+        if audio_mode == 'url':
+            if not audio_data:
+                return {'audio_url': None}
+            audio_store = self.services.audio_store
+            if audio_store.directory:
+                audio_id = await asyncio.to_thread(audio_store.put, audio_data)
+            else:
+                audio_id = audio_store.put(audio_data)
+            if audio_id:
+                return {'audio_url': f"/audio/{audio_id}"}
+            # No cabe en el almacén: se envía en línea
+        if not audio_data:
+            return {base64_key: None}
+        with span('encode'):
+            return {base64_key: base64.b64encode(audio_data).decode('utf-8')}
+
+    async def stream_events(self, session_id: str, tokens: AsyncTokenStream, voice: str,
+                            audio_mode: str = 'base64', first_event: Optional[dict] = None) -> AsyncIterator[dict]:
+        """
+        Generar los eventos de un turno en streaming
+
+        Mismo protocolo que stream_turn de app.py: tokens a medida que llegan
+        y el audio de cada oración en orden.
+        """
+        splitter = SentenceSplitter()
+        # Normalizar antes de segmentar: "Sr." o "3.5" no cierran oración
+        normalizer = normalizer_for_voice(voice or self.config.TTS_VOICE).stream()
+        pending = deque()
+        parts = []
+        submitted = 0
+
+        def submit(sentence):
+            nonlocal submitted
+            task = asyncio.ensure_future(self.render_audio(sentence, voice, audio_mode))
+            pending.append((submitted, sentence, task))
+            submitted += 1
+
+        async def ready_audio(wait):
+            # Respetar el orden: solo se emite la cabeza de la cola
+            while pending and (wait or pending[0][2].done()):
+                index, sentence, task = pending.popleft()
+                event = {'type': 'audio', 'index': index, 'text': sentence}
+                event.update(await task)
+                yield event
+
+        try:
+            if first_event:
+                yield first_event
+
+            async for token in tokens:
+                parts.append(token)
+                yield {'type': 'token', 'text': token}
+
+                for sentence in splitter.feed(normalizer.feed(token)):
+                    submit(sentence)
+                async for event in ready_audio(wait=False):
+                    yield event
+
+            bot_response = ''.join(parts).strip()
+            if not bot_response:
+                logger.error("No se recibió respuesta de Ollama")
+                yield {'type': 'error', 'error': 'Error getting response from Ollama'}
+                return
+
+            await self.add_bot_message(session_id, bot_response)
+
+            for sentence in splitter.feed(normalizer.flush()) + splitter.flush():
+                submit(sentence)
+            async for event in ready_audio(wait=True):
+                yield event
+
+            yield {'type': 'done', 'response': bot_response}
+
+        except asyncio.CancelledError:
+            logger.info("Turno cancelado: el cliente se desconectó")
+            raise
+
+        except Exception as e:
+            logger.error(f"Error en streaming: {e}")
+            yield {'type': 'error', 'error': str(e)}
+
+        finally:
+            for _, _, task in pending:
+                task.cancel()
+            await tokens.aclose()
@@ -0,0 +1,125 @@
+"""
+Backends de inferencia de Whisper
+
+- openai: openai-whisper sobre PyTorch. Con WHISPER_COMPUTE_TYPE=int8 las
+  capas Linear se cuantizan dinámicamente a int8 (solo CPU).
+- faster-whisper: CTranslate2, opcional (pip install faster-whisper).
+  WHISPER_COMPUTE_TYPE se pasa tal cual (int8, int8_float16, float16...).
+
+Todos exponen transcribe(audio, language) -> texto.
+"""
+import logging
+from typing import Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('openai', 'faster-whisper')
+
+
+class WhisperBackend:
+    """Interfaz común de los backends"""
+
+    name = ''
+
+    def __init__(self, compute_type: str):
+        self.compute_type = compute_type
+        # Modelo de openai-whisper: lo necesitan el worker por lotes y el
+        # pool multiproceso. None en backends que no son PyTorch.
+        self.model = None
+
+    def transcribe(self, audio: Union[np.ndarray, str], language: str = "es") -> str:
+        """
+        Transcribir PCM mono float32 a 16 kHz (o la ruta de un archivo)
+
+        Returns:
+            Texto transcrito (vacío si no hay voz)
+        """
+        raise NotImplementedError
+
+
+def quantize_int8(model):
+    """Cuantizar dinámicamente a int8 las capas Linear del modelo (en el sitio)"""
+    import torch
+    from whisper.model import Linear
+
+    # whisper.model.Linear solo redefine forward() para igualar el dtype de
+    # los pesos, y quantize_dynamic solo reconoce nn.Linear exacto
+    for module in model.modules():
+        if type(module) is Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def load_openai_model(model_name: str, device: Optional[str] = None, compute_type: str = 'default'):
+    """Cargar un modelo de openai-whisper, cuantizado si compute_type es int8"""
+    # whisper importa torch: solo se paga al cargar el modelo
+    import whisper
+
+    if compute_type == 'int8':
+        if device not in (None, 'cpu'):
+            logger.warning("La cuantización int8 solo funciona en CPU, se ignora el dispositivo pedido")
+        model = whisper.load_model(model_name, device='cpu')
+        return quantize_int8(model)
+    return whisper.load_model(model_name, device=device)
+
+
+class OpenAIWhisperBackend(WhisperBackend):
+    """openai-whisper sobre PyTorch (fp16 en GPU, fp32 o int8 en CPU)"""
+
+    name = 'openai'
+
+    def __init__(self, model, compute_type: str = 'default'):
+        super().__init__(compute_type)
+        self.model = model
+        self.fp16 = model.device.type == 'cuda' and compute_type != 'float32'
+
+    def transcribe(self, audio: Union[np.ndarray, str], language: str = "es") -> str:
+        return self.model.transcribe(audio, language=language, fp16=self.fp16)['text'].strip()
+
+
+class FasterWhisperBackend(WhisperBackend):
+    """
+    CTranslate2 vía faster-whisper
+
+    `workers` es el número de transcripciones que el modelo atiende a la vez
+    desde hilos distintos. Decodifica en greedy (beam_size=1), igual que
+    whisper.transcribe() por defecto, y sin su VAD: el de la aplicación ya
+    recorta los silencios.
+    """
+
+    name = 'faster-whisper'
+
+    def __init__(self, model_name: str, device: Optional[str] = None,
+                 compute_type: str = 'default', workers: int = 1):
+        super().__init__(compute_type)
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError("WHISPER_BACKEND=faster-whisper requiere instalar faster-whisper") from e
+
+        self._model = WhisperModel(model_name, device=device or 'auto', compute_type=compute_type,
+                                   num_workers=max(1, workers))
+
+    def transcribe(self, audio: Union[np.ndarray, str], language: str = "es") -> str:
+        # Los segmentos se generan al recorrerlos
+        segments, _ = self._model.transcribe(audio, language=language, beam_size=1)
+        return ''.join(segment.text for segment in segments).strip()
+
+
+def load_backend(backend: str, model_name: str, compute_type: str = 'default',
+                 device: Optional[str] = None, workers: int = 1) -> WhisperBackend:
+    """
+    Cargar el modelo con el backend pedido
+
+    Raises:
+        ValueError: si el backend no existe
+        ImportError: si falta la dependencia del backend
+    """
+    logger.info(f"Cargando modelo Whisper: {model_name} ({backend}, {compute_type})")
+    if backend == 'openai':
+        return OpenAIWhisperBackend(load_openai_model(model_name, device, compute_type), compute_type)
+    if backend == 'faster-whisper':
+        return FasterWhisperBackend(model_name, device, compute_type, workers)
+    raise ValueError(f"Backend de Whisper desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
@@ -0,0 +1,91 @@
+"""
+Pool multiproceso de Whisper para despliegues solo CPU
+"""
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Modelo compartido con los workers. Con 'fork' se asigna en el proceso padre
+# antes de crear los workers y los pesos se heredan copy-on-write; con 'spawn'
+# cada worker lo carga en su inicializador.
+_worker_model = None
+
+
+def _init_worker(model_name: Optional[str], threads: int, compute_type: str):
+    """Configurar hilos de torch y, si hace falta, cargar el modelo"""
+    global _worker_model
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Solo se puede fijar una vez por proceso
+        pass
+
+    if _worker_model is None and model_name:
+        from services.whisper_backends import load_openai_model
+        _worker_model = load_openai_model(model_name, "cpu", compute_type)
+
+
+def _transcribe_in_worker(audio: np.ndarray, language: str) -> str:
+    result = _worker_model.transcribe(audio, language=language, fp16=False)
+    return result['text'].strip()
+
+
+def _ping() -> bool:
+    return _worker_model is not None
+
+
+class WhisperProcessPool:
+    """Reparte transcripciones entre procesos que comparten el modelo"""
+
+    def __init__(self, model, model_name: str, processes: int = 2, threads_per_worker: int = 1,
+                 compute_type: str = 'default'):
+        global _worker_model
+
+        self.processes = processes
+        self.threads_per_worker = threads_per_worker
+
+        start_methods = multiprocessing.get_all_start_methods()
+        if 'fork' in start_methods:
+            # Los workers heredan los pesos ya cargados sin copiarlos
+            _worker_model = model
+            context = multiprocessing.get_context('fork')
+            load_name = None
+        else:
+            context = multiprocessing.get_context('spawn')
+            load_name = model_name
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(load_name, threads_per_worker, compute_type)
+        )
+
+        # Crear los procesos ahora, antes de que el padre ejecute inferencia
+        # (el runtime OpenMP de torch no sobrevive a un fork en uso)
+        for future in [self._executor.submit(_ping) for _ in range(processes)]:
+            future.result()
+
+        logger.info(f"Pool de Whisper: {processes} procesos x {threads_per_worker} hilos "
+                    f"({context.get_start_method()})")
+
+    def submit(self, audio: np.ndarray, language: str = "es") -> Future:
+        """Enviar audio (float32, 16 kHz) a un worker"""
+        return self._executor.submit(_transcribe_in_worker, audio, language)
+
+    def transcribe(self, audio: np.ndarray, language: str = "es",
+                   timeout: Optional[float] = None) -> str:
+        """Transcribir en un worker y esperar el texto"""
+        return self.submit(audio, language).result(timeout=timeout)
+
+    def shutdown(self):
+        """Esperar a las transcripciones en curso y cerrar los procesos"""
+        self._executor.shutdown(wait=True)
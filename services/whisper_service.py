@@ -2,27 +2,99 @@
 """
 Servicio de transcripción con Whisper
 """
-import whisper
 import tempfile
 import os
 import logging
+import threading
+import numpy as np
+from contextlib import contextmanager
 from typing import Optional
 from werkzeug.datastructures import FileStorage
+from utils.audio_decoder import decode_audio, SAMPLE_RATE
+from utils.vad import EnergyVAD
+from utils.metrics import span
+from services.whisper_backends import WhisperBackend, load_backend
 
 logger = logging.getLogger(__name__)
 
 class WhisperService:
     """Servicio para transcribir audio usando Whisper"""
     
-    def __init__(self, model_name: str = "base"):
-        logger.info(f"Cargando modelo Whisper: {model_name}")
-        self.model = whisper.load_model(model_name)
+    def __init__(self, model_name: str = "base", in_memory_decode: bool = True,
+                 batching: bool = False, batch_size: int = 8,
+                 batch_window: float = 0.05, batch_workers: int = 1,
+                 processes: int = 0, threads_per_worker: int = 1,
+                 vad: Optional[EnergyVAD] = None, model: Optional[WhisperBackend] = None,
+                 backend: str = 'openai', compute_type: str = 'default'):
         self.model_name = model_name
+        self.in_memory_decode = in_memory_decode
+        self.worker = None
+        self.pool = None
+        self.vad = vad
+        # True tras la primera inferencia (la de warmup() o la de un usuario)
+        self.warmed = False
+        
+        # Transcripciones en curso (para drenar antes de apagar)
+        self._in_flight = 0
+        self._idle = threading.Condition()
+        
+        # `model` permite reutilizar un backend ya cargado antes del fork
+        if model is None:
+            model = load_backend(backend, model_name, compute_type,
+                                 device="cpu" if processes > 0 else None, workers=batch_workers)
+        self.backend = model
+        # Modelo de PyTorch (None con faster-whisper)
+        self.model = model.model
+        
+        if (processes > 0 or batching) and self.model is None:
+            # El pool y el lote usan internos de openai-whisper; CTranslate2
+            # ya reparte el trabajo entre sus propios hilos
+            logger.warning(f"WHISPER_PROCESSES y WHISPER_BATCHING no se aplican con el backend {model.name}")
+            processes, batching = 0, False
+        
+        if processes > 0:
+            from services.whisper_pool import WhisperProcessPool
+            
+            # Modo multiproceso (solo CPU): los workers heredan este modelo
+            self.pool = WhisperProcessPool(self.model, model_name, processes, threads_per_worker,
+                                           compute_type=compute_type)
+        
+        # Worker por lotes: serializa el acceso al modelo entre hilos de Flask
+        if batching and not self.pool:
+            from services.transcription_worker import TranscriptionWorker
+            
+            self.worker = TranscriptionWorker(
+                self.model, max_batch_size=batch_size,
+                batch_window=batch_window, num_workers=batch_workers
+            )
         logger.info("Whisper cargado exitosamente")
     
     def is_loaded(self) -> bool:
         """Verificar si el modelo está cargado"""
-        return self.model is not None
+        return self.backend is not None
+    
+    def is_alive(self) -> bool:
+        """Verificar que los hilos del worker por lotes siguen vivos"""
+        return self.worker.is_alive() if self.worker else True
+    
+    def warmup(self, language: str = "es", seconds: float = 1.0):
+        """
+        Hacer una transcripción de prueba
+        
+        La primera inferencia inicializa kernels y cachés (y el contexto de
+        CUDA en GPU); así no la paga el primer usuario. Pasa por el pool o
+        el worker por lotes si los hay, sin VAD (el audio es silencio).
+        """
+        audio = np.zeros(int(SAMPLE_RATE * seconds), np.float32)
+        if self.pool:
+            # Una por proceso: cada uno tiene su propia copia del modelo
+            for future in [self.pool.submit(audio, language) for _ in range(self.pool.processes)]:
+                future.result()
+        elif self.worker:
+            self.worker.submit(audio, language).result()
+        else:
+            self.backend.transcribe(audio, language)
+        self.warmed = True
     
     def transcribe(self, audio_file: FileStorage, language: str = "es") -> Optional[str]:
         """
@@ -35,6 +107,105 @@ class WhisperService:
         Returns:
             Texto transcrito o None si hay error
         """
+        with self._track():
+            if not self.in_memory_decode:
+                return self._transcribe_via_tempfile(audio_file, language)
+            
+            return self.transcribe_bytes(audio_file.read(), language)
+    
+    def transcribe_bytes(self, data: bytes, language: str = "es") -> Optional[str]:
+        """
+        Transcribir audio comprimido (webm, ogg, wav...) recibido en memoria
+        
+        Args:
+            data: Contenido del archivo de audio
+            language: Código de idioma
+            
+        Returns:
+            Texto transcrito o None si hay error
+        """
+        with self._track():
+            try:
+                # Decodificar en memoria: ffmpeg lee por stdin y devuelve PCM 16 kHz
+                # (el WAV a 16 kHz mono que sube el navegador se lee sin ffmpeg)
+                with span('decode'):
+                    audio = decode_audio(data)
+                return self.transcribe_array(audio, language)
+            except Exception as e:
+                logger.error(f"Error en transcripción: {e}")
+                return None
+    
+    def transcribe_array(self, audio: np.ndarray, language: str = "es") -> Optional[str]:
+        """
+        Transcribir audio ya decodificado
+        
+        Args:
+            audio: PCM mono float32 a 16 kHz
+            language: Código de idioma
+            
+        Returns:
+            Texto transcrito o None si no hay texto
+        """
+        segments = [audio]
+        if self.vad:
+            segments = self.vad.split(audio)
+            if not segments:
+                logger.info("Audio sin voz, se omite la transcripción")
+                return None
+        
+        # Incluye la espera en la cola del worker o del pool
+        with self._track(), span('whisper'):
+            if self.pool:
+                # Los segmentos de un clip largo se transcriben en paralelo
+                futures = [self.pool.submit(segment, language) for segment in segments]
+                texts = [future.result() for future in futures]
+            elif self.worker:
+                futures = [self.worker.submit(segment, language) for segment in segments]
+                texts = [future.result() for future in futures]
+            else:
+                texts = [self.backend.transcribe(segment, language) for segment in segments]
+        
+        self.warmed = True
+        text = ' '.join(t for t in texts if t)
+        logger.info(f"Texto transcrito: {text[:50]}...")
+        return text if text else None
+    
+    def get_stats(self) -> Optional[dict]:
+        """Obtener métricas del worker por lotes"""
+        return self.worker.get_stats() if self.worker else None
+    
+    @contextmanager
+    def _track(self):
+        """Contar una transcripción en curso"""
+        with self._idle:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._idle:
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._idle.notify_all()
+    
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Esperar a que terminen las transcripciones en curso
+        
+        Returns:
+            True si no queda ninguna, False si se agotó el tiempo
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout=timeout)
+    
+    def shutdown(self):
+        """Cerrar el pool de procesos o el worker por lotes"""
+        if self.pool:
+            self.pool.shutdown()
+        if self.worker:
+            self.worker.shutdown()
+    
+    def _transcribe_via_tempfile(self, audio_file: FileStorage, language: str = "es") -> Optional[str]:
+        """Transcribir guardando el archivo en disco (ruta anterior)"""
         temp_path = None
         try:
             # Guardar archivo temporalmente
@@ -43,8 +214,8 @@ class WhisperService:
                 temp_path = tmp_file.name
             
             # Transcribir
-            result = self.model.transcribe(temp_path, language=language)
-            text = result['text'].strip()
+            with span('whisper'):
+                text = self.backend.transcribe(temp_path, language)
             
             logger.info(f"Texto transcrito: {text[:50]}...")
             return text if text else None
@@ -73,8 +244,7 @@ class WhisperService:
             Texto transcrito o None si hay error
         """
         try:
-            result = self.model.transcribe(file_path, language=language)
-            text = result['text'].strip()
+            text = self.backend.transcribe(file_path, language)
             return text if text else None
         except Exception as e:
             logger.error(f"Error transcribiendo desde ruta: {e}")
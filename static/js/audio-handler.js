@@ -7,6 +7,16 @@ class AudioHandler {
         this.audioChunks = [];
         this.isRecording = false;
         this.stream = null;
+        this.audioQueue = [];
+        this.isPlayingQueue = false;
+        this.onChunk = null;
+        this.onStreamEnd = null;
+        // Grabación a 16 kHz mono con AudioWorklet
+        this.audioContext = null;
+        this.source = null;
+        this.downsampler = null;
+        this.pcmChunks = [];
+        this.isPcmRecording = false;
     }
     
     /**
@@ -30,6 +40,10 @@ class AudioHandler {
             // Configurar eventos
             this.setupRecorderEvents();
             
+            if (AppConfig.audio.upload !== 'webm') {
+                await this.initDownsampler();
+            }
+            
             // Notificar éxito
             window.dispatchEvent(new CustomEvent('microphoneReady', { 
                 detail: { status: 'ready' } 
@@ -61,15 +75,122 @@ class AudioHandler {
         }
     }
     
+    /**
+     * Preparar el AudioWorklet que mezcla a mono y baja a 16 kHz
+     * 
+     * Así se sube un WAV pequeño que el servidor lee sin ffmpeg. Si el
+     * navegador no lo soporta se sigue usando MediaRecorder (webm).
+     */
+    async initDownsampler() {
+        if (!window.AudioContext || !window.AudioWorkletNode) return;
+        
+        try {
+            this.audioContext = new AudioContext();
+            await this.audioContext.audioWorklet.addModule(AppConfig.audio.workletUrl);
+            this.source = this.audioContext.createMediaStreamSource(this.stream);
+            this.downsampler = new AudioWorkletNode(this.audioContext, 'pcm-downsampler', {
+                processorOptions: { targetRate: AppConfig.audio.sampleRate }
+            });
+            // La salida es silencio; conectarla asegura que el nodo se procese
+            this.downsampler.connect(this.audioContext.destination);
+            
+            this.downsampler.port.onmessage = (event) => {
+                if (event.data === 'done') {
+                    this.finishPcmRecording();
+                } else {
+                    this.pcmChunks.push(event.data);
+                }
+            };
+        } catch (err) {
+            console.warn('AudioWorklet no disponible, se usa MediaRecorder:', err);
+            if (this.audioContext) this.audioContext.close();
+            this.audioContext = null;
+            this.source = null;
+            this.downsampler = null;
+        }
+    }
+    
+    /**
+     * Empaquetar la grabación a 16 kHz como WAV y entregarla
+     */
+    finishPcmRecording() {
+        const audioBlob = this.encodeWav(this.pcmChunks, AppConfig.audio.sampleRate, AppConfig.audio.upload);
+        this.pcmChunks = [];
+        
+        window.dispatchEvent(new CustomEvent('audioRecorded', { 
+            detail: { audioBlob, filename: 'recording.wav' } 
+        }));
+    }
+    
+    /**
+     * Codificar muestras float32 como WAV mono
+     * 
+     * 'mulaw' (G.711, 8 bits) ocupa la mitad que 'pcm16' y Whisper no nota
+     * la diferencia en voz.
+     */
+    encodeWav(chunks, sampleRate, encoding) {
+        const mulaw = encoding === 'mulaw';
+        const bytesPerSample = mulaw ? 1 : 2;
+        const length = chunks.reduce((total, chunk) => total + chunk.length, 0);
+        const buffer = new ArrayBuffer(44 + length * bytesPerSample);
+        const view = new DataView(buffer);
+        
+        const writeString = (offset, text) => {
+            for (let i = 0; i < text.length; i++) view.setUint8(offset + i, text.charCodeAt(i));
+        };
+        writeString(0, 'RIFF');
+        view.setUint32(4, 36 + length * bytesPerSample, true);
+        writeString(8, 'WAVE');
+        writeString(12, 'fmt ');
+        view.setUint32(16, 16, true);
+        view.setUint16(20, mulaw ? 7 : 1, true);           // 7 = mu-law, 1 = PCM
+        view.setUint16(22, 1, true);                       // mono
+        view.setUint32(24, sampleRate, true);
+        view.setUint32(28, sampleRate * bytesPerSample, true);
+        view.setUint16(32, bytesPerSample, true);
+        view.setUint16(34, bytesPerSample * 8, true);
+        writeString(36, 'data');
+        view.setUint32(40, length * bytesPerSample, true);
+        
+        let offset = 44;
+        for (const chunk of chunks) {
+            for (let i = 0; i < chunk.length; i++) {
+                const sample = Math.max(-1, Math.min(1, chunk[i]));
+                const pcm = sample < 0 ? sample * 0x8000 : sample * 0x7FFF;
+                if (mulaw) {
+                    view.setUint8(offset, linearToMulaw(pcm));
+                    offset += 1;
+                } else {
+                    view.setInt16(offset, pcm, true);
+                    offset += 2;
+                }
+            }
+        }
+        return new Blob([buffer], { type: 'audio/wav' });
+    }
+    
     /**
      * Configurar eventos del grabador
      */
     setupRecorderEvents() {
         this.mediaRecorder.ondataavailable = (event) => {
+            // En modo streaming cada fragmento se envía al momento
+            if (this.onChunk) {
+                if (event.data.size > 0) this.onChunk(event.data);
+                return;
+            }
             this.audioChunks.push(event.data);
         };
         
         this.mediaRecorder.onstop = async () => {
+            if (this.onChunk) {
+                const onStreamEnd = this.onStreamEnd;
+                this.onChunk = null;
+                this.onStreamEnd = null;
+                if (onStreamEnd) onStreamEnd();
+                return;
+            }
+            
             const audioBlob = new Blob(this.audioChunks, { 
                 type: AppConfig.audio.mimeType 
             });
@@ -79,7 +200,7 @@ class AudioHandler {
             
             // Disparar evento personalizado con el blob
             window.dispatchEvent(new CustomEvent('audioRecorded', { 
-                detail: { audioBlob } 
+                detail: { audioBlob, filename: 'recording.webm' } 
             }));
         };
         
@@ -92,11 +213,33 @@ class AudioHandler {
     
     /**
      * Iniciar grabación
+     * 
+     * Con onChunk, los fragmentos se entregan cada `timeslice` ms en lugar
+     * de acumularse hasta el final de la grabación; onStreamEnd se llama
+     * después del último fragmento. Sin onChunk se graba con el AudioWorklet
+     * si está disponible.
      */
-    startRecording() {
+    startRecording(timeslice = null, onChunk = null, onStreamEnd = null) {
+        if (!onChunk && this.downsampler) {
+            if (this.isRecording) return false;
+            this.pcmChunks = [];
+            // El contexto nace suspendido hasta un gesto del usuario
+            this.audioContext.resume();
+            this.source.connect(this.downsampler);
+            this.isRecording = true;
+            this.isPcmRecording = true;
+            return true;
+        }
+        
         if (this.mediaRecorder && this.mediaRecorder.state === 'inactive' && !this.isRecording) {
             this.audioChunks = []; // Limpiar chunks anteriores
-            this.mediaRecorder.start();
+            this.onChunk = onChunk;
+            this.onStreamEnd = onStreamEnd;
+            if (timeslice) {
+                this.mediaRecorder.start(timeslice);
+            } else {
+                this.mediaRecorder.start();
+            }
             this.isRecording = true;
             return true;
         }
@@ -107,6 +250,15 @@ class AudioHandler {
      * Detener grabación
      */
     stopRecording() {
+        if (this.isPcmRecording) {
+            this.isPcmRecording = false;
+            this.isRecording = false;
+            this.source.disconnect(this.downsampler);
+            // El worklet entrega lo pendiente y responde 'done'
+            this.downsampler.port.postMessage('flush');
+            return true;
+        }
+        
         if (this.mediaRecorder && this.mediaRecorder.state === 'recording' && this.isRecording) {
             this.mediaRecorder.stop();
             this.isRecording = false;
@@ -119,11 +271,23 @@ class AudioHandler {
      * Reproducir audio desde base64
      */
     playAudioFromBase64(audioBase64) {
+        if (audioBase64) {
+            this.playAudioFromUrl(`data:audio/mp3;base64,${audioBase64}`);
+        }
+    }
+    
+    /**
+     * Reproducir audio desde una URL
+     * 
+     * Con /audio/<id> el navegador descarga por rangos y empieza a
+     * reproducir antes de tener el archivo completo.
+     */
+    playAudioFromUrl(audioUrl) {
         const audioPlayer = document.getElementById('audioPlayer');
         const audio = document.getElementById('responseAudio');
         
-        if (audio && audioBase64) {
-            audio.src = `data:audio/mp3;base64,${audioBase64}`;
+        if (audio && audioUrl) {
+            audio.src = audioUrl;
             audioPlayer.classList.add('active');
             audio.play();
             
@@ -135,6 +299,53 @@ class AudioHandler {
         }
     }
     
+    /**
+     * Encolar un fragmento de audio (URL o data URI) para reproducirlo en orden
+     */
+    enqueueAudio(audioSrc) {
+        if (!audioSrc) return;
+        this.audioQueue.push(audioSrc);
+        if (!this.isPlayingQueue) {
+            this.playNextInQueue();
+        }
+    }
+    
+    /**
+     * Reproducir el siguiente fragmento de la cola
+     */
+    playNextInQueue() {
+        const audioPlayer = document.getElementById('audioPlayer');
+        const audio = document.getElementById('responseAudio');
+        const next = this.audioQueue.shift();
+        
+        if (!audio || !next) {
+            this.isPlayingQueue = false;
+            setTimeout(() => {
+                if (!this.isPlayingQueue) {
+                    audioPlayer.classList.remove('active');
+                }
+            }, 2000);
+            return;
+        }
+        
+        this.isPlayingQueue = true;
+        audio.src = next;
+        audioPlayer.classList.add('active');
+        audio.onended = () => this.playNextInQueue();
+        audio.play().catch((err) => {
+            console.error('Error reproduciendo audio:', err);
+            this.playNextInQueue();
+        });
+    }
+    
+    /**
+     * Vaciar la cola de reproducción
+     */
+    clearAudioQueue() {
+        this.audioQueue = [];
+        this.isPlayingQueue = false;
+    }
+    
     /**
      * Verificar si está grabando
      */
@@ -149,8 +360,36 @@ class AudioHandler {
         if (this.stream) {
             this.stream.getTracks().forEach(track => track.stop());
         }
+        if (this.audioContext) {
+            this.audioContext.close();
+        }
+        this.audioContext = null;
+        this.source = null;
+        this.downsampler = null;
+        this.pcmChunks = [];
+        this.isPcmRecording = false;
         this.mediaRecorder = null;
         this.audioChunks = [];
         this.isRecording = false;
     }
-}
\ No newline at end of file
+}
+
+/**
+ * Codificar una muestra PCM de 16 bits en mu-law (G.711)
+ */
+function linearToMulaw(sample) {
+    const BIAS = 0x84;
+    const CLIP = 32635;
+    
+    let value = Math.round(sample);
+    const sign = value < 0 ? 0x80 : 0;
+    if (sign) value = -value;
+    value = Math.min(value, CLIP) + BIAS;
+    
+    let exponent = 7;
+    for (let mask = 0x4000; (value & mask) === 0 && exponent > 0; mask >>= 1) {
+        exponent--;
+    }
+    const mantissa = (value >> (exponent + 3)) & 0x0F;
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF;
+}
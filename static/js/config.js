@@ -5,17 +5,34 @@ const AppConfig = {
     // Configuración de audio
     audio: {
         mimeType: 'audio/webm',
+        // Subida de grabaciones: 'mulaw' o 'pcm16' (WAV a 16 kHz mono, hecho
+        // en el navegador con un AudioWorklet) o 'webm' (MediaRecorder)
+        upload: 'mulaw',
+        sampleRate: 16000,
+        workletUrl: '/static/js/pcm-downsampler.js',
         language: 'es',
         defaultVoice: 'es-MX-DaliaNeural'
     },
     
+    // Recibir la respuesta en streaming (texto y audio por oración)
+    streaming: true,
+    
+    // Reconocimiento de voz en streaming por WebSocket (transcripción parcial)
+    streamingRecognition: false,
+    streamingTimeslice: 250,
+    
+    // Audio de respuesta: 'base64' o 'url' (MP3 binario desde /audio/<id>).
+    // Con varios workers 'url' requiere AUDIO_STORE_DIR en el servidor
+    audioMode: 'base64',
+    
     // Endpoints de la API
     api: {
         chat: '/chat',
         processAudio: '/process_audio',
         models: '/api/models',
         changeModel: '/api/change-model',
-        health: '/health'
+        health: '/health',
+        transcribeSocket: '/ws/transcribe'
     },
     
     // Tiempos de espera
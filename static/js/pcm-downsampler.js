@@ -0,0 +1,63 @@
+/**
+ * AudioWorklet: mezcla a mono y baja a 16 kHz el audio del micrófono
+ *
+ * Cada muestra de salida es la media de las muestras de entrada que cubre
+ * (filtro de caja), lo que basta como paso bajo para voz antes de diezmar.
+ * Envía al hilo principal bloques Float32 a 16 kHz; con el mensaje 'flush'
+ * entrega lo pendiente y responde 'done'.
+ */
+class PcmDownsampler extends AudioWorkletProcessor {
+    constructor(options) {
+        super();
+        const targetRate = (options.processorOptions && options.processorOptions.targetRate) || 16000;
+        // Muestras de entrada por muestra de salida (48000 -> 3, 44100 -> 2.75625)
+        this.ratio = sampleRate / targetRate;
+        this.blockSize = 4096;
+        this.block = new Float32Array(this.blockSize);
+        this.blockLength = 0;
+        // Media en curso de la muestra de salida actual
+        this.sum = 0;
+        this.count = 0;
+        this.position = 0;
+        this.nextBoundary = this.ratio;
+
+        this.port.onmessage = (event) => {
+            if (event.data === 'flush') {
+                this.emit();
+                this.port.postMessage('done');
+            }
+        };
+    }
+
+    emit() {
+        if (this.blockLength === 0) return;
+        const block = this.block.slice(0, this.blockLength);
+        this.port.postMessage(block, [block.buffer]);
+        this.blockLength = 0;
+    }
+
+    process(inputs) {
+        const channels = inputs[0];
+        if (!channels || channels.length === 0) return true;
+
+        const frames = channels[0].length;
+        for (let i = 0; i < frames; i++) {
+            let sample = 0;
+            for (let c = 0; c < channels.length; c++) sample += channels[c][i];
+            this.sum += sample / channels.length;
+            this.count++;
+            this.position++;
+
+            if (this.position >= this.nextBoundary) {
+                this.block[this.blockLength++] = this.sum / this.count;
+                this.sum = 0;
+                this.count = 0;
+                this.nextBoundary += this.ratio;
+                if (this.blockLength === this.blockSize) this.emit();
+            }
+        }
+        return true;
+    }
+}
+
+registerProcessor('pcm-downsampler', PcmDownsampler);
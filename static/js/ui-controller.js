@@ -76,6 +76,18 @@ class UIController {
         
         messages.appendChild(messageDiv);
         this.scrollToBottom();
+        return messageDiv;
+    }
+    
+    /**
+     * Actualizar el texto de un mensaje existente
+     */
+    updateMessage(messageDiv, text) {
+        const bubble = messageDiv.querySelector('.message-bubble');
+        if (bubble) {
+            bubble.textContent = text;
+            this.scrollToBottom();
+        }
     }
     
     /**
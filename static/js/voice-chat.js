@@ -7,6 +7,7 @@ class VoiceChat {
         this.uiController = new UIController();
         this.recordingMode = AppConfig.recordingModes.HOLD;
         this.currentModel = window.currentModel || '';
+        this.socket = null;
         this.init();
     }
     
@@ -49,7 +50,7 @@ class VoiceChat {
     setupEventListeners() {
         // Escuchar cuando se graba audio
         window.addEventListener('audioRecorded', (event) => {
-            this.processAudio(event.detail.audioBlob);
+            this.processAudio(event.detail.audioBlob, event.detail.filename);
         });
         
         // Escuchar estado del micrófono
@@ -138,6 +139,11 @@ class VoiceChat {
      * Iniciar grabación
      */
     startRecording() {
+        if (AppConfig.streamingRecognition) {
+            this.startStreamingRecognition();
+            return;
+        }
+        
         if (this.audioHandler.startRecording()) {
             this.uiController.setRecordingUI(true);
         }
@@ -152,6 +158,81 @@ class VoiceChat {
         }
     }
     
+    /**
+     * Iniciar reconocimiento en streaming por WebSocket
+     */
+    startStreamingRecognition() {
+        if (this.audioHandler.getIsRecording() || this.socket) return;
+        
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const socket = new WebSocket(`${protocol}//${window.location.host}${AppConfig.api.transcribeSocket}`);
+        const state = { botMessage: null, botText: '', userMessage: null };
+        this.socket = socket;
+        
+        socket.onopen = () => {
+            socket.send(JSON.stringify({
+                type: 'start',
+                language: this.uiController.selectedLanguage,
+                voice: this.uiController.selectedVoice,
+                audio_mode: AppConfig.audioMode
+            }));
+            
+            // Cortar la respuesta anterior antes de registrar los callbacks de envío
+            this.audioHandler.clearAudioQueue();
+            const started = this.audioHandler.startRecording(
+                AppConfig.streamingTimeslice,
+                (chunk) => {
+                    if (socket.readyState === WebSocket.OPEN) socket.send(chunk);
+                },
+                () => {
+                    // Después del último fragmento
+                    if (socket.readyState === WebSocket.OPEN) {
+                        socket.send(JSON.stringify({ type: 'stop' }));
+                    }
+                }
+            );
+            if (started) {
+                this.uiController.setRecordingUI(true);
+            }
+        };
+        
+        socket.onmessage = (message) => {
+            const event = JSON.parse(message.data);
+            
+            if (event.type === 'partial' || event.type === 'final') {
+                if (!state.userMessage && event.text) {
+                    state.userMessage = this.uiController.addMessage(event.text, 'user');
+                } else if (state.userMessage) {
+                    this.uiController.updateMessage(state.userMessage, event.text);
+                }
+                
+                if (event.type === 'final') {
+                    // El servidor detectó el fin de la frase: dejar de grabar
+                    this.stopRecording();
+                    if (event.text) this.uiController.showTypingIndicator();
+                }
+                return;
+            }
+            
+            this.handleTurnEvent(event, state);
+        };
+        
+        socket.onerror = (err) => {
+            console.error('Error en WebSocket:', err);
+            this.uiController.updateVoiceStatus('Error de conexión', 'error');
+        };
+        
+        socket.onclose = () => {
+            this.socket = null;
+            this.stopRecording();
+            this.uiController.hideTypingIndicator();
+            setTimeout(() => {
+                this.uiController.updateVoiceStatus('Listo para grabar', '');
+                this.setupVoiceButton();
+            }, AppConfig.timeouts.recordingStatus);
+        };
+    }
+    
     /**
      * Toggle grabación (para modo click)
      */
@@ -166,11 +247,13 @@ class VoiceChat {
     /**
      * Procesar audio grabado
      */
-    async processAudio(audioBlob) {
+    async processAudio(audioBlob, filename = 'recording.webm') {
         const formData = new FormData();
-        formData.append('audio', audioBlob, 'recording.webm');
+        formData.append('audio', audioBlob, filename);
         formData.append('language', this.uiController.selectedLanguage);
         formData.append('voice', this.uiController.selectedVoice);
+        formData.append('stream', AppConfig.streaming ? 'true' : 'false');
+        formData.append('audio_mode', AppConfig.audioMode);
         
         try {
             const response = await fetch(AppConfig.api.processAudio, {
@@ -178,6 +261,11 @@ class VoiceChat {
                 body: formData
             });
             
+            if (this.isStreamResponse(response)) {
+                await this.consumeTurnStream(response);
+                return;
+            }
+            
             const data = await response.json();
             
             if (data.error) {
@@ -192,7 +280,9 @@ class VoiceChat {
                     this.uiController.hideTypingIndicator();
                     this.uiController.addMessage(data.bot_text, 'bot');
                     
-                    if (data.audio_response) {
+                    if (data.audio_url) {
+                        this.audioHandler.playAudioFromUrl(data.audio_url);
+                    } else if (data.audio_response) {
                         this.audioHandler.playAudioFromBase64(data.audio_response);
                     }
                 }, AppConfig.timeouts.typingIndicator);
@@ -229,16 +319,25 @@ class VoiceChat {
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ 
                     message: text,
-                    voice: this.uiController.selectedVoice 
+                    voice: this.uiController.selectedVoice,
+                    stream: AppConfig.streaming,
+                    audio_mode: AppConfig.audioMode
                 })
             });
             
+            if (this.isStreamResponse(response)) {
+                await this.consumeTurnStream(response);
+                return;
+            }
+            
             const data = await response.json();
             
             this.uiController.hideTypingIndicator();
             this.uiController.addMessage(data.response, 'bot');
             
-            if (data.audio) {
+            if (data.audio_url) {
+                this.audioHandler.playAudioFromUrl(data.audio_url);
+            } else if (data.audio) {
                 this.audioHandler.playAudioFromBase64(data.audio);
             }
         } catch (err) {
@@ -250,6 +349,87 @@ class VoiceChat {
         }
     }
     
+    /**
+     * Verificar si la respuesta llega en streaming NDJSON
+     */
+    isStreamResponse(response) {
+        const contentType = response.headers.get('Content-Type') || '';
+        return contentType.includes('application/x-ndjson');
+    }
+    
+    /**
+     * Leer un stream NDJSON y entregar cada evento
+     */
+    async readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            
+            lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+        }
+        
+        if (buffer.trim()) {
+            onEvent(JSON.parse(buffer));
+        }
+    }
+    
+    /**
+     * Mostrar un turno en streaming: texto incremental y audio por oración
+     */
+    async consumeTurnStream(response) {
+        const state = { botMessage: null, botText: '' };
+        
+        this.audioHandler.clearAudioQueue();
+        
+        await this.readEventStream(response, (event) => this.handleTurnEvent(event, state));
+        
+        this.uiController.hideTypingIndicator();
+    }
+    
+    /**
+     * Aplicar un evento del turno (compartido por HTTP y WebSocket)
+     */
+    handleTurnEvent(event, state) {
+        switch (event.type) {
+            case 'transcript':
+                this.uiController.addMessage(event.user_text, 'user');
+                this.uiController.showTypingIndicator();
+                break;
+            case 'token':
+                if (!state.botMessage) {
+                    this.uiController.hideTypingIndicator();
+                    state.botMessage = this.uiController.addMessage('', 'bot');
+                }
+                state.botText += event.text;
+                this.uiController.updateMessage(state.botMessage, state.botText);
+                break;
+            case 'audio':
+                // Los fragmentos llegan en orden y se reproducen en cola
+                this.audioHandler.enqueueAudio(
+                    event.audio_url || (event.audio && `data:audio/mp3;base64,${event.audio}`)
+                );
+                break;
+            case 'done':
+                if (state.botMessage) {
+                    this.uiController.updateMessage(state.botMessage, event.response);
+                }
+                break;
+            case 'error':
+                this.uiController.hideTypingIndicator();
+                this.uiController.addMessage('Error: ' + event.error, 'bot');
+                console.error('Error en streaming:', event.error);
+                break;
+        }
+    }
+    
     /**
      * Cargar modelos disponibles
      */
@@ -0,0 +1,84 @@
+"""
+Pruebas del control de admisión por etapas
+"""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from config import Config
+from services.admission import AdmissionController, AdmissionRejected
+
+
+@pytest.fixture
+def admission():
+    config = SimpleNamespace(**{name: getattr(Config, name) for name in dir(Config) if name.isupper()})
+    config.ADMISSION_ENABLED = True
+    config.ADMISSION_LLM_CONCURRENCY = 1
+    config.ADMISSION_LLM_QUEUE = 1
+    config.ADMISSION_QUEUE_TIMEOUT = 0.2
+    return AdmissionController(config)
+
+
+def test_threads_and_coroutines_share_the_limit(admission):
+    release = admission.acquire('llm')
+
+    async def wait_async():
+        return await admission.acquire_async('llm')
+
+    with pytest.raises(AdmissionRejected):
+        asyncio.run(wait_async())
+    assert admission.get_stats()['llm'] == {'limit': 1, 'in_flight': 1, 'queue_depth': 0, 'rejected': 1}
+
+    release()
+    asyncio.run(wait_async())()
+    assert admission.get_stats()['llm']['in_flight'] == 0
+
+
+def test_release_hands_the_slot_to_a_waiting_coroutine(admission):
+    release = admission.acquire('llm')
+
+    async def main():
+        waiter = asyncio.ensure_future(admission.acquire_async('llm'))
+        await asyncio.sleep(0.05)
+        assert admission.get_stats()['llm']['queue_depth'] == 1
+        # Desde otro hilo, como una ruta WSGI
+        threading.Thread(target=release).start()
+        (await waiter)()
+
+    asyncio.run(main())
+    assert admission.get_stats()['llm'] == {'limit': 1, 'in_flight': 0, 'queue_depth': 0, 'rejected': 0}
+
+
+def test_queue_is_shared_too(admission):
+    release = admission.acquire('llm')
+    waiter = threading.Thread(target=lambda: admission.acquire('llm')())
+    waiter.start()
+    while admission.get_stats()['llm']['queue_depth'] == 0:
+        pass
+
+    async def wait_async():
+        return await admission.acquire_async('llm')
+
+    # 1 en curso + 1 en cola: la cola está llena para todos
+    with pytest.raises(AdmissionRejected):
+        asyncio.run(wait_async())
+    release()
+    waiter.join()
+    assert admission.get_stats()['llm']['in_flight'] == 0
+
+
+def test_cancelled_waiter_leaves_the_queue(admission):
+    release = admission.acquire('llm')
+
+    async def main():
+        waiter = asyncio.ensure_future(admission.acquire_async('llm'))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(main())
+    release()
+    assert admission.get_stats()['llm'] == {'limit': 1, 'in_flight': 0, 'queue_depth': 0, 'rejected': 0}
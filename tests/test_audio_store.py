@@ -0,0 +1,45 @@
+"""
+Pruebas del almacén temporal de audio
+"""
+import os
+import time
+
+from services.audio_store import AudioStore
+
+
+def test_audio_larger_than_store_is_not_stored():
+    store = AudioStore(max_bytes=10)
+    assert store.put(b'x' * 11) is None
+    assert store.get_stats() == {'entries': 0, 'bytes': 0}
+
+
+def test_directory_is_shared_between_workers(tmp_path):
+    first = AudioStore(directory=str(tmp_path))
+    second = AudioStore(directory=str(tmp_path))
+
+    audio_id = first.put(b'mp3 de prueba')
+    assert second.get(audio_id) == b'mp3 de prueba'
+    assert second.get('../otro') is None
+
+
+def test_directory_entries_expire(tmp_path):
+    store = AudioStore(ttl=60, directory=str(tmp_path))
+    audio_id = store.put(b'mp3 de prueba')
+
+    old = time.time() - 120
+    os.utime(tmp_path / f"{audio_id}.mp3", (old, old))
+    assert store.get(audio_id) is None
+
+
+def test_directory_keeps_size_limit(tmp_path):
+    store = AudioStore(max_bytes=25, directory=str(tmp_path))
+    ids = []
+    for i in range(3):
+        ids.append(store.put(bytes([i]) * 10))
+        old = time.time() - 10 + i
+        os.utime(tmp_path / f"{ids[-1]}.mp3", (old, old))
+        store._last_prune = 0
+
+    assert store.get(ids[0]) is None
+    assert store.get(ids[2]) == bytes([2]) * 10
+    assert store.get_stats()['bytes'] <= 25
@@ -0,0 +1,91 @@
+"""
+Pruebas del historial guardado en un almacén externo
+"""
+import random
+
+import pytest
+
+from config import Config
+from models.conversation import ConversationManager, estimate_tokens
+from models.conversation_store import RedisConversationStore, SQLiteConversationStore
+
+LIMITS = {'max_tokens': 300, 'summary_tokens': 60}
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        store = SQLiteConversationStore(str(tmp_path / 'conversations.db'), flush_interval=0)
+    else:
+        # Redis es opcional: sin fakeredis solo se prueba SQLite
+        fakeredis = pytest.importorskip('fakeredis')
+        store = RedisConversationStore(client=fakeredis.FakeRedis(), flush_interval=0)
+    yield store
+    store.close()
+
+
+def message(rng, turn):
+    words = ' '.join(rng.choice(['hola', 'tiempo', 'modelo', 'respuesta', 'pregunta']) for _ in range(rng.randint(1, 40)))
+    return f"Turno {turn}: {words}. Más detalles {turn}."
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_reloaded_conversation_matches_memory(store, seed):
+    # La ventana de lectura cubre los mensajes que caben en el presupuesto
+    rng = random.Random(seed)
+    memory = ConversationManager(**LIMITS)
+    stored = ConversationManager(store=store, readback_turns=16, **LIMITS)
+
+    for turn in range(80):
+        for role in ('user', 'assistant'):
+            content = message(rng, turn)
+            memory.add_message('s', role, content)
+            stored.add_message('s', role, content)
+
+        # A veces pasan muchos turnos sin leer (más que la ventana de lectura)
+        if rng.random() < 0.1:
+            assert stored.get_conversation('s') == memory.get_conversation('s')
+
+    # Otro worker (o un reinicio) relee la conversación desde el almacén
+    reloaded = ConversationManager(store=store, readback_turns=16, **LIMITS)
+    assert reloaded.get_conversation('s') == memory.get_conversation('s')
+
+
+def test_messages_beyond_readback_window_reach_summary(store):
+    manager = ConversationManager(store=store, readback_turns=2, max_tokens=10_000, summary_tokens=500)
+    for turn in range(6):
+        manager.add_message('s', 'user', f"Pregunta {turn}.")
+
+    messages = manager.get_conversation('s')
+    assert messages[1]['content'] == ("Resumen de la conversación anterior:\n"
+                                      + '\n'.join(f"Usuario: Pregunta {turn}." for turn in range(4)))
+    assert [m['content'] for m in messages[2:]] == ["Pregunta 4.", "Pregunta 5."]
+    assert manager.get_conversation('s') == messages
+
+
+def test_readback_stays_bounded(store):
+    manager = ConversationManager(store=store, readback_turns=4, max_tokens=10_000, summary_tokens=500)
+    load = store.load
+    read = []
+    store.load = lambda *args, **kwargs: read.append(load(*args, **kwargs)) or read[-1]
+
+    for turn in range(30):
+        manager.add_message('s', 'user', f"Pregunta {turn}.")
+        manager.add_message('s', 'assistant', f"Respuesta {turn}.")
+        read.clear()
+        manager.get_conversation('s')
+        # La ventana más los dos mensajes que salieron de ella en este turno
+        assert sum(len(rows) for rows in read) <= 4 + 2
+
+
+def test_sqlite_prunes_orphan_summaries(tmp_path):
+    store = SQLiteConversationStore(str(tmp_path / 'conversations.db'), session_ttl=60, flush_interval=0)
+    store.set_summary('huérfana', 'Usuario: hola.', 3)
+    store.flush()
+    connection = store._connection()
+    connection.execute("UPDATE summaries SET updated_at = updated_at - 120")
+    connection.commit()
+
+    store._prune(connection)
+    assert store.get_summary('huérfana') == ('', 0)
+    store.close()
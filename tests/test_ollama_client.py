@@ -0,0 +1,76 @@
+"""
+Pruebas del cliente de Ollama: catálogo de modelos y streaming
+"""
+import json
+import time
+
+import pytest
+
+from models.ollama_client import OllamaClient, OllamaStreamError
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {'models': [{'name': 'llama3:8b'}]}
+
+
+@pytest.fixture
+def client():
+    client = OllamaClient()
+    client.models_error_ttl = 0.05
+    client.session.get = lambda *args, **kwargs: FakeResponse()
+    return client
+
+
+def fail(*args, **kwargs):
+    raise ConnectionError("Ollama caído")
+
+
+def test_failed_refresh_keeps_last_good_catalog(client):
+    assert client.has_model('llama3:8b')
+
+    client.invalidate_models()
+    client.session.get = fail
+    assert client.has_model('llama3:8b')
+    assert not client.is_connected()
+
+
+def test_failed_refresh_is_retried_after_error_ttl(client):
+    client.session.get = fail
+    assert not client.is_connected()
+
+    client.session.get = lambda *args, **kwargs: FakeResponse()
+    assert not client.is_connected()
+    time.sleep(0.06)
+    assert client.is_connected()
+    assert client.has_model('llama3:8b')
+
+
+class BrokenStream:
+    """Respuesta de /api/chat que se corta tras el primer fragmento"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        yield json.dumps({'message': {'content': 'Hola, '}}).encode()
+        raise ConnectionResetError("conexión reiniciada")
+
+
+def test_stream_cut_midway_raises(client):
+    client.session.post = lambda *args, **kwargs: BrokenStream()
+    tokens = client.stream_response([{'role': 'user', 'content': 'hola'}], 'llama3:8b')
+
+    assert next(tokens) == 'Hola, '
+    with pytest.raises(OllamaStreamError):
+        next(tokens)
+    tokens.close()
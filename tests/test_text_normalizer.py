@@ -0,0 +1,96 @@
+"""
+Pruebas del normalizador de texto para la voz
+"""
+import random
+import re
+
+import pytest
+
+from utils.text_normalizer import normalizer_for_voice, number_to_words
+
+
+@pytest.fixture
+def normalizer():
+    return normalizer_for_voice("es-MX-DaliaNeural")
+
+
+def stream(normalizer, chunks):
+    """Pasar los fragmentos por el normalizador incremental"""
+    incremental = normalizer.stream()
+    return ''.join(incremental.feed(chunk) for chunk in chunks) + incremental.flush()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Tengo 1 hora", "Tengo una hora"),
+    ("Tengo 31 horas", "Tengo treinta y una horas"),
+    ("Tengo 201 horas", "Tengo doscientas una horas"),
+    ("Hay 21 mil personas", "Hay veintiún mil personas"),
+    ("Son 21 millones", "Son veintiún millones"),
+    ("Compré 1 libro", "Compré un libro"),
+    ("Un 1 de cada 3", "Un uno de cada tres"),
+    ("1000000 habitantes", "un millón de habitantes"),
+    ("1.500.000 personas", "un millón quinientas mil personas"),
+    ("21 km", "veintiún kilómetros"),
+    ("$1,500 pesos", "mil quinientos pesos"),
+    ("Versión 2.0.1 lista", "Versión 2.0.1 lista"),
+    ("Llama al 555-1234", "Llama al 555-1234"),
+    ("pan, leche, etc. y más", "pan, leche, etcétera y más"),
+    ("pan, leche, etc. Después", "pan, leche, etcétera. Después"),
+    ("pan, leche, etc.", "pan, leche, etcétera."),
+    ("*sonríe* El Sr. Pérez llegó a las 10:30 p. m. con 2 amigas",
+     "El señor Pérez llegó a las diez y treinta de la tarde con dos amigas"),
+    ("Quedó en 2do lugar", "Quedó en segundo lugar"),
+    ("El 1er día", "El primer día"),
+    ("Por 3ra vez", "Por tercera vez"),
+    ("El 1ro de mayo", "El primero de mayo"),
+    ("El 1º de mayo", "El primero de mayo"),
+    ("Los 2dos lugares", "Los segundos lugares"),
+    ("Son las 25:00", "Son las 25:00"),
+    ("Duró 1:30:00", "Duró 1:30:00"),
+    ("Nació el 12/05/2024", "Nació el doce de mayo de dos mil veinticuatro"),
+    ("Desde el 1/01/99", "Desde el primero de enero de mil novecientos noventa y nueve"),
+    ("Código 32/13/2024", "Código 32/13/2024"),
+    ("**Importante**: lee esto", "Importante: lee esto"),
+    ("Lee **esto**.", "Lee esto."),
+    ("C++ y C#", "C más más y C sharp"),
+    ("Uso C++, C# y F#.", "Uso C más más, C sharp y F sharp."),
+    ("A las 10am en 3D", "A las 10am en 3D"),
+])
+def test_normalize(normalizer, text, expected):
+    assert normalizer.normalize(text) == expected
+
+
+def test_other_languages_keep_symbols():
+    assert normalizer_for_voice("en-US-AriaNeural").normalize("C++ y 2do **C#**:") == "C++ y 2do C#:"
+
+
+def test_number_to_words_feminine_after_millions():
+    assert number_to_words(1_000_201, feminine=True) == "un millón doscientas una"
+
+
+def test_stream_aside_after_split_number(normalizer):
+    chunks = [' $1,', '500 p', 'esos', ' ', '(más ', 'o men', 'os). ']
+    assert stream(normalizer, chunks) == normalizer.normalize(''.join(chunks)) == "mil quinientos pesos."
+
+
+FRAGMENTS = [
+    "Claro,", "te", "explico:", "El", "Sr.", "García", "recorrió", "21 km", "en", "1 h", "y", "30 min",
+    "(más o menos),", "*sonríe*", "gastó", "$1,500", "pesos", "y", "llegó", "a las", "10:30 p. m.", "😊",
+    "Tengo", "1", "hora", "201", "personas", "**importante**", "p. ej.", "etc.", "Después", "-5 °C", "15%",
+    "el", "1º", "lugar", "versión", "2.0.1", "555-1234", "¿Algo", "más?", "¡Listo!", "\n", "\n\n- ",
+    "2do", "1er", "3ra", "1ro", "de", "día", "25:00", "12/05/2024", "**Importante**:", "C++", "C#", "10am",
+]
+
+
+def test_stream_matches_normalize_with_random_chunks(normalizer):
+    rng = random.Random(20261018)
+    for _ in range(2000):
+        words = [rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 25))]
+        text = ''.join(word + rng.choice((' ', ' ', ', ', '. ', '  ')) for word in words)
+        # Cortes arbitrarios, también a mitad de palabra, y tokens como los de Ollama
+        if rng.random() < 0.5:
+            cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(1, 12))))
+            chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        else:
+            chunks = re.findall(r'\S+\s*|\s+', text)
+        assert stream(normalizer, chunks) == normalizer.normalize(text), chunks
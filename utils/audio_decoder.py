@@ -0,0 +1,105 @@
+"""
+Decodificación de audio en memoria con ffmpeg
+"""
+import struct
+import subprocess
+from typing import Optional
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# Formatos de WAV que se leen sin ffmpeg
+_WAVE_PCM = 1
+_WAVE_MULAW = 7
+
+
+def _mulaw_table() -> np.ndarray:
+    """Valor float32 de cada código mu-law (G.711)"""
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = (((mantissa << 3) + 0x84) << exponent) - 0x84
+    return (np.where(codes & 0x80, -magnitude, magnitude) / 32768.0).astype(np.float32)
+
+
+_MULAW_TO_FLOAT = _mulaw_table()
+
+
+class AudioDecodeError(Exception):
+    """ffmpeg no pudo decodificar el audio"""
+
+
+def decode_audio(data: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Decodificar un archivo de audio completo a PCM mono float32
+
+    El contenido se envía a ffmpeg por stdin y el PCM se lee de stdout,
+    sin escribir nada en disco.
+
+    Args:
+        data: Bytes del archivo (webm, ogg, wav, mp3...)
+        sample_rate: Frecuencia de muestreo de salida
+
+    Returns:
+        Array float32 normalizado en [-1, 1]
+    """
+    audio = decode_wav(data, sample_rate)
+    if audio is not None:
+        return audio
+
+    cmd = [
+        "ffmpeg", "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate),
+        "-loglevel", "error",
+        "pipe:1"
+    ]
+    try:
+        result = subprocess.run(cmd, input=data, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise AudioDecodeError(e.stderr.decode(errors='replace').strip()) from e
+
+    return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def decode_wav(data: bytes, sample_rate: int = SAMPLE_RATE) -> Optional[np.ndarray]:
+    """
+    Leer sin ffmpeg un WAV que ya está en el formato de Whisper
+
+    Es lo que sube el navegador tras bajar la grabación a 16 kHz mono
+    (PCM de 16 bits o mu-law de 8 bits): basta con convertir las muestras.
+
+    Returns:
+        Array float32, o None si no es un WAV mono a `sample_rate` en uno
+        de esos dos formatos (entonces decodifica ffmpeg)
+    """
+    if data[:4] != b'RIFF' or data[8:12] != b'WAVE':
+        return None
+
+    fmt = None
+    pos = 12
+    try:
+        while pos + 8 <= len(data):
+            chunk_id = data[pos:pos + 4]
+            size = struct.unpack_from('<I', data, pos + 4)[0]
+            if chunk_id == b'fmt ':
+                fmt = struct.unpack_from('<HHIIHH', data, pos + 8)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    return None
+                audio_format, channels, rate, _, _, bits = fmt
+                if channels != 1 or rate != sample_rate:
+                    return None
+                # Grabado en streaming el tamaño puede no estar escrito: usar lo recibido
+                samples = data[pos + 8:pos + 8 + size]
+                if audio_format == _WAVE_PCM and bits == 16:
+                    samples = samples[:len(samples) & ~1]
+                    return np.frombuffer(samples, '<i2').astype(np.float32) / 32768.0
+                if audio_format == _WAVE_MULAW and bits == 8:
+                    return _MULAW_TO_FLOAT[np.frombuffer(samples, np.uint8)]
+                return None
+            pos += 8 + size + (size & 1)
+    except struct.error:
+        return None
+    return None
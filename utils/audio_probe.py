@@ -0,0 +1,163 @@
+"""
+Duración de un audio leyendo solo las cabeceras del contenedor
+
+Sirve para rechazar grabaciones demasiado largas antes de lanzar ffmpeg.
+Reconoce WAV, Ogg (Opus y Vorbis), WebM/Matroska y MP3 (capa III).
+"""
+import struct
+from typing import Optional, Tuple
+
+# Tablas de MP3 capa III
+_MP3_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),   # MPEG 1
+    2: (22050, 24000, 16000),   # MPEG 2
+    0: (11025, 12000, 8000),    # MPEG 2.5
+}
+
+# Elementos EBML de Matroska
+_EBML_HEADER = b'\x1a\x45\xdf\xa3'
+_SEGMENT_INFO = b'\x15\x49\xa9\x66'
+_CLUSTER = b'\x1f\x43\xb6\x75'
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_CLUSTER_TIMECODE = 0xE7
+
+
+def probe_duration(data: bytes) -> Optional[float]:
+    """
+    Estimar la duración en segundos sin decodificar
+
+    En WebM sin duración declarada (lo habitual en MediaRecorder) se usa el
+    instante del último cluster, que es una cota inferior.
+
+    Returns:
+        Segundos, o None si el formato no se reconoce o no declara duración
+    """
+    try:
+        if data[:4] == b'RIFF' and data[8:12] == b'WAVE':
+            return _wav_duration(data)
+        if data[:4] == b'OggS':
+            return _ogg_duration(data)
+        if data[:4] == _EBML_HEADER:
+            return _matroska_duration(data)
+        return _mp3_duration(data)
+    except (IndexError, ValueError, struct.error):
+        return None
+
+
+def _wav_duration(data: bytes) -> Optional[float]:
+    byte_rate = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        size = struct.unpack_from('<I', data, pos + 4)[0]
+        if chunk_id == b'fmt ':
+            byte_rate = struct.unpack_from('<I', data, pos + 16)[0]
+        elif chunk_id == b'data':
+            # Grabado en streaming el tamaño puede no estar escrito: contar lo recibido
+            size = min(size, len(data) - pos - 8)
+            return size / byte_rate if byte_rate else None
+        pos += 8 + size + (size & 1)
+    return None
+
+
+def _ogg_duration(data: bytes) -> Optional[float]:
+    last_page = data.rfind(b'OggS')
+    granule = struct.unpack_from('<q', data, last_page + 6)[0]
+    if granule < 0:
+        return None
+
+    opus = data.find(b'OpusHead', 0, 512)
+    if opus >= 0:
+        # La posición de Opus siempre va a 48 kHz e incluye el pre-skip
+        pre_skip = struct.unpack_from('<H', data, opus + 10)[0]
+        return max(granule - pre_skip, 0) / 48000
+    vorbis = data.find(b'\x01vorbis', 0, 512)
+    if vorbis >= 0:
+        sample_rate = struct.unpack_from('<I', data, vorbis + 12)[0]
+        return granule / sample_rate if sample_rate else None
+    return None
+
+
+def _read_vint(data: bytes, pos: int, keep_marker: bool = False) -> Tuple[int, int]:
+    """Leer un entero de longitud variable EBML: (valor, posición siguiente)"""
+    first = data[pos]
+    length = 9 - first.bit_length()
+    if length > 8:
+        raise ValueError("vint inválido")
+    value = first if keep_marker else first & ((1 << (8 - length)) - 1)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    return value, pos + length
+
+
+def _matroska_duration(data: bytes) -> Optional[float]:
+    scale = 1_000_000  # ns por unidad de timecode (valor por defecto)
+    duration = None
+
+    info = data.find(_SEGMENT_INFO, 0, 65536)
+    if info >= 0:
+        size, pos = _read_vint(data, info + 4)
+        end = min(pos + size, len(data))
+        while pos < end:
+            element, pos = _read_vint(data, pos, keep_marker=True)
+            size, pos = _read_vint(data, pos)
+            value = data[pos:pos + size]
+            if element == _TIMECODE_SCALE:
+                scale = int.from_bytes(value, 'big')
+            elif element == _DURATION:
+                duration = struct.unpack('>f' if size == 4 else '>d', value)[0]
+            pos += size
+
+    if duration is not None:
+        return duration * scale / 1e9
+
+    cluster = data.rfind(_CLUSTER)
+    if cluster < 0:
+        return None
+    _, pos = _read_vint(data, cluster + 4)
+    element, pos = _read_vint(data, pos, keep_marker=True)
+    if element != _CLUSTER_TIMECODE:
+        return None
+    size, pos = _read_vint(data, pos)
+    return int.from_bytes(data[pos:pos + size], 'big') * scale / 1e9
+
+
+def _mp3_duration(data: bytes) -> Optional[float]:
+    pos = 0
+    if data[:3] == b'ID3':
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        pos = 10 + size
+
+    # Primera trama: sincronización de 11 bits
+    limit = min(pos + 4096, len(data) - 4)
+    while not (data[pos] == 0xFF and data[pos + 1] & 0xE0 == 0xE0):
+        pos += 1
+        if pos > limit:
+            return None
+    header = struct.unpack_from('>I', data, pos)[0]
+    version = (header >> 19) & 3
+    layer = (header >> 17) & 3
+    bitrate_index = (header >> 12) & 15
+    rate_index = (header >> 10) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    samples_per_frame = 1152 if version == 3 else 576
+
+    # VBR: la cabecera Xing/Info declara el número de tramas
+    for tag in (b'Xing', b'Info'):
+        xing = data.find(tag, pos, pos + 64)
+        if xing >= 0:
+            flags = struct.unpack_from('>I', data, xing + 4)[0]
+            if flags & 1:
+                frames = struct.unpack_from('>I', data, xing + 8)[0]
+                return frames * samples_per_frame / sample_rate
+
+    bitrate = _MP3_BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+    return (len(data) - pos) * 8 / bitrate
@@ -0,0 +1,142 @@
+"""
+Métricas de latencia por etapa (histogramas en formato Prometheus)
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Límites de los buckets en segundos: de 5 ms a 60 s
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Histograma acumulado de buckets fijos (observar es O(log n))"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """(conteos no acumulados por bucket, suma)"""
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class RequestTimings:
+    """Duración acumulada por etapa dentro de una petición"""
+
+    __slots__ = ('stages',)
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """Valor de la cabecera Server-Timing (duraciones en ms)"""
+        return ', '.join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items())
+
+
+_histograms: Dict[str, Histogram] = {}
+_histograms_lock = threading.Lock()
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar('request_timings', default=None)
+
+STAGE_HELP = "Duración de cada etapa del turno de voz"
+
+# Contadores por operación: nombre -> ayuda (se exportan como voice_<nombre>_total)
+COUNTER_HELP = {
+    'deduplicated_calls': "Llamadas resueltas con el resultado de otra idéntica en curso",
+    'response_cache_hits': "Respuestas del modelo servidas desde la caché",
+    'admission_rejections': "Peticiones rechazadas por el control de admisión",
+    'tts_connections': "Síntesis por conexión nueva o reutilizada con el servicio de voz",
+}
+_counters: Dict[Tuple[str, str], int] = {}
+_counters_lock = threading.Lock()
+
+
+def observe(stage: str, seconds: float):
+    """Registrar una duración en el histograma de la etapa y en la petición actual"""
+    histogram = _histograms.get(stage)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(stage, Histogram())
+    histogram.observe(seconds)
+
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+def increment(counter: str, operation: str, amount: int = 1):
+    """Sumar al contador de una operación"""
+    with _counters_lock:
+        _counters[(counter, operation)] = _counters.get((counter, operation), 0) + amount
+
+
+def counter_values(counter: str) -> Dict[str, int]:
+    """Valores de un contador por operación"""
+    with _counters_lock:
+        return {operation: value for (name, operation), value in _counters.items() if name == counter}
+
+
+@contextmanager
+def span(stage: str):
+    """Medir el bloque como una etapa"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def start_request() -> Tuple[RequestTimings, contextvars.Token]:
+    """Empezar a acumular tiempos de la petición en el contexto actual"""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token: contextvars.Token):
+    _current.reset(token)
+
+
+def current_request() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+def render_prometheus() -> str:
+    """Exportar histogramas y contadores en el formato de texto de Prometheus"""
+    name = 'voice_stage_duration_seconds'
+    lines = [f"# HELP {name} {STAGE_HELP}", f"# TYPE {name} histogram"]
+    with _histograms_lock:
+        histograms = sorted(_histograms.items())
+
+    for stage, histogram in histograms:
+        counts, total = histogram.snapshot()
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {cumulative}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {cumulative}')
+
+    for counter, help_text in COUNTER_HELP.items():
+        name = f'voice_{counter}_total'
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for operation, value in sorted(counter_values(counter).items()):
+            lines.append(f'{name}{{operation="{operation}"}} {value}')
+    return '\n'.join(lines) + '\n'
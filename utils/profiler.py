@@ -0,0 +1,71 @@
+"""
+Perfilador por muestreo activable en tiempo de ejecución
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+
+class SamplingProfiler:
+    """
+    Toma la pila de todos los hilos cada `interval` segundos
+
+    No instrumenta el código (a diferencia de cProfile), así que puede
+    activarse en producción durante unos segundos. El resultado está en
+    formato "collapsed stacks", listo para flamegraph.pl o speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        """Detener el muestreo y devolver las pilas agregadas"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self.collapsed()
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def collapsed(self) -> str:
+        return '\n'.join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+
+def profile_for(seconds: float, interval: float = 0.005) -> str:
+    """Muestrear durante `seconds` segundos y devolver las pilas agregadas"""
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    time.sleep(seconds)
+    return profiler.stop()
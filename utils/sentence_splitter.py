@@ -0,0 +1,47 @@
+"""
+Segmentación incremental de texto en oraciones
+"""
+import re
+from typing import List
+
+# Fin de oración: signo de cierre seguido de espacio o salto de línea
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+|\n+')
+
+
+class SentenceSplitter:
+    """Acumula tokens de un stream y entrega oraciones completas"""
+
+    def __init__(self, min_length: int = 20):
+        # Las oraciones muy cortas se unen a la siguiente para no
+        # generar fragmentos de audio diminutos ("Sí.", "Claro.")
+        self.min_length = min_length
+        self._buffer = ""
+
+    def feed(self, token: str) -> List[str]:
+        """
+        Agregar un token y devolver las oraciones que quedaron completas
+
+        Args:
+            token: Fragmento de texto recibido del modelo
+
+        Returns:
+            Lista de oraciones listas para sintetizar
+        """
+        self._buffer += token
+        sentences = []
+        start = 0
+
+        for match in _SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.start()].strip()
+            if len(candidate) >= self.min_length:
+                sentences.append(candidate)
+                start = match.end()
+
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Devolver el texto pendiente al terminar el stream"""
+        remainder = self._buffer.strip()
+        self._buffer = ""
+        return [remainder] if remainder else []
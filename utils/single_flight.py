@@ -0,0 +1,115 @@
+"""
+Agrupación de llamadas idénticas concurrentes ("single flight")
+
+Si llega una llamada con la misma clave que otra que todavía está en curso,
+no se repite el trabajo: espera a la primera y recibe su mismo resultado (o
+su misma excepción). En cuanto la llamada termina la clave se libera, así
+que esto no es una caché: solo se comparte lo que coincide en el tiempo.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils.metrics import increment
+
+
+class _Call:
+    """Llamada en curso y su resultado"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Single flight para código con hilos"""
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        Ejecutar func, o esperar a la llamada en curso con la misma clave
+
+        Returns:
+            El resultado de func (compartido con las llamadas agrupadas)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            increment('deduplicated_calls', self.operation)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class _AsyncCall:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    Single flight para asyncio
+
+    El trabajo corre en su propia tarea. Si se cancela a quien la inició
+    (p. ej. el cliente se desconecta), la tarea sigue para los demás; solo
+    se cancela cuando ya no la espera nadie.
+    Debe usarse siempre desde el mismo loop de eventos.
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self._calls: Dict[str, _AsyncCall] = {}
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Ejecutar factory(), o esperar a la llamada en curso con la misma clave"""
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(factory()))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            increment('deduplicated_calls', self.operation)
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _AsyncCall):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,69 @@
+"""
+Desglose del tiempo de arranque del proceso
+
+app.py importa este módulo antes que nada, así que el reloj empieza con
+los imports de la aplicación.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_started = time.perf_counter()
+
+
+class StartupReport:
+    """Duración de cada etapa del arranque y estado de la preparación"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.ready = False
+        self.error: Optional[str] = None
+        self.ready_after: Optional[float] = None
+        self._last_mark = _started
+        self._lock = threading.Lock()
+
+    def mark(self, stage: str):
+        """Cerrar una etapa del hilo principal: dura desde la marca anterior hasta ahora"""
+        now = time.perf_counter()
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last_mark
+            self._last_mark = now
+
+    @contextmanager
+    def stage(self, stage: str):
+        """Medir una etapa que corre en segundo plano"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - start
+
+    def set_ready(self):
+        """Marcar el proceso como listo y registrar el desglose"""
+        self.ready_after = time.perf_counter() - _started
+        self.ready = True
+        logger.info(f"Listo en {self.ready_after:.2f} s ({self.summary()})")
+
+    def set_failed(self, error: Exception):
+        self.error = str(error)
+        logger.error(f"El arranque falló tras {time.perf_counter() - _started:.2f} s ({self.summary()}): {error}")
+
+    def summary(self) -> str:
+        with self._lock:
+            return ', '.join(f"{stage} {seconds:.2f} s" for stage, seconds in self.stages.items())
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            stages = {stage: round(seconds, 3) for stage, seconds in self.stages.items()}
+        return {
+            'ready': self.ready,
+            'ready_after': round(self.ready_after, 3) if self.ready_after is not None else None,
+            'uptime': round(time.perf_counter() - _started, 3),
+            'stages': stages,
+            'error': self.error
+        }
@@ -0,0 +1,552 @@
+"""
+Normalización de texto para síntesis de voz en español
+
+    normalizer = normalizer_for_voice("es-MX-DaliaNeural")
+    normalizer.normalize("*sonríe* El Sr. Pérez corrió 21 km")  # "El señor Pérez corrió veintiún kilómetros"
+
+    stream = normalizer.stream()  # Mismo resultado, token a token
+    texto = ''.join(stream.feed(token) for token in tokens) + stream.flush()
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+_SMALL = ("cero uno dos tres cuatro cinco seis siete ocho nueve diez once doce trece catorce quince "
+          "dieciséis diecisiete dieciocho diecinueve veinte veintiuno veintidós veintitrés veinticuatro "
+          "veinticinco veintiséis veintisiete veintiocho veintinueve").split()
+_TENS = ("", "", "", "treinta", "cuarenta", "cincuenta", "sesenta", "setenta", "ochenta", "noventa")
+_HUNDREDS = ("", "ciento", "doscientos", "trescientos", "cuatrocientos", "quinientos", "seiscientos",
+             "setecientos", "ochocientos", "novecientos")
+_ORDINALS = ("", "primer", "segund", "tercer", "cuart", "quint", "sext", "séptim", "octav", "noven", "décim")
+_MONTHS = ("", "enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre",
+           "octubre", "noviembre", "diciembre")
+
+# Unidades tras un número: (singular, plural, género)
+_UNITS: Dict[str, Tuple[str, str, str]] = {
+    'km/h': ('kilómetro por hora', 'kilómetros por hora', 'm'),
+    'km': ('kilómetro', 'kilómetros', 'm'),
+    'cm': ('centímetro', 'centímetros', 'm'),
+    'mm': ('milímetro', 'milímetros', 'm'),
+    'm': ('metro', 'metros', 'm'),
+    'kg': ('kilo', 'kilos', 'm'),
+    'mg': ('miligramo', 'miligramos', 'm'),
+    'g': ('gramo', 'gramos', 'm'),
+    'ml': ('mililitro', 'mililitros', 'm'),
+    'l': ('litro', 'litros', 'm'),
+    'h': ('hora', 'horas', 'f'),
+    'min': ('minuto', 'minutos', 'm'),
+    's': ('segundo', 'segundos', 'm'),
+    'KB': ('kilobyte', 'kilobytes', 'm'),
+    'MB': ('megabyte', 'megabytes', 'm'),
+    'GB': ('gigabyte', 'gigabytes', 'm'),
+    'TB': ('terabyte', 'terabytes', 'm'),
+    '°C': ('grado centígrado', 'grados centígrados', 'm'),
+    '°F': ('grado Fahrenheit', 'grados Fahrenheit', 'm'),
+    '°': ('grado', 'grados', 'm'),
+    '%': ('por ciento', 'por ciento', ''),
+    '€': ('euro', 'euros', 'm'),
+    'EUR': ('euro', 'euros', 'm'),
+    'USD': ('dólar', 'dólares', 'm'),
+    'MXN': ('peso', 'pesos', 'm'),
+    '£': ('libra', 'libras', 'f'),
+}
+
+# El símbolo $ se lee según el país de la voz
+_DOLLAR_BY_COUNTRY = {'MX': ('peso', 'pesos', 'm'), 'AR': ('peso', 'pesos', 'm'), 'CO': ('peso', 'pesos', 'm'),
+                      'CL': ('peso', 'pesos', 'm')}
+_DOLLAR = ('dólar', 'dólares', 'm')
+
+_ABBREVIATIONS = {
+    'Sr': 'señor', 'Sra': 'señora', 'Srta': 'señorita', 'Dr': 'doctor', 'Dra': 'doctora',
+    'Ud': 'usted', 'Uds': 'ustedes', 'Vd': 'usted', 'Vds': 'ustedes', 'Lic': 'licenciado',
+    'Ing': 'ingeniero', 'Av': 'avenida', 'Avda': 'avenida', 'etc': 'etcétera', 'aprox': 'aproximadamente',
+    'pág': 'página', 'págs': 'páginas', 'núm': 'número', 'tel': 'teléfono', 'p. ej': 'por ejemplo',
+    'EE. UU': 'Estados Unidos', 'a. m': 'de la mañana', 'p. m': 'de la tarde',
+}
+
+_ABBREVIATION_SPACING = re.compile(r'\.\s?')
+
+# Lenguajes de programación ("C++", "C#"), reconocidos por el símbolo
+_PROGRAMMING_LANGUAGE = re.compile(r'(?<![\w+#])[A-Za-z](?:\+\+|#)(?![\w+#])')
+_SYMBOL_NAMES = {'++': ' más más', '#': ' sharp'}
+
+# Palabras que siguen a un número sin ser el sustantivo que cuenta ("1 de
+# cada 3", "en 1991 hubo"): el número se lee entero, sin concordancia
+_NOT_NOUNS = frozenset(
+    "a al ante con contra de del desde e en entre hasta o para pero por que según sin sobre u y "
+    "más menos es son era eran fue fueron será serán está están estaba hay había hubo ha han".split()
+)
+_VERB_ENDINGS = ('ó', 'aron', 'ieron', 'aba', 'aban', 'ían', 'ará', 'erá', 'irá', 'arán', 'erán', 'irán')
+_FEMININE_ENDINGS = ('a', 'as', 'ión', 'iones', 'dad', 'dades', 'tad', 'tades', 'tud', 'tudes', 'umbre', 'umbres')
+# Excepciones a las terminaciones
+_MASCULINE_NOUNS = frozenset(
+    "día días mapa mapas problema problemas tema temas sistema sistemas programa programas idioma idiomas "
+    "clima climas planeta planetas poema poemas esquema esquemas síntoma síntomas drama dramas".split()
+)
+_FEMININE_NOUNS = frozenset(
+    "vez veces noche noches tarde tardes parte partes clase clases calle calles mano manos imagen imágenes "
+    "red redes ley leyes luz luces voz voces mujer mujeres flor flores fase fases llave llaves sede sedes "
+    "serie series especie especies gente".split()
+)
+_FOLLOWING_WORD = re.compile(r'[ \t]+([^\W\d_]+)')
+
+_CLAUSE_PUNCTUATION = set(',;:.!?')
+# Tras un símbolo eliminado no queda espacio antes de esta puntuación
+_NO_SPACE_BEFORE = ('', '\n', ',', ';', ':', '.', '!', '?', '…')
+
+_SPELLED_CACHE_SIZE = 4096
+
+_NUMBER = r'\d{1,3}(?:[.,]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?'
+_UNIT = '|'.join(re.escape(unit) for unit in sorted(set(_UNITS) | {'$'}, key=len, reverse=True))
+_ABBREVIATION = '|'.join(
+    re.escape(abbreviation).replace(r'\ ', r'\s?') for abbreviation in sorted(_ABBREVIATIONS, key=len, reverse=True)
+)
+
+# Caracteres que se conservan; el resto (emojis, markdown, comillas...) pasa a espacio
+_KEPT = r"\w\s.,;:!?¿¡\-…%$€£°ºª*()/"
+
+# Posibles inicios de reemplazo: todo salvo letras, espacios y la puntuación
+# que siempre se conserva. Es una sola clase de caracteres, así que el motor
+# de re la busca sin entrar al patrón completo en cada posición; en prosa
+# corriente apenas hay un puñado de candidatos por oración.
+_TRIGGER = re.compile(r"[^a-zA-ZáéíóúüñÁÉÍÓÚÜÑ ,;:!?¿¡…%°ºª]")
+
+# Ni una letra ni una cifra: "2do", "10am" o "3D" no son cantidades
+_NOT_WORD = r'(?![^\W_])'
+
+# Cifras unidas por guiones o por varios puntos que no son miles (versiones,
+# teléfonos, fechas): se dejan como están
+_DIGIT_RUN = r'(?<![\w.,-])(?!\d{1,3}(?:\.\d{3})+(?![.,-]?\d))\d+(?:(?:[.-]\d+){2,}|-\d+)(?![\w-]|[.,]\d)'
+
+# Una sola expresión anclada en cada candidato: cada alternativa es un grupo
+# con nombre y se resuelve con m.lastgroup
+_PATTERN = re.compile(
+    rf"(?P<action>\*[^*\n]+\*(?!\*))"                                  # *acciones*, no **negrita**
+    rf"|(?P<aside>\([^()\n]*\))"                                        # (apartes)
+    rf"|(?P<date>(?<![\w/])(?P<day>\d{{1,2}})/(?P<month>\d{{1,2}})/(?P<year>\d{{4}}|\d{{2}})(?![\w/]))"  # 12/05/2024
+    rf"|(?P<time>(?<![\w:])(?P<hour>\d{{1,2}}):(?P<minute>\d{{2}})(?P<second>:\d{{2}})?(?!\d|:\d))"  # 10:30
+    rf"|(?P<ordinal>(?<![\w.,])(?P<ordnum>\d{{1,2}})"                    # 1º, 3ª, 2do, 1er, 3ra
+    rf"(?P<ordmark>[ºª]|er|(?:er|r|d|t|v|m|n)[oa]s?){_NOT_WORD})"
+    rf"|(?P<money>(?P<cursym>[$€£])\s?(?P<curnum>{_NUMBER}){_NOT_WORD}"   # $100, €5, $5 pesos
+    rf"(?P<curname>\s(?:pesos?|d[oó]lar(?:es)?|euros?|libras?)\b)?)"
+    rf"|(?P<digits>{_DIGIT_RUN})"                                       # 2.0.1, 555-1234
+    rf"|(?P<quantity>(?P<sign>(?<![\w-])-)?(?<![^\W\d_])(?P<num>{_NUMBER})"  # 15 km
+    rf"(?:\s?(?P<unit>{_UNIT})(?!\w)|{_NOT_WORD}))"
+    rf"|(?P<newline>\r?\n\s*)"
+    rf"|(?P<space>[\t\r\f\v][ \t\r\f\v]*)"
+    rf"|(?P<drop>(?:[^{_KEPT}]|[_/)]|\*{{2,}}|\*(?![^*\n]+\*)|\((?![^()\n]*\)))"  # emojis, sueltos
+    rf"(?:[ \t]*(?:[^{_KEPT}]|[_/)]|\*{{2,}}|\*(?![^*\n]+\*)|\((?![^()\n]*\))))*[ \t]*)"
+)
+
+# Abreviatura que termina justo antes de un punto ("Sr", "p. ej")
+_ABBREVIATION_BEFORE = re.compile(rf"(?<![\w.])(?:{_ABBREVIATION})\Z")
+# Abreviatura con su punto tras un número ("10 p. m."): no es un sustantivo
+_ABBREVIATION_AT = re.compile(rf"(?:{_ABBREVIATION})\.")
+_LONGEST_ABBREVIATION = max(len(abbreviation) for abbreviation in _ABBREVIATIONS) + 1
+
+# Reemplazos que absorben el espacio que los precede
+_ABSORBS_SPACE = {'action', 'aside', 'newline', 'space', 'drop'}
+
+_WORD_GAP = re.compile(r'\s+')
+# Palabra que termina en algo que puede formar una expresión con la siguiente
+_JOINING_END = re.compile(r"(?:^|[^\w.])(?:\$|US\$|€|£|p\.|a\.|EE\.|etc\.|\d{1,2}[a-z]{1,3})\Z")
+
+
+def _below_hundred(n: int, apocope: bool) -> str:
+    if n < 30:
+        if apocope and n == 1:
+            return 'un'
+        if apocope and n == 21:
+            return 'veintiún'
+        return _SMALL[n]
+    tens, units = divmod(n, 10)
+    if not units:
+        return _TENS[tens]
+    return f"{_TENS[tens]} y {'un' if apocope and units == 1 else _SMALL[units]}"
+
+
+def _below_thousand(n: int, apocope: bool) -> str:
+    if n == 100:
+        return 'cien'
+    hundreds, rest = divmod(n, 100)
+    parts = [_HUNDREDS[hundreds]] if hundreds else []
+    if rest:
+        parts.append(_below_hundred(rest, apocope))
+    return ' '.join(parts)
+
+
+def number_to_words(n: int, apocope: bool = False, feminine: bool = False) -> str:
+    """
+    Escribir un entero en palabras
+
+    Args:
+        n: Número (hasta 999.999.999.999; más grandes se leen cifra a cifra)
+        apocope: Forma ante sustantivo ("veintiún kilómetros")
+        feminine: Concordancia femenina ("doscientas una horas")
+    """
+    if n < 0:
+        return f"menos {number_to_words(-n, apocope, feminine)}"
+    if n == 0:
+        return 'cero'
+    if n >= 10 ** 12:
+        return ' '.join(_SMALL[int(digit)] for digit in str(n))
+
+    millions, rest = divmod(n, 10 ** 6)
+    thousands, units = divmod(rest, 1000)
+    parts = []
+    if thousands:
+        parts.append('mil' if thousands == 1 else f"{_below_thousand(thousands, True)} mil")
+    if units:
+        parts.append(_below_thousand(units, apocope or feminine))
+    words = ' '.join(parts)
+
+    # "millón" es masculino: la concordancia solo afecta a los miles y las unidades
+    if feminine:
+        words = words.replace('ientos', 'ientas').replace('veintiún', 'veintiuna').replace(' un ', ' una ')
+        if words == 'un' or words.endswith(' un'):
+            words += 'a'
+        elif words.startswith('un '):
+            words = 'una' + words[2:]
+    if millions:
+        millions_words = 'un millón' if millions == 1 else f"{number_to_words(millions, apocope=True)} millones"
+        words = f"{millions_words} {words}" if words else millions_words
+    return words
+
+
+def _parse_number(text: str) -> Tuple[int, Optional[str]]:
+    """
+    Interpretar separadores: (parte entera, decimales o None)
+
+    "1.500" y "1,500" son miles; "3.5" y "3,75" son decimales; si aparecen
+    ambos separadores, el último es el decimal.
+    """
+    separators = [c for c in text if c in '.,']
+    if not separators:
+        return int(text), None
+    if len(set(separators)) == 2:
+        decimal = separators[-1]
+        integer, _, fraction = text.rpartition(decimal)
+        return int(integer.replace('.', '').replace(',', '')), fraction
+    if len(separators) > 1:
+        return int(text.replace(separators[0], '')), None
+    integer, _, fraction = text.partition(separators[0])
+    if len(fraction) == 3 and not integer.startswith('0'):
+        return int(integer + fraction), None
+    return int(integer), fraction
+
+
+def _decimal_to_words(fraction: str) -> str:
+    # "05" se lee cifra a cifra para no perder el cero
+    if len(fraction) <= 2 and not fraction.startswith('0'):
+        return number_to_words(int(fraction))
+    return ' '.join(_SMALL[int(digit)] for digit in fraction)
+
+
+def _noun_gender(text: str, end: int) -> str:
+    """
+    Género del sustantivo que sigue a un número ("1 hora" → 'f'), o '' si
+    lo que sigue no parece un sustantivo
+
+    Es una aproximación por terminaciones: basta para "un"/"una" y
+    "doscientos"/"doscientas" en las respuestas habituales.
+    """
+    match = _FOLLOWING_WORD.match(text, end)
+    if match is None or _ABBREVIATION_AT.match(text, match.start(1)):
+        return ''
+    word = match.group(1).lower()
+    if word in _NOT_NOUNS or word.endswith(_VERB_ENDINGS):
+        return ''
+    if word in _FEMININE_NOUNS:
+        return 'f'
+    if word not in _MASCULINE_NOUNS and word.endswith(_FEMININE_ENDINGS):
+        return 'f'
+    return 'm'
+
+
+def _dollar_prefix(text: str, start: int) -> bool:
+    """Si el $ en la posición start forma parte de «US$»"""
+    return text.endswith('US', 0, start) and not text[start - 3:start - 2].isalnum()
+
+
+def _joins_next(word: str) -> bool:
+    """
+    Si la palabra puede formar una sola expresión con la siguiente ("21 km",
+    "$ 5", "p. ej.", "1º lugar", "1er día") o acaba en algo que se elimina junto con el
+    espacio que lo sigue (emojis, "**")
+    """
+    last = word[-1:]
+    if not last:
+        return False
+    return (last in 'ºª' or not (last.isalpha() or last in '.,;:!?…%')
+            or _JOINING_END.search(word) is not None)
+
+
+class TextNormalizer:
+    """
+    Limpia y normaliza texto para la voz en una sola pasada
+
+    - Elimina *acciones*, (apartes), emojis y símbolos no pronunciables
+    - Escribe en palabras números, horas, fechas, ordinales, porcentajes,
+      monedas y unidades ("15 km" → "quince kilómetros"), concordando con
+      el sustantivo que sigue ("1 hora" → "una hora", "21 mil" → "veintiún mil")
+    - Deja como están las cifras unidas por guiones o varios puntos
+      ("2.0.1", "555-1234") y las horas o fechas que no son válidas
+    - Lee "C++" y "C#" como "C más más" y "C sharp"
+    - Expande abreviaturas habituales ("Sr." → "señor")
+
+    El resultado es estable: normalizar dos veces da lo mismo que una.
+    Con spell_out=False (voces en otros idiomas) solo se limpia el texto.
+    """
+
+    def __init__(self, country: str = 'MX', spell_out: bool = True):
+        self.spell_out = spell_out
+        self.units = dict(_UNITS, **{'$': _DOLLAR_BY_COUNTRY.get(country, _DOLLAR), 'US$': _DOLLAR})
+        # Las respuestas repiten pocas cantidades ("1.", "2.", "10%"): se
+        # escriben una vez; el tope evita que crezca sin límite
+        self._spelled: Dict[Tuple[str, Optional[str], bool, str], str] = {}
+
+    def normalize(self, text: str) -> str:
+        """Normalizar un texto completo"""
+        parts = []
+        last = position = 0
+        while True:
+            trigger = _TRIGGER.search(text, position)
+            if trigger is None:
+                break
+            start = trigger.start()
+
+            if text[start] == '.':
+                # "Sr." se reconoce por el punto, mirando hacia atrás
+                position = start + 1
+                abbreviation = _ABBREVIATION_BEFORE.search(text, max(last, start - _LONGEST_ABBREVIATION), start)
+                if abbreviation and self.spell_out:
+                    parts.append(text[last:abbreviation.start()])
+                    parts.append(self._abbreviation(abbreviation.group(), text[position:position + 2]))
+                    last = position
+                continue
+
+            if text[start] in '+#':
+                # "C++" se reconoce por el símbolo, mirando hacia atrás
+                language = _PROGRAMMING_LANGUAGE.match(text, start - 1) if start > last else None
+                if language:
+                    parts.append(text[last:start - 1])
+                    parts.append(self._programming_language(language.group()))
+                    last = position = language.end()
+                    continue
+
+            match = _PATTERN.match(text, start)
+            if match is None:
+                position = start + 1
+                continue
+
+            kind = match.lastgroup
+            prefix_end = start
+            if kind in _ABSORBS_SPACE:
+                while prefix_end > last and text[prefix_end - 1] in ' \t':
+                    prefix_end -= 1
+                if prefix_end == last and parts:
+                    # También el espacio que dejó el reemplazo anterior ("😀 (aparte)")
+                    parts[-1] = parts[-1].rstrip(' \t')
+            elif kind == 'money' and self.spell_out and _dollar_prefix(text, start) and start - 2 >= last:
+                prefix_end -= 2
+            parts.append(text[last:prefix_end])
+            parts.append(self._replace(match))
+            last = position = match.end()
+
+        parts.append(text[last:])
+        return ''.join(parts).strip()
+
+    def stream(self) -> 'StreamingNormalizer':
+        """Crear un normalizador incremental para un stream de tokens"""
+        return StreamingNormalizer(self)
+
+    def _replace(self, match: re.Match) -> str:
+        kind = match.lastgroup
+        if kind in ('action', 'aside'):
+            return ''
+        if kind == 'newline':
+            return '\n'
+        if kind == 'drop':
+            # Sin espacio antes de un salto de línea, de la puntuación o al final
+            return ' ' if match.string[match.end():match.end() + 1] not in _NO_SPACE_BEFORE else ''
+        if kind == 'space':
+            return ' '
+        if not self.spell_out or kind == 'digits':
+            return match.group()
+        if kind == 'quantity':
+            unit = match.group('unit')
+            gender = '' if unit else _noun_gender(match.string, match.end())
+            return self._quantity(match.group('num'), unit, bool(match.group('sign')), gender)
+        if kind == 'money':
+            symbol = 'US$' if _dollar_prefix(match.string, match.start()) else match.group('cursym')
+            words = self._quantity(match.group('curnum'), symbol)
+            if match.group('curname'):
+                # "$5 pesos": la moneda ya viene escrita
+                words = words.rsplit(' ', 1)[0] + match.group('curname')
+            return words
+        if kind == 'date':
+            day, month, year = int(match.group('day')), int(match.group('month')), int(match.group('year'))
+            if not (0 < day <= 31 and 0 < month <= 12):
+                # No es una fecha: se deja como está
+                return match.group()
+            if len(match.group('year')) == 2:
+                year += 2000 if year < 50 else 1900
+            day_words = 'primero' if day == 1 else number_to_words(day)
+            return f"{day_words} de {_MONTHS[month]} de {number_to_words(year)}"
+        if kind == 'time':
+            hour, minute = int(match.group('hour')), int(match.group('minute'))
+            following = match.string[match.end():match.end() + 1]
+            if match.group('second') or hour > 23 or minute > 59 or following.isalnum() or following == '_':
+                # Duraciones, marcadores o códigos ("25:00", "1:30:00", "10:30h"): se dejan como están
+                return match.group()
+            hour_words = number_to_words(hour, feminine=True)
+            return f"{hour_words} en punto" if not minute else f"{hour_words} y {number_to_words(minute)}"
+        if kind == 'ordinal':
+            number = int(match.group('ordnum'))
+            if not 0 < number <= 10:
+                return number_to_words(number)
+            mark = match.group('ordmark')
+            plural = 's' if mark.endswith('s') else ''
+            if mark == 'ª' or mark.rstrip('s').endswith('a'):
+                return _ORDINALS[number] + 'a' + plural
+            # "1º lugar" / "1er lugar" → "primer lugar"; "quedó 1º", "1ro de mayo" → "primero"
+            if number in (1, 3) and not plural and (mark == 'er' or _noun_gender(match.string, match.end())):
+                return _ORDINALS[number]
+            return _ORDINALS[number] + 'o' + plural
+
+    def _programming_language(self, name: str) -> str:
+        if not self.spell_out:
+            return name
+        return name[0] + _SYMBOL_NAMES[name[1:]]
+
+    def _abbreviation(self, name: str, following: str) -> str:
+        # "p.ej." y "p. ej." comparten entrada
+        name = _ABBREVIATION_SPACING.sub('. ', name)
+        expansion = _ABBREVIATIONS[name]
+        # El punto de "etc." cierra también la oración solo al final del
+        # texto o de la línea, o si sigue una mayúscula
+        if name == 'etc' and (following[:1] in ('', '\n') or (following[:1] == ' ' and following[1:].isupper())):
+            expansion += '.'
+        return expansion
+
+    def _quantity(self, number: str, unit: Optional[str], negative: bool = False, gender: str = '') -> str:
+        key = (number, unit, negative, gender)
+        words = self._spelled.get(key)
+        if words is None:
+            words = self._spell_quantity(number, unit, negative, gender)
+            if len(self._spelled) < _SPELLED_CACHE_SIZE:
+                self._spelled[key] = words
+        return words
+
+    def _spell_quantity(self, number: str, unit: Optional[str], negative: bool, gender: str = '') -> str:
+        """gender: el del sustantivo que sigue al número si no hay unidad"""
+        integer, fraction = _parse_number(number)
+        unit_words = self.units.get(unit) if unit else None
+        if unit_words:
+            gender = unit_words[2]
+
+        if fraction is not None:
+            words = f"{number_to_words(integer)} coma {_decimal_to_words(fraction)}"
+        else:
+            words = number_to_words(integer, apocope=gender == 'm', feminine=gender == 'f')
+        if negative:
+            words = f"menos {words}"
+        if not unit_words:
+            # "1000000 habitantes" → "un millón de habitantes"
+            if gender and fraction is None and words.endswith(('millón', 'millones')):
+                words += ' de'
+            return words
+
+        singular, plural, _ = unit_words
+        name = singular if integer == 1 and fraction is None else plural
+        # "un millón de kilómetros"
+        if words.endswith(('millón', 'millones')):
+            name = f"de {name}"
+        return f"{words} {name}"
+
+
+@lru_cache(maxsize=None)
+def normalizer_for_voice(voice: str) -> TextNormalizer:
+    """Normalizador para una voz de edge-tts ("es-MX-DaliaNeural" → pesos, números en español)"""
+    language, _, rest = voice.partition('-')
+    return TextNormalizer(country=rest.split('-', 1)[0].upper(), spell_out=language.lower() == 'es')
+
+
+class StreamingNormalizer:
+    """
+    Normaliza un stream de tokens sin esperar al final
+
+    Retiene la última palabra completa, la incompleta y las que puedan
+    unirse a ellas ("$ 1,500 pesos", "21 km", "p. ej."), además de cualquier
+    *acción* o (aparte) sin cerrar; el resto se normaliza y se entrega.
+    El texto resultante es el mismo que con normalize() sobre el total.
+    """
+
+    HOLD_WORDS = 2
+
+    def __init__(self, normalizer: TextNormalizer, max_pending: int = 400):
+        self.normalizer = normalizer
+        self.max_pending = max_pending
+        self._buffer = ''
+        self._started = False
+        self._separator = ''
+
+    def feed(self, token: str) -> str:
+        """Agregar un token y devolver el texto normalizado que ya es estable"""
+        self._buffer += token
+        cut = self._safe_cut()
+        if cut <= 0:
+            return ''
+        ready, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        normalized = self._normalize(ready)
+
+        # El espacio del corte queda con el texto retenido, que puede
+        # absorberlo ("pesos (más o menos)."). Si lo sigue una letra o una
+        # cifra sobrevive seguro: se entrega ya para que el separador de
+        # oraciones no espere al siguiente fragmento.
+        separator = self._buffer[:len(self._buffer) - len(self._buffer.lstrip())]
+        following = self._buffer[len(separator):len(separator) + 1]
+        if (self._started and separator and not separator.strip(' ')
+                and (following.isalnum() or following in ('¿', '¡'))):
+            self._separator = separator
+            normalized += separator
+        return normalized
+
+    def flush(self) -> str:
+        """Normalizar lo pendiente al terminar el stream"""
+        remainder, self._buffer = self._buffer, ''
+        return self._normalize(remainder)
+
+    def _normalize(self, text: str) -> str:
+        if not self._started:
+            # Al principio, como normalize(), sin espacio inicial
+            normalized = self.normalizer.normalize(text)
+        else:
+            # Tras una palabra cualquiera, para conservar el espacio inicial
+            # solo si normalize() lo conservaría en el texto completo
+            normalized = self.normalizer.normalize('x' + text)[1:]
+            if self._separator and normalized.startswith(self._separator):
+                normalized = normalized[len(self._separator):]
+        self._separator = ''
+        self._started = self._started or bool(normalized)
+        return normalized
+
+    def _safe_cut(self) -> int:
+        # Cortar en un espacio antes de las últimas HOLD_WORDS palabras,
+        # retrocediendo mientras la palabra previa al corte pueda unirse con
+        # la siguiente, la siguiente se elimine junto con el espacio que la
+        # precede o el corte caiga dentro de una acción o un aparte sin cerrar
+        buffer = self._buffer
+        check_markup = len(buffer) < self.max_pending
+        gaps = list(_WORD_GAP.finditer(buffer.rstrip()))
+        for index in range(len(gaps) - self.HOLD_WORDS, -1, -1):
+            cut = gaps[index].start()
+            word_start = gaps[index - 1].end() if index else 0
+            if _joins_next(buffer[word_start:cut]) or buffer[gaps[index].end()] in '*(':
+                continue
+            if check_markup:
+                prefix = buffer[:cut]
+                if prefix.count('*') % 2 or prefix.rfind('(') > prefix.rfind(')'):
+                    continue
+            return cut
+        return 0
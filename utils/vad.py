@@ -0,0 +1,88 @@
+"""
+Detección de actividad de voz (VAD) por energía, vectorizada con NumPy
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+class EnergyVAD:
+    """Detecta tramos con voz comparando la energía RMS por trama con un umbral"""
+
+    def __init__(self, threshold: int = 500, min_silence: float = 1.5,
+                 frame_ms: int = 30, padding_ms: int = 200,
+                 min_speech_ms: int = 250, split_seconds: float = 30.0,
+                 sample_rate: int = SAMPLE_RATE):
+        # El umbral viene en unidades PCM de 16 bits, como en el navegador
+        self.threshold = threshold / 32768.0
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.min_silence_frames = max(1, int(min_silence * 1000 / frame_ms))
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.padding = int(sample_rate * padding_ms / 1000)
+        self.split_samples = int(split_seconds * sample_rate)
+
+    def speech_spans(self, audio: np.ndarray) -> List[Tuple[int, int]]:
+        """
+        Calcular los tramos con voz
+
+        Los silencios más cortos que min_silence se consideran parte del
+        mismo tramo (pausas entre palabras).
+
+        Returns:
+            Lista de (inicio, fin) en muestras, con margen incluido
+        """
+        n_frames = len(audio) // self.frame
+        if n_frames == 0:
+            return []
+
+        frames = audio[:n_frames * self.frame].reshape(n_frames, self.frame)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        voiced = (rms > self.threshold).astype(np.int8)
+
+        edges = np.diff(np.concatenate(([0], voiced, [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        if len(starts) == 0:
+            return []
+
+        # Unir tramos separados por silencios cortos
+        breaks = np.flatnonzero(starts[1:] - ends[:-1] >= self.min_silence_frames)
+        starts = np.concatenate(([starts[0]], starts[breaks + 1]))
+        ends = np.concatenate((ends[breaks], [ends[-1]]))
+
+        # Descartar chasquidos y ruidos breves
+        keep = ends - starts >= self.min_speech_frames
+        starts, ends = starts[keep], ends[keep]
+
+        starts = np.maximum(starts * self.frame - self.padding, 0)
+        ends = np.minimum(ends * self.frame + self.padding, len(audio))
+        return list(zip(starts.tolist(), ends.tolist()))
+
+    def split(self, audio: np.ndarray) -> List[np.ndarray]:
+        """
+        Recortar silencios y, en clips largos, separar en segmentos de voz
+
+        Returns:
+            Segmentos a transcribir; lista vacía si todo es silencio
+        """
+        spans = self.speech_spans(audio)
+        if not spans:
+            return []
+
+        # Clips cortos: un solo segmento sin silencio al inicio ni al final
+        if spans[-1][1] - spans[0][0] <= self.split_samples:
+            return [audio[spans[0][0]:spans[-1][1]]]
+
+        # Clips largos: agrupar tramos contiguos hasta split_samples
+        segments = []
+        seg_start, seg_end = spans[0]
+        for start, end in spans[1:]:
+            if end - seg_start > self.split_samples:
+                segments.append(audio[seg_start:seg_end])
+                seg_start = start
+            seg_end = end
+        segments.append(audio[seg_start:seg_end])
+        return segments